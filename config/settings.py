@@ -148,4 +148,87 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/user_dashboard/'  # for normal users
 LOGOUT_REDIRECT_URL = '/login/'     # after logout
 
+# Download-link validation (projects/link_checker.py)
+# Concurrent HTTP checks per batch (also the pooled connections per host)
+LINK_CHECK_WORKERS = 8
+# Seconds before a single link check gives up
+LINK_CHECK_TIMEOUT = 5
+# Hours a valid link is trusted before it is re-checked
+LINK_CHECK_TTL_HOURS = 24
+# Minutes an invalid link is cached before it is re-checked
+LINK_CHECK_NEGATIVE_TTL_MINUTES = 60
+
+# Outbound email (projects/mail_queue.py, delivered by `manage.py run_mail_worker`)
+# SMTP server the mail worker connects to
+EMAIL_HOST = 'smtp.gmail.com'
+# SMTP port (587 = submission with STARTTLS)
+EMAIL_PORT = 587
+# Upgrade the SMTP connection with STARTTLS
+EMAIL_USE_TLS = True
+# Sending account and its (app) password, from the environment so no credential lives in source
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+# From address used when EMAIL_HOST_USER is not set
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+# Queued emails claimed and sent per worker iteration
+MAIL_QUEUE_BATCH_SIZE = 50
+# Attempts before a temporarily failing email is marked failed
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+# Base retry delay in seconds, doubled after every failed attempt
+MAIL_QUEUE_BACKOFF_SECONDS = 60
+# Maximum emails sent to one recipient per rate window
+MAIL_QUEUE_RATE_LIMIT = 20
+# Length of the per-recipient rate window in minutes
+MAIL_QUEUE_RATE_WINDOW_MINUTES = 60
+# Seconds the worker keeps an idle SMTP connection open
+MAIL_QUEUE_IDLE_SECONDS = 60
+
+# Minutes notifications accumulate before a user gets one digest email (projects/digests.py)
+NOTIFICATION_DIGEST_WINDOW_MINUTES = 15
+
+# Rows per page of the project and publication listings, and the most ?page_size= may ask for (projects/pagination.py)
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+
+# Cache shared by every web and worker process on this host, so a save in one process invalidates
+# the cached facets of all of them (set CACHE_LOCATION to move it; use a Redis cache across hosts)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
+}
+
+# Seconds the listing filter facets stay cached; saves and deletes invalidate them sooner (projects/facets.py).
+# Facets are only cached in a cache shared between processes (not LocMemCache)
+FACET_CACHE_TIMEOUT = 300
+
+# AI matching
+# Sentence-transformer model name (or local path) used by the project/publication matcher
+AI_MATCHING_MODEL = "paraphrase-MiniLM-L6-v2"
+# Torch device the matcher encoder runs on
+AI_MATCHING_DEVICE = "cpu"
+# Encoder inference backend: "torch" (float), "onnx" (onnxruntime, needs optimum[onnxruntime]) or "int8" (torch dynamic quantization)
+AI_MATCHING_BACKEND = "torch"
+# Local copy of the model the "onnx" / "int8" backends load from (None = AI_MATCHING_MODEL)
+AI_MATCHING_MODEL_PATH = None
+# ONNX file inside AI_MATCHING_MODEL_PATH, e.g. "onnx/model_qint8_avx512_vnni.onnx" (None = onnx/model.onnx)
+AI_MATCHING_ONNX_FILE = None
+# Load the encoder in ProjectsConfig.ready() instead of on the first matching run
+AI_MATCHING_WARMUP = False
+# Number of queued matching jobs run_matching_worker encodes together
+AI_MATCHING_BATCH_SIZE = 32
+# Texts per encoder forward pass (inputs are length-sorted first, so batches pad evenly)
+AI_MATCHING_ENCODE_BATCH_SIZE = 64
+# Words of extracted PDF body text added to each publication's matching text
+AI_MATCHING_BODY_TOKENS = 256
+# Torch intra-op threads per matching process; None keeps torch's default (all cores)
+AI_MATCHING_THREADS = None
+# Attempts before a matching job is marked failed
+AI_MATCHING_MAX_ATTEMPTS = 3
+# Top-k similarity search backend: "exact" (NumPy brute force) or "hnsw" (approximate, needs hnswlib)
+AI_MATCHING_INDEX_BACKEND = "exact"
+# HNSW graph parameters (only used by the "hnsw" backend)
+AI_MATCHING_HNSW = {"M": 16, "ef_construction": 200, "ef": 64}
+
 
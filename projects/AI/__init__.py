@@ -0,0 +1,30 @@
+# projects.AI
+#
+# Lazy facade over the AI matching stack. The submodules import numpy, pandas,
+# scipy and (on first encode) torch / sentence_transformers, which together take
+# seconds to load. Code that runs in every process (signals, the job queue, admin,
+# websocket workers) should call these wrappers instead of importing the
+# submodules: each one imports its implementation on first call only.
+
+from importlib import import_module
+
+
+def _lazy(module_name, function_name):
+    def call(*args, **kwargs):
+        function = getattr(import_module(f"{__name__}.{module_name}"), function_name)
+        return function(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = function_name
+    call.__doc__ = f"Lazily imported {__name__}.{module_name}.{function_name}()."
+    return call
+
+
+# Matching entry points
+match_projects_and_papers = _lazy("nlp_ba_model_1_with_adminreq_", "match_projects_and_papers")
+match_publications = _lazy("nlp_ba_model_1_with_adminreq_", "match_publications")
+match_publication = _lazy("nlp_ba_model_1_with_adminreq_", "match_publication")
+match_all_projects_and_papers = _lazy("nlp_ba_model_1_with_adminreq_", "match_all_projects_and_papers")
+
+# Encoder and embedding store
+warm_up = _lazy("model_registry", "warm_up")
+delete_embeddings = _lazy("embedding_store", "delete_embeddings")
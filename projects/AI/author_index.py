@@ -0,0 +1,132 @@
+# author_index.py
+#
+# Resolves author mentions to Author ids for the AI matcher's shared-author check.
+# Project.team is free text ("Dr. Ada Lovelace, Alan Turing and grace@uni.edu"),
+# so it is parsed once when the project is saved and the resulting ids are stored
+# in Project.team_authors. Publications already reference Author rows through
+# primary_author and collaborators.
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from projects.models import Author, Project, Publication
+
+# Separators between people in a free-text team field
+TEAM_SEPARATORS = re.compile(r"[,;&/\n|]|\band\b", re.IGNORECASE)
+# Email addresses anywhere in the team field
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Honorifics dropped from the front of a name before lookup
+TITLES = {"dr", "prof", "professor", "mr", "mrs", "ms", "miss", "sir"}
+
+
+def normalize_name(name):
+    """Lower-case a name, drop punctuation, leading titles and extra whitespace."""
+    if not name:
+        return ""
+    words = re.sub(r"[^\w\s-]", " ", name.lower()).split()
+    while words and words[0] in TITLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def normalize_email(email):
+    """Lower-case and strip an email address."""
+    return (email or "").strip().lower()
+
+
+def split_team(team):
+    """
+    Split a free-text team field into (names, emails).
+    Handles plain lists ("A, B and C") as well as stringified Python lists ("['A', 'B']").
+    """
+    if not team:
+        return set(), set()
+    emails = {normalize_email(email) for email in EMAIL_PATTERN.findall(team)}
+    remainder = EMAIL_PATTERN.sub(" ", team)
+    remainder = re.sub(r"[\[\]()'\"]", " ", remainder)
+    names = {normalize_name(part) for part in TEAM_SEPARATORS.split(remainder)}
+    names.discard("")
+    return names, emails
+
+
+def resolve_team(team):
+    """Return the ids of Authors named or emailed in a free-text team field."""
+    names, emails = split_team(team)
+    lookups = [Q(email__iexact=email) for email in emails]
+    if names:
+        # Both sides normalized: "Dr. Ada Lovelace" on the author matches "Ada Lovelace" in the team
+        lookups.append(Q(normalized_name__in=names))
+    if not lookups:
+        return set()
+
+    candidates = Author.objects.filter(reduce(or_, lookups)).values_list("id", "normalized_name", "email")
+    return {
+        author_id for author_id, name, email in candidates
+        if name in names or normalize_email(email) in emails
+    }
+
+
+def refresh_team_authors(project):
+    """Re-parse project.team and store the matching Author ids in project.team_authors."""
+    project.team_authors.set(resolve_team(project.team))
+
+
+def refresh_projects_for_author(author):
+    """Re-resolve the teams of projects that mention this author by name or email, or used to list them."""
+    # The raw name may carry a title or punctuation the team text doesn't, so the candidate
+    # filter uses the longest word of the normalized name; resolve_team() decides the match
+    words = normalize_name(author.name).split()
+    lookups = [Q(team_authors=author)] if author.pk else []
+    if words:
+        lookups.append(Q(team__icontains=max(words, key=len)))
+    if author.email:
+        lookups.append(Q(team__icontains=author.email.strip()))
+    if not lookups:
+        return
+    for project in Project.objects.filter(reduce(or_, lookups)).distinct():
+        refresh_team_authors(project)
+
+
+def publication_author_ids(publication_ids=None):
+    """
+    Return {publication_id: set of Author ids} from primary_author and collaborators.
+    With publication_ids=None every publication is included.
+    """
+    publications = Publication.objects.all()
+    collaborators = Publication.collaborators.through.objects.all()
+    if publication_ids is not None:
+        publications = publications.filter(id__in=publication_ids)
+        collaborators = collaborators.filter(publication_id__in=publication_ids)
+
+    author_ids = {}
+    for publication_id, author_id in publications.values_list("id", "primary_author_id"):
+        author_ids[publication_id] = {author_id} if author_id else set()
+    for publication_id, author_id in collaborators.values_list("publication_id", "author_id"):
+        author_ids.setdefault(publication_id, set()).add(author_id)
+    return author_ids
+
+
+def project_author_ids(project_ids=None):
+    """
+    Return {project_id: set of Author ids} from the stored team_authors.
+    With project_ids=None every project is included.
+    """
+    team_authors = Project.team_authors.through.objects.all()
+    if project_ids is not None:
+        team_authors = team_authors.filter(project_id__in=project_ids)
+
+    author_ids = {}
+    for project_id, author_id in team_authors.values_list("project_id", "author_id"):
+        author_ids.setdefault(project_id, set()).add(author_id)
+    return author_ids
+
+
+def author_names(author_ids):
+    """Return {author_id: display name} for the given ids."""
+    return {
+        author_id: name or email
+        for author_id, name, email in Author.objects.filter(id__in=author_ids).values_list("id", "name", "email")
+    }
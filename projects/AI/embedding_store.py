@@ -0,0 +1,118 @@
+# embedding_store.py
+#
+# Persistent embedding cache for the AI matcher. Vectors live in the
+# StoredEmbedding table keyed by (kind, object id, model name) together with a
+# hash of the text they were computed from, so a matching run only re-encodes
+# rows whose cleaned text actually changed.
+
+import hashlib
+
+import numpy as np
+from django.utils import timezone
+
+from projects.models import StoredEmbedding
+from projects.AI.encoding import encode_texts
+from projects.AI.model_registry import get_model, get_model_name
+from projects.AI.vector_index import remove_from_indexes, update_indexes
+
+# Maximum number of ids put into a single `object_id__in` lookup
+LOOKUP_CHUNK_SIZE = 500
+
+
+def content_hash(text):
+    """SHA-1 hex digest of the text that gets encoded."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _chunks(items, size=LOOKUP_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _to_vector(row):
+    return np.frombuffer(bytes(row.vector), dtype=np.float32, count=row.dim)
+
+
+def load_embeddings(kind, object_ids, model_name=None):
+    """
+    Return {object_id: float32 vector} for the stored rows among object_ids.
+    Ids without a stored vector are simply missing from the result.
+    """
+    model_name = get_model_name(model_name)
+    object_ids = [int(object_id) for object_id in object_ids]
+    vectors = {}
+    for chunk in _chunks(object_ids):
+        rows = StoredEmbedding.objects.filter(kind=kind, model_name=model_name, object_id__in=chunk)
+        for row in rows:
+            vectors[row.object_id] = _to_vector(row)
+    return vectors
+
+
+def sync_embeddings(kind, texts_by_id, model=None, model_name=None):
+    """
+    Make sure every (object_id, text) pair has an up-to-date stored vector and
+    return a float32 matrix with one row per id, in the order of texts_by_id.
+    - kind: 'project' or 'publication'.
+    - texts_by_id: dict of object_id -> cleaned text to encode.
+    - model: encoder to use for stale rows (defaults to the registry model).
+    Only ids whose text hash differs from the stored one are re-encoded.
+    """
+    model_name = get_model_name(model_name)
+    texts_by_id = {int(object_id): text for object_id, text in texts_by_id.items()}
+    object_ids = list(texts_by_id)
+    if not object_ids:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    hashes = {object_id: content_hash(texts_by_id[object_id]) for object_id in object_ids}
+
+    stored = {}
+    for chunk in _chunks(object_ids):
+        for row in StoredEmbedding.objects.filter(kind=kind, model_name=model_name, object_id__in=chunk):
+            stored[row.object_id] = row
+
+    stale_ids = [object_id for object_id in object_ids
+                 if object_id not in stored or stored[object_id].content_hash != hashes[object_id]]
+    stale = set(stale_ids)
+
+    vectors = {object_id: _to_vector(row) for object_id, row in stored.items() if object_id not in stale}
+
+    if stale_ids:
+        model = model or get_model(model_name)
+        encoded = encode_texts([texts_by_id[object_id] for object_id in stale_ids], model=model)
+
+        to_create, to_update = [], []
+        for object_id, vector in zip(stale_ids, encoded):
+            vectors[object_id] = vector
+            row = stored.get(object_id)
+            if row is None:
+                to_create.append(StoredEmbedding(
+                    kind=kind,
+                    object_id=object_id,
+                    model_name=model_name,
+                    content_hash=hashes[object_id],
+                    dim=vector.shape[0],
+                    vector=vector.tobytes(),
+                ))
+            else:
+                row.content_hash = hashes[object_id]
+                row.dim = vector.shape[0]
+                row.vector = vector.tobytes()
+                row.updated_at = timezone.now()  # bulk_update skips auto_now
+                to_update.append(row)
+
+        if to_create:
+            StoredEmbedding.objects.bulk_create(to_create, batch_size=LOOKUP_CHUNK_SIZE)
+        if to_update:
+            StoredEmbedding.objects.bulk_update(to_update, ['content_hash', 'dim', 'vector', 'updated_at'],
+                                                batch_size=LOOKUP_CHUNK_SIZE)
+
+        # Keep any already-built similarity index in this process current
+        update_indexes(kind, model_name, stale_ids, encoded)
+
+    return np.vstack([vectors[object_id] for object_id in object_ids])
+
+
+def delete_embeddings(kind, object_id):
+    """Remove every stored vector for one object (all models)."""
+    StoredEmbedding.objects.filter(kind=kind, object_id=object_id).delete()
+    remove_from_indexes(kind, [object_id])
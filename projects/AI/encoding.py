@@ -0,0 +1,122 @@
+# encoding.py
+#
+# Encoding service for the AI matcher. Every text that gets embedded goes through
+# encode_texts(), which
+# - caps torch intra-op threads (AI_MATCHING_THREADS) so workers sharing a box with
+#   the web tier use a predictable amount of CPU,
+# - truncates each text to the model's max sequence length before tokenizing,
+# - sorts texts by length so each batch pads to a similar size, and encodes them in
+#   batches of AI_MATCHING_ENCODE_BATCH_SIZE,
+# - keeps throughput counters (texts per second, see get_stats()); each call is only
+#   logged at DEBUG level.
+
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Texts per encoder forward pass when AI_MATCHING_ENCODE_BATCH_SIZE is not set
+DEFAULT_ENCODE_BATCH_SIZE = 64
+# Sequence length assumed for encoders that do not expose max_seq_length
+DEFAULT_MAX_SEQ_LENGTH = 128
+
+_lock = threading.Lock()
+_threads_configured = False
+_stats = {"calls": 0, "texts": 0, "seconds": 0.0}
+
+
+def configure_threads(num_threads=None):
+    """
+    Cap torch intra-op threads for this process (settings.AI_MATCHING_THREADS).
+    Only the first call has an effect; 0 or None leaves torch's default alone.
+    """
+    global _threads_configured
+    num_threads = num_threads if num_threads is not None else getattr(settings, "AI_MATCHING_THREADS", None)
+    with _lock:
+        if _threads_configured:
+            return
+        _threads_configured = True
+    if num_threads:
+        import torch
+        torch.set_num_threads(int(num_threads))
+
+
+def max_seq_length(model):
+    """Return the number of tokens the encoder looks at per text."""
+    return getattr(model, "max_seq_length", None) or DEFAULT_MAX_SEQ_LENGTH
+
+
+def truncate(text, max_tokens):
+    """
+    Cut a text to its first max_tokens words.
+    Every word is at least one token, so nothing the model would have seen is dropped,
+    while long abstracts no longer get tokenized in full only to be truncated afterwards.
+    """
+    words = text.split()
+    if len(words) <= max_tokens:
+        return text
+    return " ".join(words[:max_tokens])
+
+
+def encode_texts(texts, model=None, batch_size=None):
+    """
+    Encode texts into a float32 matrix with one row per text, in input order.
+    - model: encoder to use (defaults to the registry model).
+    - batch_size: texts per forward pass (defaults to settings.AI_MATCHING_ENCODE_BATCH_SIZE).
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    if model is None:
+        from projects.AI.model_registry import get_model
+        model = get_model()
+    batch_size = batch_size or getattr(settings, "AI_MATCHING_ENCODE_BATCH_SIZE", DEFAULT_ENCODE_BATCH_SIZE)
+    configure_threads()
+
+    # Truncate, then encode longest-first so each batch holds texts of similar length
+    limit = max_seq_length(model)
+    texts = [truncate(text, limit) for text in texts]
+    order = sorted(range(len(texts)), key=lambda position: len(texts[position].split()), reverse=True)
+
+    start = time.perf_counter()
+    encoded = np.asarray(
+        model.encode([texts[position] for position in order], batch_size=batch_size,
+                     convert_to_numpy=True, show_progress_bar=False),
+        dtype=np.float32,
+    )
+    elapsed = time.perf_counter() - start
+
+    vectors = np.empty_like(encoded)
+    vectors[order] = encoded
+
+    with _lock:
+        _stats["calls"] += 1
+        _stats["texts"] += len(texts)
+        _stats["seconds"] += elapsed
+    logger.debug("Encoded %d texts in %.2fs (%.1f texts/sec)", len(texts), elapsed, len(texts) / max(elapsed, 1e-9))
+    return vectors
+
+
+def get_stats():
+    """Return encoder calls, texts, seconds and overall texts per second for this process."""
+    with _lock:
+        seconds = _stats["seconds"]
+        return {
+            "calls": _stats["calls"],
+            "texts": _stats["texts"],
+            "seconds": seconds,
+            "texts_per_second": _stats["texts"] / seconds if seconds else 0.0,
+        }
+
+
+def reset_stats():
+    """Zero the throughput counters."""
+    with _lock:
+        _stats["calls"] = 0
+        _stats["texts"] = 0
+        _stats["seconds"] = 0.0
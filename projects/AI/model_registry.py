@@ -0,0 +1,153 @@
+# model_registry.py
+#
+# Process-wide cache of SentenceTransformer encoders used by the AI matcher.
+# Each (model name, device) pair is loaded at most once per process; every
+# later call returns the already-loaded instance.
+#
+# AI_MATCHING_BACKEND selects how the encoder runs on CPU:
+# - "torch": the float model as published.
+# - "onnx": an ONNX export run by onnxruntime (needs optimum[onnxruntime]); point
+#   AI_MATCHING_MODEL_PATH at a local export and AI_MATCHING_ONNX_FILE at e.g. an
+#   int8-quantized file inside it (see `manage.py export_matching_model`).
+# - "int8": the torch model with its Linear layers dynamically quantized to int8.
+# Non-torch backends are cached and stored under "<model name>:<backend>", so their
+# vectors never get mixed with those of the float model.
+
+import importlib.util
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Model used when AI_MATCHING_MODEL is not set
+DEFAULT_MODEL_NAME = "paraphrase-MiniLM-L6-v2"
+# Device used when AI_MATCHING_DEVICE is not set
+DEFAULT_DEVICE = "cpu"
+# Inference backend used when AI_MATCHING_BACKEND is not set
+DEFAULT_BACKEND = "torch"
+BACKENDS = ("torch", "onnx", "int8")
+
+
+def SentenceTransformer(*args, **kwargs):
+    """Build a sentence_transformers.SentenceTransformer, importing it (and torch) on first use only."""
+    from sentence_transformers import SentenceTransformer as loader
+    return loader(*args, **kwargs)
+
+
+_models = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "load_seconds": {}}
+
+
+def _split_backend(name):
+    """Split "<model>:<backend>" into (model, backend); plain names give (name, None)."""
+    base, _, backend = name.rpartition(":")
+    if base and backend in BACKENDS:
+        return base, backend
+    return name, None
+
+
+def _resolve(name=None, device=None, backend=None):
+    """Fill in the model name and device from settings when not given."""
+    name = name or getattr(settings, "AI_MATCHING_MODEL", DEFAULT_MODEL_NAME)
+    device = device or getattr(settings, "AI_MATCHING_DEVICE", DEFAULT_DEVICE)
+    name, named_backend = _split_backend(name)
+    backend = backend or named_backend or getattr(settings, "AI_MATCHING_BACKEND", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(
+            f"Unknown AI_MATCHING_BACKEND '{backend}'. Choose one of: {', '.join(BACKENDS)}."
+        )
+    if backend != DEFAULT_BACKEND:
+        name = f"{name}:{backend}"
+    return name, device
+
+
+def get_model_name(name=None, backend=None):
+    """Return the model name that get_model() would load for the given argument."""
+    return _resolve(name, backend=backend)[0]
+
+
+def _load(name, device):
+    """Build the encoder for a resolved (name, device) key."""
+    name, backend = _split_backend(name)
+    if backend is None:
+        return SentenceTransformer(name, device=device)
+
+    path = getattr(settings, "AI_MATCHING_MODEL_PATH", None) or name
+    if backend == "onnx":
+        if importlib.util.find_spec("onnxruntime") is None or importlib.util.find_spec("optimum") is None:
+            raise ImproperlyConfigured(
+                "AI_MATCHING_BACKEND = 'onnx' requires onnxruntime and optimum (pip install optimum[onnxruntime])."
+            )
+        file_name = getattr(settings, "AI_MATCHING_ONNX_FILE", None)
+        model_kwargs = {"file_name": file_name} if file_name else None
+        return SentenceTransformer(path, device=device, backend="onnx", model_kwargs=model_kwargs)
+
+    # int8: quantize the Linear layers of the float model in place (CPU only)
+    import torch
+    model = SentenceTransformer(path, device="cpu")
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def get_model(name=None, device=None, backend=None):
+    """
+    Return the encoder for (name, device), loading it on first use only.
+    - name: model name or local path (defaults to settings.AI_MATCHING_MODEL).
+    - device: torch device string (defaults to settings.AI_MATCHING_DEVICE).
+    - backend: "torch", "onnx" or "int8" (defaults to settings.AI_MATCHING_BACKEND).
+    """
+    key = _resolve(name, device, backend)
+
+    model = _models.get(key)
+    if model is not None:
+        with _lock:
+            _stats["hits"] += 1
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited for the lock
+        model = _models.get(key)
+        if model is not None:
+            _stats["hits"] += 1
+            return model
+
+        _stats["misses"] += 1
+        start = time.perf_counter()
+        model = _load(*key)
+        _stats["load_seconds"][key] = time.perf_counter() - start
+        _models[key] = model
+    return model
+
+
+def register_model(model, name=None, device=None, backend=None):
+    """Put an already-built encoder into the cache (e.g. a local copy or a test double)."""
+    key = _resolve(name, device, backend)
+    with _lock:
+        _models[key] = model
+    return model
+
+
+def warm_up(name=None, device=None, backend=None):
+    """Load the configured encoder ahead of the first matching run."""
+    return get_model(name, device, backend)
+
+
+def get_stats():
+    """Return a snapshot of cache hits, misses and per-model load times (seconds)."""
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "load_seconds": dict(_stats["load_seconds"]),
+            "loaded": list(_models),
+        }
+
+
+def clear():
+    """Drop every cached encoder and reset the counters."""
+    with _lock:
+        _models.clear()
+        _stats["hits"] = 0
+        _stats["misses"] = 0
+        _stats["load_seconds"] = {}
@@ -1,11 +1,16 @@
 # core/nlp.py
 
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
-from sentence_transformers import SentenceTransformer, util
+from scipy import sparse
 
 from projects.models import Project, Publication, MatchRequest
+from projects.AI.model_registry import get_model
+from projects.AI.embedding_store import sync_embeddings
+from projects.AI.vector_index import papers_for_project, projects_for_paper
+from projects.AI.author_index import author_names, project_author_ids, publication_author_ids
 
 # Function to clean a text string by removing punctuation, digits, extra spaces, and converting to lowercase
 def clean_text(text):
@@ -17,92 +22,234 @@ def clean_text(text):
     text = re.sub(r"\s+", " ", text).strip()   # Replace multiple spaces with single space
     return text
 
-# Function to normalize a list of author names
-def normalize_authors(authors_list):
-    if isinstance(authors_list, float) or pd.isna(authors_list):
-        return []
-    if isinstance(authors_list, str):
-        try:
-            authors_list = eval(authors_list)
-        except:
-            authors_list = []
-    if not isinstance(authors_list, (list, tuple)):
-        return []
-    return [clean_text(a) for a in authors_list]
-
-# Main function to match projects and publications (papers) using NLP similarity and shared authors
-def match_projects_and_papers(publication=None, user=None, threshold=0.65, top_k=3):
-    # Fetch all projects and papers from the database
-    projects = Project.objects.all().values("id", "title", "team", "created")
-    papers = Publication.objects.all().values("id", "title", "abstract", "collaborators", "uploaded_at")
-
-    if not projects or not papers:
-        return
+# Text encoded for each project row ("title" column)
+def project_texts(projects_df):
+    return projects_df["title"].apply(clean_text)
+
+# Text encoded for each publication row ("title", "abstract", "body_text__text" columns):
+# the cleaned parts joined with ". ", skipping empty ones
+def paper_texts(papers_df):
+    # The placeholder abstract carries no signal, so it is left out of the encoded text
+    abstracts = papers_df["abstract"].where(papers_df["abstract"] != Publication._meta.get_field("abstract").default)
+    parts = zip(
+        papers_df["title"].apply(clean_text),
+        abstracts.apply(clean_text),
+        # First words of the uploaded file's body (see text_extraction.py); empty until extracted
+        papers_df["body_text__text"].apply(clean_text),
+    )
+    return pd.Series([". ".join(part for part in row if part) for row in parts], index=papers_df.index, dtype=object)
+
+# Load all projects into a cleaned DataFrame together with their (cached) title embeddings
+def load_projects(model):
+    projects = Project.objects.all().values("id", "title", "created")
+    if not projects:
+        return None, None
 
-    # Convert projects and papers to pandas DataFrames for easier manipulation
     projects_df = pd.DataFrame(projects)
+
+    # Clean and preprocess project fields; team members come pre-resolved to Author ids
+    projects_df["clean_title"] = project_texts(projects_df)
+    team_ids = project_author_ids()
+    projects_df["author_ids"] = [team_ids.get(project_id, set()) for project_id in projects_df["id"]]
+    projects_df["created"] = pd.to_datetime(projects_df["created"], utc=True)
+
+    # Only projects whose cleaned title changed since the last run are re-encoded
+    project_embeddings = sync_embeddings(
+        "project", dict(zip(projects_df["id"], projects_df["clean_title"])), model=model
+    )
+    return projects_df, project_embeddings
+
+# Load publications (all, or only the given ids) into a cleaned DataFrame with their embeddings
+def load_papers(model, publication_ids=None):
+    papers = Publication.objects.all()
+    if publication_ids is not None:
+        papers = papers.filter(id__in=publication_ids)
+    papers = papers.values("id", "title", "abstract", "uploaded_at", "body_text__text")
+    if not papers:
+        return None, None
+
+    # One row per publication; its authors are aggregated separately
     papers_df = pd.DataFrame(papers)
 
-    # Clean and preprocess project fields
-    projects_df["clean_title"] = projects_df["title"].apply(clean_text)
-    projects_df["normalized_authors"] = projects_df["team"].apply(normalize_authors)
-    projects_df["created"] = pd.to_datetime(projects_df["created"])
-
-    # Clean and preprocess paper fields
-    papers_df["clean_title"] = papers_df["title"].apply(clean_text)
-    papers_df["clean_abstract"] = papers_df["abstract"].apply(clean_text)
-    papers_df["normalized_authors"] = papers_df["collaborators"].apply(normalize_authors)
-    papers_df["published_date"] = pd.to_datetime(papers_df["uploaded_at"])
-    papers_df["combined_text"] = papers_df["clean_title"] + ". " + papers_df["clean_abstract"]
-
-    # Load a pre-trained NLP sentence transformer model for semantic similarity
-    model = SentenceTransformer("paraphrase-MiniLM-L6-v2")
-
-    # Encode project titles and paper combined texts into embedding vectors
-    project_embeddings = model.encode(projects_df["clean_title"].tolist(), convert_to_tensor=True)
-    paper_embeddings = model.encode(papers_df["combined_text"].tolist(), convert_to_tensor=True)
-
-    matched_papers = []  # List to store details of matched papers
-
-    # For each project, find top_k most similar papers
-    for i in range(len(projects_df)):
-        project = projects_df.iloc[i]
-        similarities = util.cos_sim(project_embeddings[i], paper_embeddings)[0]  # Cosine similarity vector
-        top_indices = similarities.argsort(descending=True)[:top_k]  # Indices of top_k similar papers
-
-        for idx in top_indices:
-            paper = papers_df.iloc[idx.item()]
-            paper_date = paper["published_date"]
-            project_date = project["created"]
-
-            # Only match papers published after the project's acceptance date
-            if paper_date > project_date:
-                # Find shared authors between project and paper
-                shared_authors = set(project["normalized_authors"]) & set(paper["normalized_authors"])
-                if shared_authors:
-                    similarity = similarities[idx].item()
-                    # Only save matches above the similarity threshold
-                    if similarity >= threshold:
-                        # Create a MatchRequest record in the database
-                        MatchRequest.objects.create(
-                            project_id=project["id"],
-                            publication_id=paper["id"],
-                            match_title=paper["title"],
-                            match_score=round(similarity, 4),
-                            match_authors=", ".join(shared_authors),
-                            approved=None  # Not reviewed yet
-                        )
-
-                        # Add match details to the results list
-                        matched_papers.append({
-                            "project_title": project["title"],
-                            "paper_title": paper["title"],
-                            "similarity": round(similarity, 4),
-                            "shared_authors": list(shared_authors)
-                        })
-                    break
+    # Clean and preprocess paper fields into the encoded text
+    papers_df["combined_text"] = paper_texts(papers_df)
+    paper_author_ids = publication_author_ids(publication_ids)
+    papers_df["author_ids"] = [paper_author_ids.get(paper_id, set()) for paper_id in papers_df["id"]]
+    papers_df["published_date"] = pd.to_datetime(papers_df["uploaded_at"], utc=True)
+
+    # Only papers whose cleaned title + abstract + body changed since the last run are re-encoded
+    paper_embeddings = sync_embeddings(
+        "publication", dict(zip(papers_df["id"], papers_df["combined_text"])), model=model
+    )
+    return papers_df, paper_embeddings
+
+# Map ids to their row positions in row_ids (first occurrence); ids that are not present map to -1
+def rows_for_ids(row_ids, ids):
+    row_ids = np.asarray(row_ids, dtype=np.int64)
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(row_ids) == 0:
+        return np.full(ids.shape, -1, dtype=np.int64)
+    order = np.argsort(row_ids, kind="stable")
+    sorted_ids = row_ids[order]
+    positions = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+    return np.where(sorted_ids[positions] == ids, order[positions], -1)
+
+# Build sparse row x author incidence matrices for projects and papers over one shared vocabulary
+def author_incidence(project_authors, paper_authors):
+    vocabulary = {}
+    for authors in list(project_authors) + list(paper_authors):
+        for author in authors:
+            if author:
+                vocabulary.setdefault(author, len(vocabulary))
+
+    def incidence(author_lists):
+        indptr, indices = [0], []
+        for authors in author_lists:
+            indices.extend(sorted({vocabulary[author] for author in authors if author}))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(author_lists), max(len(vocabulary), 1)))
+
+    return incidence(list(project_authors)), incidence(list(paper_authors))
+
+# Evaluate every candidate (project, paper) pair at once with boolean masks.
+# project_rows / paper_rows are equally-shaped arrays of DataFrame row positions (-1 = missing).
+# Returns a mask of pairs that are valid, dated after the project and share at least one author.
+def eligible_pairs(projects_df, papers_df, project_rows, paper_rows):
+    valid = (project_rows >= 0) & (paper_rows >= 0)
+    safe_projects = np.where(valid, project_rows, 0)
+    safe_papers = np.where(valid, paper_rows, 0)
+
+    # Only match papers published after the project's acceptance date
+    project_dates = projects_df["created"].dt.tz_convert(None).to_numpy()
+    paper_dates = papers_df["published_date"].dt.tz_convert(None).to_numpy()
+    dated_after = paper_dates[safe_papers] > project_dates[safe_projects]
+
+    # Count shared authors as the row-wise dot product of the two incidence matrices
+    project_incidence, paper_incidence = author_incidence(
+        projects_df["author_ids"], papers_df["author_ids"]
+    )
+    shared = project_incidence[safe_projects.ravel()].multiply(paper_incidence[safe_papers.ravel()])
+    has_shared = np.asarray(shared.sum(axis=1)).reshape(project_rows.shape) > 0
+
+    return valid & dated_after & has_shared
+
+# Upsert MatchRequests for the surviving (project row, paper row, score) triples in one query.
+# An existing request for the same pair keeps its review status and gets the new score and authors.
+def record_matches(projects_df, papers_df, project_rows, paper_rows, scores):
+    matched_papers = {}  # (project id, publication id) -> details of the matched paper
+    match_requests = {}  # (project id, publication id) -> MatchRequest, best score wins
+    shared_ids = {}      # (project id, publication id) -> shared Author ids
+    for project_row, paper_row, similarity in zip(project_rows, paper_rows, scores):
+        project = projects_df.iloc[project_row]
+        paper = papers_df.iloc[paper_row]
+        similarity = round(float(similarity), 4)
+
+        pair = (int(project["id"]), int(paper["id"]))
+        if pair in match_requests and match_requests[pair].match_score >= similarity:
+            continue
+        shared_ids[pair] = set(project["author_ids"]) & set(paper["author_ids"])
+        match_requests[pair] = MatchRequest(
+            project_id=pair[0],
+            publication_id=pair[1],
+            match_title=paper["title"],
+            match_score=similarity,
+            approved=None  # Not reviewed yet
+        )
+
+        # Add match details to the results
+        matched_papers[pair] = {
+            "project_title": project["title"],
+            "paper_title": paper["title"],
+            "similarity": similarity,
+        }
+
+    # Resolve the shared author ids of every surviving pair to names in one query
+    names = author_names(set().union(*shared_ids.values()))
+    for pair, author_ids in shared_ids.items():
+        shared_authors = sorted(names[author_id] for author_id in author_ids if author_id in names)
+        match_requests[pair].match_authors = ", ".join(shared_authors)
+        matched_papers[pair]["shared_authors"] = shared_authors
+
+    if match_requests:
+        MatchRequest.objects.bulk_create(
+            list(match_requests.values()),
+            update_conflicts=True,
+            unique_fields=['project', 'publication'],
+            update_fields=['match_title', 'match_score', 'match_authors'],
+        )
+    return list(matched_papers.values())
+
+# Incremental mode: score the given publications against every project.
+# Cost grows with the number of projects only; project vectors come from the embedding store
+# and the new publications are encoded together in one batch.
+# Returns (matches DataFrame, {publication_id: best project similarity}).
+def match_publications(publication_ids, threshold=0.65, top_k=3):
+    model = get_model()
+
+    projects_df, project_embeddings = load_projects(model)
+    papers_df, paper_embeddings = load_papers(model, publication_ids=publication_ids)
+    if projects_df is None or papers_df is None:
+        return pd.DataFrame(), {}
+
+    # Ask the project index for the top_k most similar projects of every paper (papers x k)
+    top_ids, top_scores = projects_for_paper(paper_embeddings, top_k)
+    if top_ids is None or top_ids.shape[1] == 0:
+        return pd.DataFrame(), {}
+    project_rows = rows_for_ids(projects_df["id"], top_ids)
+    paper_rows = np.broadcast_to(np.arange(len(papers_df))[:, None], project_rows.shape)
+
+    # Keep every top_k candidate that passes the date, shared-author and threshold masks
+    keep = eligible_pairs(projects_df, papers_df, project_rows, paper_rows) & (top_scores >= threshold)
+    matched_papers = record_matches(
+        projects_df, papers_df, project_rows[keep], paper_rows[keep], top_scores[keep]
+    )
+
+    best_scores = {}  # Highest project similarity per publication
+    for paper_id, score in zip(papers_df["id"], top_scores[:, 0]):
+        best_scores[int(paper_id)] = round(float(score), 4)
+
+    return pd.DataFrame(matched_papers), best_scores
+
+# Incremental mode for a single publication
+def match_publication(publication, threshold=0.65, top_k=3):
+    matched_df, _ = match_publications([publication.pk], threshold=threshold, top_k=top_k)
+    return matched_df
+
+# Batch mode: sweep the full projects x papers corpus
+def match_all_projects_and_papers(threshold=0.65, top_k=3):
+    model = get_model()
+
+    projects_df, project_embeddings = load_projects(model)
+    papers_df, paper_embeddings = load_papers(model)
+    if projects_df is None or papers_df is None:
+        return
+
+    # For each project, ask the paper index for the top_k most similar papers (projects x k)
+    top_ids, top_scores = papers_for_project(project_embeddings, top_k)
+    if top_ids is None or top_ids.shape[1] == 0:
+        return pd.DataFrame()
+    paper_rows = rows_for_ids(papers_df["id"], top_ids)
+    project_rows = np.broadcast_to(np.arange(len(projects_df))[:, None], paper_rows.shape)
+
+    # Per project, take the best-ranked candidate that passes the date and shared-author masks,
+    # and keep it only if it also clears the similarity threshold
+    eligible = eligible_pairs(projects_df, papers_df, project_rows, paper_rows)
+    chosen = np.arange(len(projects_df))
+    first = eligible.argmax(axis=1)
+    keep = eligible.any(axis=1) & (top_scores[chosen, first] >= threshold)
+    matched_papers = record_matches(
+        projects_df, papers_df, chosen[keep], paper_rows[chosen, first][keep], top_scores[chosen, first][keep]
+    )
 
     # Save matched results to a CSV file for inspection
     matched_df = pd.DataFrame(matched_papers)
     matched_df.to_csv("matched_projects_papers.csv", index=False)
-    return matched_df
\ No newline at end of file
+    return matched_df
+
+# Main entry point to match projects and publications (papers) using NLP similarity and shared authors.
+# With a publication, only that publication is scored (incremental mode); without one, the whole corpus is swept.
+def match_projects_and_papers(publication=None, user=None, threshold=0.65, top_k=3):
+    if publication is not None:
+        return match_publication(publication, threshold=threshold, top_k=top_k)
+    return match_all_projects_and_papers(threshold=threshold, top_k=top_k)
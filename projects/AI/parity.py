@@ -0,0 +1,53 @@
+# parity.py
+#
+# Compares an alternative encoder backend (ONNX, int8) with the float model on our
+# own corpus: the top-k projects found for each publication should mostly agree,
+# and vectors for the same text should stay close.
+
+import time
+
+import numpy as np
+
+from projects.AI.encoding import encode_texts
+from projects.AI.vector_index import ExactIndex
+
+
+def _timed_encode(model, texts):
+    start = time.perf_counter()
+    vectors = encode_texts(texts, model=model)
+    return vectors, time.perf_counter() - start
+
+
+def compare_encoders(reference, candidate, project_texts, paper_texts, k=5):
+    """
+    Encode the same corpus with both encoders and compare the results.
+    Returns a dict with:
+    - overlap: mean fraction of each paper's top-k projects that both encoders agree on.
+    - min_cosine / mean_cosine: similarity between the two vectors of the same text.
+    - reference_seconds / candidate_seconds / speedup: encoding time of the whole corpus.
+    """
+    texts = list(project_texts) + list(paper_texts)
+    reference_vectors, reference_seconds = _timed_encode(reference, texts)
+    candidate_vectors, candidate_seconds = _timed_encode(candidate, texts)
+
+    overlaps = []
+    if project_texts and paper_texts:
+        top_ids = []
+        for vectors in (reference_vectors, candidate_vectors):
+            index = ExactIndex(vectors.shape[1])
+            index.upsert(range(len(project_texts)), vectors[:len(project_texts)])
+            top_ids.append(index.search(vectors[len(project_texts):], k)[0])
+        for reference_top, candidate_top in zip(*top_ids):
+            overlaps.append(len(set(reference_top) & set(candidate_top)) / len(reference_top))
+
+    norms = np.linalg.norm(reference_vectors, axis=1) * np.linalg.norm(candidate_vectors, axis=1)
+    cosines = (reference_vectors * candidate_vectors).sum(axis=1) / np.where(norms == 0, 1.0, norms)
+
+    return {
+        "overlap": float(np.mean(overlaps)) if overlaps else 1.0,
+        "min_cosine": float(cosines.min()) if len(cosines) else 1.0,
+        "mean_cosine": float(cosines.mean()) if len(cosines) else 1.0,
+        "reference_seconds": reference_seconds,
+        "candidate_seconds": candidate_seconds,
+        "speedup": reference_seconds / candidate_seconds if candidate_seconds else 0.0,
+    }
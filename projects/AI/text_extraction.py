@@ -0,0 +1,157 @@
+# text_extraction.py
+#
+# Extracts body text from uploaded publication PDFs as an extra matching signal.
+# - Files are hashed in chunks and parsed page by page, stopping once enough words
+#   have been collected, so memory stays bounded however large the PDF is.
+# - Results are cached in PublicationText keyed by the file's SHA-1, so a file is
+#   parsed once no matter how many publications (or re-uploads) share it.
+# - hash_file() / extract_file() never touch the database and can run in a
+#   process pool; extract_publication_texts() does the bookkeeping.
+
+import hashlib
+import importlib.util
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from projects.models import Publication, PublicationText
+
+logger = logging.getLogger(__name__)
+
+# Words of body text kept per file when AI_MATCHING_BODY_TOKENS is not set
+DEFAULT_BODY_TOKENS = 256
+# Bytes read per chunk while hashing
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def body_token_limit():
+    return getattr(settings, "AI_MATCHING_BODY_TOKENS", DEFAULT_BODY_TOKENS)
+
+
+def hash_file(path):
+    """SHA-1 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pdf_support():
+    """True if pypdf, which extract_file() needs, is installed."""
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def extract_file(path, max_tokens=DEFAULT_BODY_TOKENS):
+    """
+    Return {"text", "pages", "error"} for a PDF.
+    Pages are read one at a time and reading stops after max_tokens words.
+    Unreadable files give empty text and the error message instead of raising.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImproperlyConfigured("PDF text extraction requires the pypdf package (pip install pypdf).")
+
+    # pypdf logs every recoverable syntax problem; the outcome is reported through "error"
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    words, pages = [], 0
+    try:
+        with open(path, "rb") as handle:
+            reader = PdfReader(handle)
+            for page in reader.pages:
+                pages += 1
+                words.extend((page.extract_text() or "").split())
+                if len(words) >= max_tokens:
+                    break
+    except Exception as e:
+        return {"text": " ".join(words[:max_tokens]), "pages": pages, "error": str(e) or type(e).__name__}
+    return {"text": " ".join(words[:max_tokens]), "pages": pages, "error": ""}
+
+
+def _map(function, items, workers):
+    """Run function over items, in a process pool when workers > 1."""
+    if workers > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(function, items, chunksize=max(1, len(items) // (workers * 4))))
+    return [function(item) for item in items]
+
+
+def _hash(path):
+    try:
+        return hash_file(path)
+    except OSError:
+        return None  # Missing or unreadable upload
+
+
+def _extract(args):
+    path, max_tokens = args
+    return extract_file(path, max_tokens)
+
+
+def extract_publication_texts(publications=None, workers=1, refresh=False):
+    """
+    Link publications with an uploaded file to the cached text of that file.
+    - publications: queryset to consider (defaults to every publication with a file).
+    - workers: processes used for hashing and parsing.
+    - refresh: re-hash files of publications that are already linked (e.g. after a re-upload),
+      and unlink publications whose file was removed.
+    Only files whose hash is not cached yet get parsed.
+    Returns (publications linked, files parsed).
+    """
+    if not pdf_support():
+        # Matching still runs on title and abstract; body text is linked once pypdf is installed
+        logger.warning("pypdf is not installed: skipping PDF text extraction (pip install pypdf)")
+        return 0, 0
+
+    publications = publications if publications is not None else Publication.objects.all()
+    if refresh:
+        publications.filter(file="", body_text__isnull=False).update(body_text=None)
+    publications = publications.exclude(file="")
+    if not refresh:
+        publications = publications.filter(body_text__isnull=True)
+
+    paths = {}
+    for publication in publications.only("id", "file"):
+        try:
+            paths[publication.id] = publication.file.path
+        except (NotImplementedError, ValueError):
+            continue  # Storage without local paths
+
+    publication_ids = list(paths)
+    hashes = {
+        publication_id: content_hash
+        for publication_id, content_hash in zip(publication_ids, _map(_hash, list(paths.values()), workers))
+        if content_hash is not None
+    }
+
+    cached = set(PublicationText.objects.filter(content_hash__in=set(hashes.values()))
+                 .values_list("content_hash", flat=True))
+    to_parse = {}  # content hash -> path of one file with that content
+    for publication_id, content_hash in hashes.items():
+        if content_hash not in cached:
+            to_parse.setdefault(content_hash, paths[publication_id])
+
+    max_tokens = body_token_limit()
+    parsed = _map(_extract, [(path, max_tokens) for path in to_parse.values()], workers)
+    PublicationText.objects.bulk_create(
+        [
+            PublicationText(content_hash=content_hash, text=result["text"], pages=result["pages"],
+                            token_count=len(result["text"].split()), error=result["error"])
+            for content_hash, result in zip(to_parse, parsed)
+        ],
+        ignore_conflicts=True,  # Another worker may have parsed the same file meanwhile
+    )
+
+    texts = dict(PublicationText.objects.filter(content_hash__in=set(hashes.values()))
+                 .values_list("content_hash", "id"))
+    publications_by_text = {}
+    for publication_id, content_hash in hashes.items():
+        publications_by_text.setdefault(texts[content_hash], []).append(publication_id)
+    # Queryset updates so linking text doesn't fire post_save and re-queue matching
+    for text_id, ids in publications_by_text.items():
+        Publication.objects.filter(id__in=ids).update(body_text_id=text_id)
+    return len(hashes), len(to_parse)
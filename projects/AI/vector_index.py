@@ -0,0 +1,274 @@
+# vector_index.py
+#
+# Pluggable top-k cosine search over the stored matcher embeddings.
+# - ExactIndex: NumPy brute force, always available.
+# - HNSWIndex: approximate nearest neighbours via hnswlib (optional dependency, CPU only).
+# Indexes are built once per process from the StoredEmbedding table and then kept
+# current incrementally: rows written by this process are pushed in directly,
+# rows written by other processes are picked up by their updated_at watermark, and
+# ids whose rows another process deleted are dropped once the stored count differs.
+
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from projects.models import StoredEmbedding
+from projects.AI.model_registry import get_model_name
+
+# Backend used when AI_MATCHING_INDEX_BACKEND is not set
+DEFAULT_BACKEND = "exact"
+# HNSW parameters used when AI_MATCHING_HNSW does not override them
+DEFAULT_HNSW_PARAMS = {"M": 16, "ef_construction": 200, "ef": 64}
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ExactIndex:
+    """Brute-force cosine index: one matrix product per query batch."""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def ids(self):
+        """Set of ids currently in the index."""
+        return set(self._positions)
+
+    def upsert(self, ids, vectors):
+        """Add new ids and overwrite the vectors of existing ones."""
+        vectors = _normalize(vectors)
+        new_ids, new_rows = [], []
+        for object_id, vector in zip(ids, vectors):
+            position = self._positions.get(int(object_id))
+            if position is None:
+                new_ids.append(int(object_id))
+                new_rows.append(vector)
+            else:
+                self._vectors[position] = vector
+        if new_ids:
+            start = len(self._ids)
+            self._ids = np.concatenate([self._ids, np.asarray(new_ids, dtype=np.int64)])
+            self._vectors = np.vstack([self._vectors, np.asarray(new_rows, dtype=np.float32)])
+            for offset, object_id in enumerate(new_ids):
+                self._positions[object_id] = start + offset
+
+    def remove(self, ids):
+        """Drop ids from the index (unknown ids are ignored)."""
+        drop = {int(object_id) for object_id in ids} & set(self._positions)
+        if not drop:
+            return
+        keep = np.array([int(object_id) not in drop for object_id in self._ids], dtype=bool)
+        self._ids = self._ids[keep]
+        self._vectors = self._vectors[keep]
+        self._positions = {int(object_id): position for position, object_id in enumerate(self._ids)}
+
+    def search(self, queries, k):
+        """
+        Return (ids, scores), each shaped (len(queries), k'), best match first.
+        k' is min(k, len(index)); scores are cosine similarities.
+        """
+        queries = _normalize(queries)
+        k = min(k, len(self._ids))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+
+        scores = queries @ self._vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return self._ids[top], np.take_along_axis(top_scores, order, axis=1)
+
+
+class HNSWIndex:
+    """Approximate cosine index backed by an hnswlib HNSW graph."""
+
+    def __init__(self, dim, M=16, ef_construction=200, ef=64, initial_capacity=1024):
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImproperlyConfigured(
+                "AI_MATCHING_INDEX_BACKEND = 'hnsw' requires the hnswlib package (pip install hnswlib)."
+            )
+        self.dim = dim
+        self.ef = ef
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=initial_capacity, ef_construction=ef_construction, M=M,
+                               allow_replace_deleted=True)
+        self._index.set_ef(ef)
+        self._live = set()
+
+    def __len__(self):
+        return len(self._live)
+
+    def ids(self):
+        """Set of ids currently in the index."""
+        return set(self._live)
+
+    def upsert(self, ids, vectors):
+        """Add new ids and overwrite the vectors of existing ones."""
+        ids = [int(object_id) for object_id in ids]
+        if not ids:
+            return
+        needed = self._index.get_current_count() + len(ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        vectors = _normalize(vectors)
+        existing = np.array([object_id in self._live for object_id in ids], dtype=bool)
+        labels = np.asarray(ids, dtype=np.int64)
+        if existing.any():
+            # Live labels are updated in place
+            self._index.add_items(vectors[existing], labels[existing])
+        if (~existing).any():
+            # New labels may reuse the slots of removed ones
+            self._index.add_items(vectors[~existing], labels[~existing], replace_deleted=True)
+        self._live.update(ids)
+
+    def remove(self, ids):
+        """Drop ids from the index (unknown ids are ignored)."""
+        for object_id in {int(object_id) for object_id in ids} & self._live:
+            self._index.mark_deleted(object_id)
+            self._live.discard(object_id)
+
+    def search(self, queries, k):
+        """
+        Return (ids, scores), each shaped (len(queries), k'), best match first.
+        k' is min(k, len(index)); scores are cosine similarities.
+        """
+        queries = _normalize(queries)
+        k = min(k, len(self._live))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        self._index.set_ef(max(self.ef, k))
+        labels, distances = self._index.knn_query(queries, k=k)
+        # Inner-product "distance" is 1 - dot product
+        return labels.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+
+BACKENDS = {
+    "exact": ExactIndex,
+    "hnsw": HNSWIndex,
+}
+
+_indexes = {}
+_watermarks = {}
+_lock = threading.Lock()
+
+
+def _backend_name(backend=None):
+    backend = backend or getattr(settings, "AI_MATCHING_INDEX_BACKEND", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(
+            f"Unknown AI_MATCHING_INDEX_BACKEND '{backend}'. Choose one of: {', '.join(BACKENDS)}."
+        )
+    return backend
+
+
+def _new_index(backend, dim):
+    if backend == "hnsw":
+        params = dict(DEFAULT_HNSW_PARAMS, **getattr(settings, "AI_MATCHING_HNSW", {}))
+        return HNSWIndex(dim, **params)
+    return BACKENDS[backend](dim)
+
+
+def _load_rows(kind, model_name, since=None):
+    rows = StoredEmbedding.objects.filter(kind=kind, model_name=model_name)
+    if since is not None:
+        rows = rows.filter(updated_at__gte=since)
+    return rows.values_list("object_id", "dim", "vector", "updated_at").order_by("updated_at").iterator()
+
+
+def _apply_rows(key, index, rows):
+    ids, vectors = [], []
+    for object_id, dim, vector, updated_at in rows:
+        ids.append(object_id)
+        vectors.append(np.frombuffer(bytes(vector), dtype=np.float32, count=dim))
+        _watermarks[key] = updated_at
+    if ids:
+        index.upsert(ids, np.vstack(vectors))
+
+
+def _drop_deleted(kind, model_name, index):
+    # Deletions leave no row to carry a watermark. New rows are already applied, so the index
+    # only holds more ids than the store when some were deleted elsewhere.
+    stored = StoredEmbedding.objects.filter(kind=kind, model_name=model_name)
+    if stored.count() == len(index):
+        return
+    gone = index.ids() - set(stored.values_list("object_id", flat=True))
+    if gone:
+        index.remove(gone)
+
+
+def get_index(kind, backend=None, model_name=None):
+    """
+    Return the process-wide index of stored '<kind>' vectors, building it on first use
+    and pulling in rows that other processes have written since the last call.
+    Returns None while nothing of that kind has been embedded yet.
+    """
+    key = (kind, _backend_name(backend), get_model_name(model_name))
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            first = StoredEmbedding.objects.filter(kind=kind, model_name=key[2]).only("dim").first()
+            if first is None:
+                return None
+            index = _new_index(key[1], first.dim)
+            _apply_rows(key, index, _load_rows(kind, key[2]))
+            _indexes[key] = index
+        else:
+            _apply_rows(key, index, _load_rows(kind, key[2], since=_watermarks.get(key)))
+            _drop_deleted(kind, key[2], index)
+    return index
+
+
+def update_indexes(kind, model_name, ids, vectors):
+    """Push freshly encoded vectors into every already-built index for (kind, model)."""
+    with _lock:
+        for (index_kind, _, index_model), index in _indexes.items():
+            if index_kind == kind and index_model == model_name:
+                index.upsert(ids, vectors)
+
+
+def remove_from_indexes(kind, ids):
+    """Drop deleted objects from every already-built index of that kind."""
+    with _lock:
+        for (index_kind, _, _), index in _indexes.items():
+            if index_kind == kind:
+                index.remove(ids)
+
+
+def projects_for_paper(paper_vectors, k, backend=None):
+    """Top-k (project ids, cosine scores) for each paper vector."""
+    index = get_index("project", backend)
+    if index is None:
+        return None, None
+    return index.search(paper_vectors, k)
+
+
+def papers_for_project(project_vectors, k, backend=None):
+    """Top-k (publication ids, cosine scores) for each project vector."""
+    index = get_index("publication", backend)
+    if index is None:
+        return None, None
+    return index.search(project_vectors, k)
+
+
+def clear():
+    """Forget every built index (they are rebuilt from the store on next use)."""
+    with _lock:
+        _indexes.clear()
+        _watermarks.clear()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import Project, Publication, Author
 from django.contrib import admin
-from .models import MatchRequest
+from .models import LinkCheck, MatchRequest, MatchingJob, OutboundEmail
 from django.utils.html import format_html
 
 admin.site.register(Project)
@@ -19,4 +19,21 @@ class MatchRequestAdmin(admin.ModelAdmin):
             return format_html('<span style="color:green;">Approved</span>')
         else:
             return format_html('<span style="color:red;">Rejected</span>')
-    review_status.short_description = 'Review Status'
\ No newline at end of file
+    review_status.short_description = 'Review Status'
+
+@admin.register(MatchingJob)
+class MatchingJobAdmin(admin.ModelAdmin):
+    list_display = ('publication', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+
+@admin.register(LinkCheck)
+class LinkCheckAdmin(admin.ModelAdmin):
+    list_display = ('url', 'is_valid', 'status_code', 'checked_at', 'expires_at')
+    list_filter = ('is_valid',)
+    search_fields = ('url',)
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
@@ -1,4 +1,7 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ProjectsConfig(AppConfig):
@@ -7,4 +10,9 @@ class ProjectsConfig(AppConfig):
    
     def ready(self):
         import projects.signals
+
+        # Optionally load the matching encoder now so the first upload doesn't pay for it
+        if getattr(settings, 'AI_MATCHING_WARMUP', False) and os.environ.get("SEEDING") != "true":
+            from projects.AI import warm_up
+            warm_up()
         
\ No newline at end of file
@@ -383,44 +383,5 @@ class MessagingConsumer(AsyncWebsocketConsumer):
             content=content
         )
         
-        # Send email if user is not online
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        if not profile.is_online:
-            self.send_email_notification_sync(user, notification)
-        
+        # No email per event: if the user doesn't read it first, it goes out in their next digest (digests.py)
         return notification
-
-    def send_email_notification_sync(self, user, notification):
-        from django.core.mail import send_mail
-        from django.conf import settings
-        
-        try:
-            send_mail(
-                subject=notification.title,
-                message=notification.content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=True
-            )
-            notification.is_email_sent = True
-            notification.save()
-        except Exception as e:
-            print(f"Failed to send email notification: {e}")
-
-    @database_sync_to_async
-    def send_email_notification(self, user, notification):
-        from django.core.mail import send_mail
-        from django.conf import settings
-        
-        try:
-            send_mail(
-                subject=notification.title,
-                message=notification.content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=True
-            )
-            notification.is_email_sent = True
-            notification.save()
-        except Exception as e:
-            print(f"Failed to send email notification: {e}")
\ No newline at end of file
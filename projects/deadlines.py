@@ -0,0 +1,57 @@
+# deadlines.py
+#
+# Project deadlines for the upload reminders.
+# Project.duration is free text ("3 years", "18 months", "1 year 6 months");
+# parse_duration() normalizes it once, and Project.save() stores the result in
+# the indexed end_date / reminder_date columns (reminder_date = 90% of the way
+# from Project.created to end_date). `manage.py send_due_reminders` then finds
+# due projects with a range query on those columns instead of parsing every
+# project on every run.
+
+import re
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+# Fraction of the project's duration after which the first reminder is due
+REMINDER_FRACTION = 0.9
+
+_UNITS = {
+    'year': 'years', 'yr': 'years',
+    'month': 'months', 'mo': 'months',
+    'week': 'weeks', 'wk': 'weeks',
+    'day': 'days',
+}
+_PART = re.compile(r'(\d+(?:[.,]\d+)?)\s*(years?|yrs?|months?|mos?|weeks?|wks?|days?)\b', re.IGNORECASE)
+
+
+def parse_duration(text):
+    """
+    Parse a free-text duration into a relativedelta, or None if nothing is recognized.
+    Fractional years and months ("1.5 years") are converted to whole months and days.
+    """
+    if not text:
+        return None
+    totals = {}
+    for amount, unit in _PART.findall(text):
+        unit = _UNITS[unit.lower().rstrip('s')]
+        totals[unit] = totals.get(unit, 0) + float(amount.replace(',', '.'))
+    if not totals:
+        return None
+
+    months = totals.get('years', 0) * 12 + totals.get('months', 0)
+    whole_months = int(months)
+    days = (months - whole_months) * 30 + totals.get('weeks', 0) * 7 + totals.get('days', 0)
+    return relativedelta(months=whole_months, days=round(days))
+
+
+def compute_deadlines(start, duration):
+    """(end_date, reminder_date) for a project starting on `start`, or (None, None) if unknown."""
+    delta = parse_duration(duration)
+    if isinstance(start, str):
+        start = date.fromisoformat(start)  # Unsaved instances may still hold the raw form value
+    if start is None or delta is None:
+        return None, None
+    end_date = start + delta
+    reminder_date = start + timedelta(days=int((end_date - start).days * REMINDER_FRACTION))
+    return end_date, reminder_date
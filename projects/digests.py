@@ -0,0 +1,141 @@
+# digests.py
+#
+# Notification digests: instead of one email per event, Notification rows are
+# left to accumulate and each user gets one summary email per window
+# (NOTIFICATION_DIGEST_WINDOW_MINUTES, counted from their oldest undigested
+# notification).
+# - Notifications read in the meantime are never emailed.
+# - Duplicates (several notifications for the same message or request) collapse
+#   into one event, and events from the same sender share one line with a count.
+# - Notification.digest / digested_at record what was included, so nothing is
+#   summarized twice; the mail worker sets is_email_sent once the digest is delivered.
+# flush_digests() is called by `manage.py run_mail_worker` on every poll.
+
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .email import compose_email, get_recipient_names
+from .email_templates import render_many
+from .mail_queue import enqueue_all
+from .models import Notification
+
+# Minutes between digests when NOTIFICATION_DIGEST_WINDOW_MINUTES is not set
+DEFAULT_WINDOW_MINUTES = 15
+
+
+def digest_window():
+    return timedelta(minutes=getattr(settings, 'NOTIFICATION_DIGEST_WINDOW_MINUTES', DEFAULT_WINDOW_MINUTES))
+
+
+def pending_notifications():
+    """Unread notifications that have not been emailed or digested yet."""
+    return (Notification.objects.filter(digest__isnull=True, is_email_sent=False, is_read=False)
+            .exclude(user__email=''))
+
+
+def _event_key(notification):
+    """Notifications that describe the same event share a key."""
+    if notification.message_id:
+        return ('message', notification.message_id)
+    if notification.message_request_id:
+        return (notification.notification_type, 'request', notification.message_request_id)
+    return (notification.notification_type, notification.title, notification.content)
+
+
+def _describe(notification):
+    """(line title, preview) used for a notification in the digest."""
+    message, message_request = notification.message, notification.message_request
+    if message is not None:
+        return f"New messages from {message.sender.username}", message.content or ''
+    if message_request is not None and notification.notification_type == 'message_request':
+        return f"Message request from {message_request.sender.username}", message_request.initial_message
+    return notification.title or notification.get_notification_type_display() or "Notification", notification.content or ''
+
+
+def summarize(notifications):
+    """
+    Collapse a user's notifications (oldest first) into digest lines:
+    [{"title", "count", "preview", "latest"}], most recent line first.
+    """
+    events = {}
+    for notification in notifications:
+        events[_event_key(notification)] = notification  # Keep the latest of each duplicate group
+
+    items = {}
+    for notification in events.values():
+        title, preview = _describe(notification)
+        item = items.setdefault(title, {"title": title, "count": 0, "preview": '', "latest": None})
+        item["count"] += 1
+        if item["latest"] is None or notification.created_at >= item["latest"]:
+            item["latest"] = notification.created_at
+            item["preview"] = preview[:200] + ('...' if len(preview) > 200 else '')
+    return sorted(items.values(), key=lambda item: item["latest"], reverse=True)
+
+
+def due_user_ids(now=None, window=None):
+    """Users whose oldest pending notification is at least one window old."""
+    now = now or timezone.now()
+    window = window if window is not None else digest_window()
+    return list(pending_notifications().values('user').annotate(first=Min('created_at'))
+                .filter(first__lte=now - window).values_list('user', flat=True))
+
+
+def flush_digests(force=False):
+    """
+    Queue one digest email per user whose window has elapsed (every user with pending
+    notifications when force is set). Returns (digests queued, notifications included).
+    Safe to run from several mail workers at once: notifications are locked where the
+    database supports it, and a digest whose notifications another flush took first is
+    dropped again before the transaction commits.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = pending_notifications()
+        if not force:
+            pending = pending.filter(user_id__in=due_user_ids(now))
+        if connection.features.has_select_for_update_skip_locked:
+            # Rows another worker is digesting are skipped, not waited on (no joined rows locked)
+            pending = pending.select_for_update(skip_locked=True, of=('self',))
+        notifications = list(pending.select_related('user', 'message__sender', 'message_request__sender')
+                             .order_by('user_id', 'created_at', 'id'))
+        if not notifications:
+            return 0, 0
+
+        batches = [(user_id, list(group)) for user_id, group in groupby(notifications, key=lambda n: n.user_id)]
+        names = get_recipient_names(group[0].user.email for _, group in batches)
+        contexts = []
+        for _, group in batches:
+            items = summarize(group)
+            contexts.append({
+                'recipient_name': names[group[0].user.email],
+                'items': items,
+                'total': sum(item["count"] for item in items),
+                'site_url': settings.SITE_URL,
+            })
+        html_bodies = render_many('notification_digest.html', contexts)
+
+        emails = [
+            compose_email(group[0].user.email, f"🔔 {context['total']} new notification{'s' if context['total'] != 1 else ''}",
+                          html_body)
+            for (_, group), context, html_body in zip(batches, contexts, html_bodies)
+        ]
+        emails = enqueue_all(emails)
+        queued = included = 0
+        for email, (_, group) in zip(emails, batches):
+            ids = [n.id for n in group]
+            # digest__isnull catches a concurrent flush that took some of them first (databases without row locks)
+            claimed = Notification.objects.filter(id__in=ids, digest__isnull=True).update(digest=email, digested_at=now)
+            if claimed != len(ids):
+                # Part of this digest is already on its way: drop it and leave the rest for the next flush
+                Notification.objects.filter(digest=email).update(digest=None, digested_at=None)
+                email.delete()
+                continue
+            queued += 1
+            included += claimed
+    print(f"✅ Queued {queued} notification digest(s) covering {included} notification(s)")
+    return queued, included
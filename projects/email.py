@@ -1,42 +1,47 @@
 # Simple Mail Transfer Protocol
-import datetime as datetime
-from datetime import timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import os
-import smtplib
-import ssl
+from datetime import datetime, timedelta
 
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
 from django.utils import timezone
 
 from .models import UploadToken
 from .models import Publication
 from .models import Author
 from .models import Message
-from .utils import is_valid_download_link
+from .models import Project
+from .models import OutboundEmail
+from .mail_queue import enqueue_all, enqueue_email, enqueue_many
+from .email_templates import render, render_many
 
 # ========================
 # EMAIL CONFIGURATION
 # ========================
-# SENDER: The sender's Gmail address.
-SENDER = 'basantawad014@gmail.com'
-# EMAIL_PASSWORD: App password generated for Gmail (never use your real password!).
-EMAIL_PASSWORD = 'yuef auqt aohq razb'  # App password
-
-# RECEIVER_NAME: Default receiver name. Used for template personalization. 
-# (Note: This is set from Publication.primary_author, but is later overridden by logic per email.)
-RECEIVER_NAME = "Test Author"
+# Emails are queued as OutboundEmail rows and delivered by `manage.py run_mail_worker`;
+# the sending account is settings.EMAIL_HOST_USER / EMAIL_HOST_PASSWORD (read from the environment).
+#
+# Nothing in this module keeps per-message state: every function receives its
+# recipient and context as arguments, so messages can be composed from any
+# number of threads (threaded WSGI, database_sync_to_async) at once.
 
 def get_author_by_name(name):
     """Helper to get an Author object by its name."""
     return Author.objects.get(name=name)
 
-# SSL context for secure connection to Gmail's SMTP server
-context = ssl.create_default_context()
+def get_recipient_names(emails):
+    """
+    Map each email address to the name used in templates.
+    Author names win over user names; unknown addresses map to themselves.
+    """
+    emails = set(emails)
+    names = {email: email for email in emails}
+    for user in User.objects.filter(email__in=emails):
+        names[user.email] = user.get_full_name() or user.username
+    names.update(Author.objects.filter(email__in=emails).values_list('email', 'name'))
+    return names
 
 def generate_upload_link(request, receiver_email):
     """
@@ -46,53 +51,106 @@ def generate_upload_link(request, receiver_email):
     try:
         user = User.objects.get(email=receiver_email)  # make sure this is a User, not Author
         token = UploadToken.objects.create(user=user)
+        if request is None:  # Scheduled jobs have no request to build the URL from
+            return f"{settings.SITE_URL}/upload/{token.token}/"
         upload_url = request.build_absolute_uri(f"/upload/{token.token}/")
         return upload_url
     except User.DoesNotExist:
         return "No upload link available"
 
-def personalize_template(request, template, title, end_date):
+def generate_upload_links(request, receiver_emails):
     """
-    Fill placeholders in email template for reminders or issues.
+    Batch version of generate_upload_link(): one link (and token) per entry of receiver_emails,
+    with one user lookup and one insert for the whole batch.
+    """
+    receiver_emails = list(receiver_emails)
+    users = {user.email: user for user in User.objects.filter(email__in=set(receiver_emails))}
+    tokens = [UploadToken(user=users[email]) if email in users else None for email in receiver_emails]
+    UploadToken.objects.bulk_create([token for token in tokens if token is not None])
+
+    links = []
+    for token in tokens:
+        if token is None:
+            links.append("No upload link available")
+        elif request is None:
+            links.append(f"{settings.SITE_URL}/upload/{token.token}/")
+        else:
+            links.append(request.build_absolute_uri(f"/upload/{token.token}/"))
+    return links
+
+def reminder_context(request, title, end_date, recipient_email, recipient_name, upload_link=None):
+    """
+    Template context for reminders or issues.
     - researcher_name, project_title, project_end_date, upload_link
     """
-    html_body = template.replace("{{ researcher_name }}", RECEIVER_NAME)
-    html_body = html_body.replace("{{ project_title }}", title)
-    html_body = html_body.replace("{{ project_end_date }}", end_date.strftime("%Y-%m-%d"))
-    html_body = html_body.replace("{{ upload_link }}", generate_upload_link(request, RECEIVER))
-    return html_body
-
-def personalize_welcome_template(request, template):
+    return {
+        'researcher_name': recipient_name,
+        'project_title': title,
+        'publication_title': title,  # upload_reminder.html names the project this way
+        'project_end_date': end_date.strftime("%Y-%m-%d"),
+        'upload_link': upload_link or generate_upload_link(request, recipient_email),
+    }
+
+def welcome_context(request, recipient_email, recipient_name):
     """
-    Fill placeholders for the welcome email template.
+    Template context for the welcome email.
     Provides the new user with their upload link and name.
     """
-    receiver_name = str(RECEIVER_NAME)  # Ensure it's a string
-    upload_link = generate_upload_link(request, RECEIVER)
-    html_body = template.replace("{{ researcher_name }}", receiver_name)
-    html_body = html_body.replace("{{ upload_link }}", upload_link if upload_link else "No link available")  # Handle None case
-    return html_body
+    upload_link = generate_upload_link(request, recipient_email)
+    return {
+        'researcher_name': recipient_name,
+        'upload_link': upload_link if upload_link else "No link available",  # Handle None case
+    }
 
-def send_email(subject, html_body):
+def compose_email(recipient_email, subject, html_body='', text_body='', notification=None):
     """
-    Send an HTML email using Gmail's SMTP server.
-    - subject: Email subject line.
-    - html_body: The HTML content of the email.
+    Build (without saving) the OutboundEmail for one recipient.
+    Pure function of its arguments, so it is safe to call from many threads;
+    pass the results to queue_emails() to queue them in one insert.
     """
-    msg = MIMEMultipart()
-    msg['Subject'] = subject
-    msg['From'] = SENDER
-    msg['To'] = RECEIVER
-    msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+    return OutboundEmail(recipient=recipient_email, subject=subject, html_body=html_body,
+                         text_body=text_body, notification=notification)
 
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as smtp:
-            smtp.starttls(context=context)
-            smtp.login(SENDER, EMAIL_PASSWORD)
-            smtp.sendmail(SENDER, RECEIVER, msg.as_string())
-            print(f"✅ Email sent to {RECEIVER}")
-    except Exception as e:
-        print(f"❌ Failed to send to {RECEIVER}: {e}")
+def queue_emails(emails):
+    """Queue composed emails in one insert. Returns the number queued."""
+    queued = enqueue_all(emails)
+    if queued:
+        print(f"✅ Queued {len(queued)} email(s)")
+    return len(queued)
+
+def compose_project_reminders(request, projects, template_name, subject_format, due):
+    """
+    Compose one personalized reminder per project whose due date has passed.
+    - projects: (recipient_email, project_title, start "YYYY-MM-DD", duration in months) tuples.
+    - due: function (start_date, end_date) -> date the reminder becomes due.
+    Scheduled runs use send_due_project_reminders(), which reads Project's indexed deadline columns instead.
+    """
+    now = datetime.now()
+    rows = []
+    for recipient_email, project_title, start_str, duration in projects:
+        start_date = datetime.strptime(start_str, "%Y-%m-%d")
+        end_date = start_date + relativedelta(months=duration)
+        if now >= due(start_date, end_date):
+            rows.append((recipient_email, project_title, end_date))
+    return compose_deadline_reminders(request, rows, template_name, subject_format)
+
+def compose_deadline_reminders(request, rows, template_name, subject_format):
+    """
+    Compose one personalized reminder per (recipient_email, project_title, end_date) row.
+    The template is rendered for the whole batch in one render_many() call.
+    """
+    rows = list(rows)
+    names = get_recipient_names(row[0] for row in rows)
+    links = generate_upload_links(request, [row[0] for row in rows])
+    contexts = [
+        reminder_context(request, project_title, end_date, recipient_email, names[recipient_email], upload_link)
+        for (recipient_email, project_title, end_date), upload_link in zip(rows, links)
+    ]
+    html_bodies = render_many(template_name, contexts)
+    return [
+        compose_email(recipient_email, subject_format.format(title=project_title), html_body)
+        for (recipient_email, project_title, _), html_body in zip(rows, html_bodies)
+    ]
 
 # ========================
 # LOGIC 1: 90% Reminder
@@ -100,30 +158,19 @@ def send_email(subject, html_body):
 def send_90_percent_reminders(request, projects):
     """
     For each project, if 90% of its duration has passed, send a reminder email to upload a publication.
-    - Reads the reminder email template and personalizes it.
+    - Renders the cached reminder template once per due project, in one batch.
     - Only sends the email if the current date >= reminder date.
     """
-    for project in projects:
-        global RECEIVER, reminder_date  # Needed for outer variables used in `else` print
-        RECEIVER, project_title, start_str, duration = project
-        start_date = datetime.strptime(start_str, "%Y-%m-%d")
-        end_date = start_date + relativedelta(months=duration)
-        reminder_date = start_date + relativedelta(months=duration * 0.9)
-
-        if datetime.now() >= reminder_date:
-            try:
-                template_path = os.path.join(settings.BASE_DIR, 'projects', 'templates', 'emails', 'reminder.html')
-                with open(template_path, 'r', encoding='utf-8') as f:
-                    reminder = f.read()
-            except FileNotFoundError as e:
-                print(f"❌ Reminder email template not found: {e}")
-                continue
-
-            html_body = personalize_template(request, reminder, project_title, end_date)
-            send_email(
-                subject=f"⏰ Reminder: Upload Publication for '{project_title}'",
-                html_body=html_body
-            )
+    try:
+        emails = compose_project_reminders(
+            request, projects, 'reminder.html',
+            subject_format="⏰ Reminder: Upload Publication for '{title}'",
+            due=lambda start_date, end_date: start_date + (end_date - start_date) * 0.9,
+        )
+    except FileNotFoundError as e:
+        print(f"❌ Reminder email template not found: {e}")
+        return 0
+    return queue_emails(emails)
 
 # ========================
 # LOGIC 2: Final Reminder
@@ -131,50 +178,89 @@ def send_90_percent_reminders(request, projects):
 def send_final_reminders(request, projects):
     """
     For each project, if its end date has passed, send a final reminder to upload publications.
-    - Reads the upload reminder email template and personalizes it.
+    - Renders the cached upload reminder template once per due project, in one batch.
     - Only sends the email if the current date >= end date.
     """
-    for project in projects:
-        global RECEIVER
-        RECEIVER, project_title, start_str, duration = project
-        start_date = datetime.strptime(start_str, "%Y-%m-%d")
-        end_date = start_date + relativedelta(months=duration)
+    try:
+        emails = compose_project_reminders(
+            request, projects, 'upload_reminder.html',
+            subject_format="⚠️ Final Reminder: Project '{title}' Ended",
+            due=lambda start_date, end_date: end_date,
+        )
+    except FileNotFoundError as e:
+        print(f"❌ Upload reminder template not found: {e}")
+        return 0
+    return queue_emails(emails)
+
+# ========================
+# LOGIC 2b: Scheduled Deadline Reminders
+# ========================
+# (template, subject, date column that makes a project due, column recording the send)
+DEADLINE_STAGES = [
+    ('reminder.html', "⏰ Reminder: Upload Publication for '{title}'", 'reminder_date', 'reminder_sent_at'),
+    ('upload_reminder.html', "⚠️ Final Reminder: Project '{title}' Ended", 'end_date', 'final_reminder_sent_at'),
+]
 
-        if datetime.now() >= end_date:
-            try:
-                template_path = os.path.join(settings.BASE_DIR, 'projects', 'templates', 'emails', 'upload_reminder.html')
-                with open(template_path, 'r', encoding='utf-8') as f:
-                    reminder = f.read()
-            except FileNotFoundError as e:
-                print(f"❌ Upload reminder template not found: {e}")
-                continue
-
-            html_body = personalize_template(request, reminder, project_title, end_date)
-            send_email(
-                subject=f"⚠️ Final Reminder: Project '{project_title}' Ended",
-                html_body=html_body
-            )
+def send_due_project_reminders(today=None, request=None):
+    """
+    Queue the upload reminder and the final reminder for every project that is due and not yet notified.
+    - Due projects are found with one range query per stage on Project's indexed
+      reminder_date / end_date columns, so a run costs time proportional to the due set.
+    - Every team author with an email address gets a personalized copy.
+    - The *_sent_at column is set in the same transaction, so each stage is sent once
+      (Project.save() clears it again if the deadline moves); projects without a team
+      author to email stay due until they have one.
+    Returns {stage template: reminders queued}.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    authors = Prefetch('team_authors', queryset=Author.objects.exclude(email='').only('id', 'name', 'email'))
+    sent = {}
+    for template_name, subject_format, due_column, sent_column in DEADLINE_STAGES:
+        due = (Project.objects.filter(**{f'{due_column}__lte': today, f'{sent_column}__isnull': True})
+               .exclude(status='cancelled'))
+        if due_column == 'reminder_date':
+            due = due.filter(end_date__gt=today)  # Past the end only the final reminder makes sense
+        projects = list(due.only('id', 'title', 'end_date').prefetch_related(authors))
+        rows, reminded_ids = [], []
+        for project in projects:
+            team = [(author.email, project.title, project.end_date) for author in project.team_authors.all()]
+            if team:
+                rows.extend(team)
+                reminded_ids.append(project.id)
+        if not rows:
+            sent[template_name] = 0
+            continue
+
+        with transaction.atomic():
+            sent[template_name] = queue_emails(compose_deadline_reminders(request, rows, template_name, subject_format))
+            # Only projects that had someone to remind: one whose team gets an email later is still due.
+            # Queryset update: marking the send must not go through Project.save()
+            Project.objects.filter(id__in=reminded_ids).update(**{sent_column: now})
+    return sent
 
 # ========================
 # LOGIC 3: Invalid URL
 # ========================
-def notify_invalid_publication_url(request, pub, project_title, end_date):
+def notify_invalid_publication_url(pub, recipient_email, recipient_name=None):
     """
-    If a publication's URL is invalid, send an issue notification email to the researcher.
-    - Checks the validity using is_valid_download_link utility.
+    Email the researcher that a publication's download link does not work.
+    - The link itself is validated by projects.link_checker, which calls this for invalid links.
     - Uses the issue email template.
     """
-    publication_url_valid = is_valid_download_link(pub.url)
-
-    if publication_url_valid == False:
-        with open('emails/issue_email.html', 'r', encoding='utf-8') as f:
-            issue = f.read()
-
-        html_body = personalize_template(request, issue, project_title, end_date)
-        send_email(
-            subject=f"❗ Issue: Invalid Link for '{project_title}' Publication",
-            html_body=html_body
-        )
+    from django.urls import reverse
+
+    html_body = render('issue_email.html', {
+        'recipient_name': recipient_name or recipient_email,
+        'alert_message': f"The download link of '{pub.title}' ({pub.url}) does not point to a PDF or Word "
+                         f"document. Please update it or upload the file instead.",
+        'action_link': f"{settings.SITE_URL}{reverse('publication_detail', args=[pub.pk])}",
+    })
+    return send_email(
+        subject=f"❗ Issue: Invalid Link for '{pub.project.title}' Publication",
+        html_body=html_body,
+        recipient_email=recipient_email,
+    )
 
 # ========================
 # LOGIC 4: Welcome Email
@@ -182,42 +268,67 @@ def notify_invalid_publication_url(request, pub, project_title, end_date):
 def send_welcome_email(request, user):
     """
     Send a personalized welcome email to a newly registered user.
-    - Reads the welcome email template and fills user-specific info.
+    - Renders the cached welcome email template with user-specific info.
     """
-    global RECEIVER
-    RECEIVER = user.email  # Set email for sending
-
-    # Absolute path to the template file
-    template_path = os.path.join(settings.BASE_DIR, 'projects', 'templates', 'emails', 'welcome_email.html')
-
+    recipient_name = get_recipient_names([user.email])[user.email]
     try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        html_body = render('welcome_email.html', welcome_context(request, user.email, recipient_name))
     except FileNotFoundError as e:
         print(f"❌ Template file not found: {e}")
-        return
-
-    html_body = personalize_welcome_template(request, template)
+        return False
 
-    send_email(
+    return send_email(
         subject="🎉 Welcome to the Publication Tracker!",
-        html_body=html_body
+        html_body=html_body,
+        recipient_email=user.email,
     )
 
 
 
 
-def send_unread_message_reminders():
-    threshold = timezone.now() - timedelta(hours=2)
-    unread = Message.objects.filter(is_read=False, sent_at__lt=threshold)
-    for msg in unread:
-        send_mail(
-            'Reminder: Unread Message',
-            f'You still have an unread message from {msg.sender.username}.',
-            'noreply@yourdomain.com',
-            [msg.recipient.email],
-            fail_silently=True,
-        )
+# ========================
+# LOGIC 5: Unread Message Reminders
+# ========================
+def send_unread_message_reminders(older_than=timedelta(hours=2), chunk_size=2000):
+    """
+    Send each user one reminder about their messages that have been unread for longer than older_than.
+    - Unread counts come from one grouped query, streamed with .iterator() so memory stays flat.
+    - Message.reminded_at is the watermark: a message is reminded about at most once.
+    Returns (reminders queued, messages covered).
+    """
+    now = timezone.now()
+    due = Message.objects.filter(is_read=False, reminded_at__isnull=True, sent_at__lt=now - older_than)
+    # Freeze the set of messages so ones arriving mid-run are neither counted nor marked
+    last_id = due.aggregate(last_id=Max('id'))['last_id']
+    if last_id is None:
+        return 0, 0
+    due = due.filter(id__lte=last_id)
+
+    rows = (due.exclude(recipient__email='')
+            .values('recipient_id', 'recipient__email')
+            .annotate(unread=Count('id'), senders=Count('sender', distinct=True))
+            .order_by('recipient_id'))
+
+    reminders = 0
+    with transaction.atomic():
+        batch = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            unread, senders = row['unread'], row['senders']
+            batch.append(compose_email(
+                row['recipient__email'],
+                'Reminder: Unread Message' if unread == 1 else f'Reminder: {unread} Unread Messages',
+                text_body=f"You still have {unread} unread message{'s' if unread != 1 else ''} from "
+                          f"{senders} {'person' if senders == 1 else 'people'}. Read them at {settings.SITE_URL}/messaging/",
+            ))
+            if len(batch) >= chunk_size:
+                reminders += len(enqueue_all(batch))
+                batch = []
+        reminders += len(enqueue_all(batch))
+        # One set-based update; committed together with the queued reminders
+        covered = due.update(reminded_at=now)
+
+    print(f"✅ Queued {reminders} unread message reminder(s) covering {covered} message(s)")
+    return reminders, covered
 
 # ========================
 # MESSAGING EMAIL FUNCTIONS
@@ -226,7 +337,6 @@ def send_unread_message_reminders():
 def send_message_notification_email(recipient, sender, message_content):
     """Send email notification for new messages"""
     try:
-        from django.template.loader import render_to_string
         from django.utils import timezone
         
         subject = f"New message from {sender.username}"
@@ -238,7 +348,7 @@ def send_message_notification_email(recipient, sender, message_content):
             'site_url': settings.SITE_URL,
         }
         
-        html_content = render_to_string('emails/message_notification.html', context)
+        html_content = render('message_notification.html', context)
         
         send_email(subject, html_content, recipient.email)
         return True
@@ -249,7 +359,6 @@ def send_message_notification_email(recipient, sender, message_content):
 def send_message_request_email(recipient, sender, request_message):
     """Send email notification for message requests"""
     try:
-        from django.template.loader import render_to_string
         from django.utils import timezone
         
         subject = f"Message request from {sender.username}"
@@ -262,7 +371,7 @@ def send_message_request_email(recipient, sender, request_message):
             'request_id': '{{ request_id }}',  # This will be replaced by the view
         }
         
-        html_content = render_to_string('emails/message_request.html', context)
+        html_content = render('message_request.html', context)
         
         send_email(subject, html_content, recipient.email)
         return True
@@ -273,7 +382,6 @@ def send_message_request_email(recipient, sender, request_message):
 def send_request_approved_email(recipient, approver):
     """Send email notification when message request is approved"""
     try:
-        from django.template.loader import render_to_string
         from django.utils import timezone
         
         subject = f"Message request approved by {approver.username}"
@@ -284,7 +392,7 @@ def send_request_approved_email(recipient, approver):
             'site_url': settings.SITE_URL,
         }
         
-        html_content = render_to_string('emails/request_approved.html', context)
+        html_content = render('request_approved.html', context)
         
         send_email(subject, html_content, recipient.email)
         return True
@@ -295,7 +403,6 @@ def send_request_approved_email(recipient, approver):
 def send_group_message_notification_email(recipients, sender, group_name, message_content, group_id=None):
     """Send email notification for group messages"""
     try:
-        from django.template.loader import render_to_string
         from django.utils import timezone
         
         subject = f"New group message in '{group_name}' from {sender.username}"
@@ -310,10 +417,11 @@ def send_group_message_notification_email(recipients, sender, group_name, messag
             'member_count': len(recipients) + 1,  # +1 for sender
         }
         
-        html_content = render_to_string('emails/group_message_notification.html', context)
+        html_content = render('group_message_notification.html', context)
         
-        for recipient in recipients:
-            send_email(subject, html_content, recipient.email)
+        # One insert for the whole group; the mail worker delivers them over a single connection
+        queued = enqueue_many([recipient.email for recipient in recipients], subject, html_body=html_content)
+        print(f"✅ Queued {len(queued)} group message email(s)")
         return True
     except Exception as e:
         print(f"Failed to send group message notification email: {e}")
@@ -323,36 +431,27 @@ def send_group_message_notification_email(recipients, sender, group_name, messag
 # ENHANCED EMAIL FUNCTIONS
 # ========================
 
-def send_email(subject, html_body, recipient_email=None):
+def send_email(subject, html_body, recipient_email, notification=None):
     """
-    Enhanced email sending function that can handle both global and specific recipients
+    Queue an HTML email for the mail worker (see mail_queue.py); returns immediately.
+    - recipient_email: Address of the recipient (always explicit, never shared state).
+    - notification: Notification whose is_email_sent flag is set once the email is delivered.
     """
-    global RECEIVER
-    
-    if recipient_email:
-        RECEIVER = recipient_email
+    if not recipient_email:
+        print(f"❌ No recipient for '{subject}'")
+        return False
     
-    msg = MIMEMultipart()
-    msg['Subject'] = subject
-    msg['From'] = SENDER
-    msg['To'] = RECEIVER
-    msg.attach(MIMEText(html_body, 'html', 'utf-8'))
-
     try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as smtp:
-            smtp.starttls(context=context)
-            smtp.login(SENDER, EMAIL_PASSWORD)
-            smtp.sendmail(SENDER, RECEIVER, msg.as_string())
-            print(f"✅ Email sent to {RECEIVER}")
-            return True
+        enqueue_email(recipient_email, subject, html_body=html_body, notification=notification)
+        print(f"✅ Email queued for {recipient_email}")
+        return True
     except Exception as e:
-        print(f"❌ Failed to send to {RECEIVER}: {e}")
+        print(f"❌ Failed to queue email for {recipient_email}: {e}")
         return False
 
 def send_publication_reminder_email(author, publication, project):
     """Send reminder email for publication upload"""
     try:
-        from django.template.loader import render_to_string
         
         subject = f"Reminder: Upload Publication for '{project.title}'"
         
@@ -368,7 +467,7 @@ def send_publication_reminder_email(author, publication, project):
             'deadline': project.end_date.strftime("%B %d, %Y") if project.end_date else None,
         }
         
-        html_content = render_to_string('emails/publication_reminder.html', context)
+        html_content = render('publication_reminder.html', context)
         
         send_email(subject, html_content, author.email)
         return True
@@ -379,7 +478,6 @@ def send_publication_reminder_email(author, publication, project):
 def send_publication_upload_confirmation(author, publication, project):
     """Send confirmation email when publication is uploaded"""
     try:
-        from django.template.loader import render_to_string
         from django.utils import timezone
         
         subject = f"Publication Uploaded: '{publication.title}'"
@@ -403,7 +501,7 @@ def send_publication_upload_confirmation(author, publication, project):
             'site_url': settings.SITE_URL,
         }
         
-        html_content = render_to_string('emails/publication_confirmation.html', context)
+        html_content = render('publication_confirmation.html', context)
         
         send_email(subject, html_content, author.email)
         return True
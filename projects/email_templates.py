@@ -0,0 +1,76 @@
+# email_templates.py
+#
+# Rendering layer for the HTML emails in projects/templates/emails/.
+# - Each template is read and compiled once, then kept in memory; the file's mtime
+#   is checked on use, so editing a template takes effect without a restart.
+# - render_many() compiles (or re-validates) once and renders a whole batch of
+#   recipient contexts, so reminder jobs never touch disk per message.
+# - The cache is shared by all threads and guarded by a lock; rendering itself
+#   only reads the compiled template and is safe to run concurrently.
+
+import os
+import threading
+
+from django.conf import settings
+from django.template import Context, engines
+
+# Directory holding the email templates
+EMAIL_TEMPLATE_DIR = os.path.join(settings.BASE_DIR, 'projects', 'templates', 'emails')
+
+_cache = {}  # template name -> (mtime_ns, compiled Template)
+_lock = threading.Lock()
+_stats = {"compiled": 0, "hits": 0}
+
+
+def template_path(name):
+    return os.path.join(EMAIL_TEMPLATE_DIR, name)
+
+
+def get_template(name):
+    """
+    Return the compiled template for templates/emails/<name>.
+    Recompiled only when the file's mtime changes. Raises FileNotFoundError if it is missing.
+    """
+    path = template_path(name)
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _cache.get(name)
+        if cached is not None and cached[0] == mtime:
+            _stats["hits"] += 1
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    # Compile with the project's Django engine so tags, filters and autoescaping match the site templates
+    template = engines['django'].from_string(source).template
+    with _lock:
+        _cache[name] = (mtime, template)
+        _stats["compiled"] += 1
+    return template
+
+
+def render_many(name, contexts):
+    """Render templates/emails/<name> once per context dict, checking the file once for the whole batch."""
+    template = get_template(name)
+    return [template.render(Context(context, autoescape=True)) for context in contexts]
+
+
+def render(name, context):
+    """Render templates/emails/<name> with one context dict."""
+    return render_many(name, [context])[0]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def get_stats():
+    """Templates compiled and cache hits since start-up (or the last reset_stats())."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        _stats.update(compiled=0, hits=0)
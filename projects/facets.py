@@ -0,0 +1,128 @@
+# facets.py
+#
+# Filter facets for the project and publication listings: the domain, year and
+# type values a dropdown can offer, each with the number of results choosing it
+# would give under the other filters currently applied.
+# - One grouped query per facet (values + Count), instead of a DISTINCT query
+#   per dropdown on every request.
+# - Results are kept in Django's cache framework under a key that includes a
+#   shared generation number; signals.py bumps the generation whenever a Project
+#   or Publication is saved or deleted (or a change alters search matches), so
+#   a warm cache costs no database query and a stale entry is never read.
+# - Invalidation only reaches other processes through a cache they share
+#   (config/settings.py uses a file-based cache; Redis or the database cache also
+#   work). With a per-process cache (LocMemCache, DummyCache) counts are computed
+#   on every request instead of being served stale.
+# - FACET_CACHE_TIMEOUT bounds how long an entry lives.
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+from .models import Project, Publication
+from .search import search
+
+# Seconds a facet entry is kept when FACET_CACHE_TIMEOUT is not set
+DEFAULT_TIMEOUT = 300
+# Cache key of the generation number that invalidates every facet entry at once
+GENERATION_KEY = "facets:generation"
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seeded from the clock so a generation key evicted from the cache can't come back
+        # with a number whose old entries are still stored
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def invalidate():
+    """Make every cached facet entry unreachable."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        _generation()  # Not set yet: a fresh clock-based generation is just as good
+
+
+def _cache_key(kind, filters):
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    return f"facets:{_generation()}:{kind}:{digest}"
+
+
+def _shared_cache():
+    """True if the default cache is visible to every process, so invalidate() reaches them all."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def _cached(kind, filters, compute):
+    if not _shared_cache():
+        return compute()
+    key = _cache_key(kind, filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute()
+        cache.set(key, facets, getattr(settings, "FACET_CACHE_TIMEOUT", DEFAULT_TIMEOUT))
+    return facets
+
+
+def _matching(queryset, search_query):
+    """queryset restricted to every search match."""
+    return search(queryset, search_query) if search_query else queryset
+
+
+def _counts(queryset, field, selected=None, descending=False):
+    """[(value, count)] for one facet, ordered by value; the selected value is kept even with no results."""
+    rows = (queryset.order_by().values(field).annotate(count=Count("pk", distinct=True))
+            .order_by(f"-{field}" if descending else field))
+    counts = [(row[field], row["count"]) for row in rows if row[field] not in (None, "")]
+    if selected and str(selected) not in {str(value) for value, _ in counts}:
+        counts.append((selected, 0))
+    return counts
+
+
+def project_facets(search_query="", domain="", year=""):
+    """{"domains", "years"} as [(value, count)] for the project listing; years newest first."""
+    filters = {"search": search_query, "domain": domain, "year": year}
+
+    def compute():
+        base = _matching(Project.objects.all(), search_query)
+        by_domain = base.filter(created__year=year) if str(year).isdigit() else base
+        by_year = base.filter(domain=domain) if domain else base
+        return {
+            "domains": _counts(by_domain, "domain", domain),
+            "years": _counts(by_year.annotate(year=ExtractYear("created")), "year", year, descending=True),
+        }
+
+    return _cached("project", filters, compute)
+
+
+def publication_facets(search_query="", domain="", year="", type=""):
+    """{"domains", "years", "types"} as [(value, count)] for the publication listing; years newest first."""
+    filters = {"search": search_query, "domain": domain, "year": year, "type": type}
+
+    def compute():
+        base = _matching(Publication.objects.all(), search_query)
+        conditions = {"project__domain": domain, "year": year if str(year).isdigit() else "", "type": type}
+
+        def without(name):
+            return base.filter(**{field: value for field, value in conditions.items() if value and field != name})
+
+        counts = dict(_counts(without("type"), "type"))
+        # Every type choice is listed in model order, as the dropdown always did
+        types = [(choice, counts.get(choice, 0)) for choice, _ in Publication._meta.get_field("type").choices]
+        return {
+            "domains": _counts(without("project__domain"), "project__domain", domain),
+            "years": _counts(without("year"), "year", year, descending=True),
+            "types": types,
+        }
+
+    return _cached("publication", filters, compute)
@@ -0,0 +1,69 @@
+# group_reads.py
+#
+# Read receipts for group chats, kept as one GroupReadWatermark row per
+# (group, member) instead of one row per message per member.
+# - Opening a chat moves the member's watermark to the newest message with a
+#   single UPDATE (an INSERT the first time); the watermark never moves back.
+# - Unread counts are the messages above a member's watermark that others sent.
+# - "Read by N" for a message is the number of current members, other than its
+#   sender, whose watermark has reached it.
+
+from bisect import bisect_left
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import GroupMessage, GroupReadWatermark
+
+
+def _id(obj):
+    return getattr(obj, 'pk', obj)
+
+
+def mark_group_read(group, user, message_id):
+    """Record that user has read group up to message_id."""
+    group_id, user_id = _id(group), _id(user)
+    advanced = GroupReadWatermark.objects.filter(group_id=group_id, user_id=user_id).update(
+        last_read_message_id=Greatest(F('last_read_message_id'), Value(message_id))
+    )
+    if advanced:
+        return
+    try:
+        with transaction.atomic():
+            GroupReadWatermark.objects.create(group_id=group_id, user_id=user_id, last_read_message_id=message_id)
+    except IntegrityError:
+        # Created concurrently (another tab opened the chat): advance that row instead
+        mark_group_read(group_id, user_id, message_id)
+
+
+def unread_counts(user, groups):
+    """{group id: messages from others above user's watermark} for the given groups (two queries)."""
+    group_ids = [_id(group) for group in groups]
+    if not group_ids:
+        return {}
+    watermarks = dict(GroupReadWatermark.objects.filter(user=_id(user), group_id__in=group_ids)
+                      .values_list('group_id', 'last_read_message_id'))
+    above = Q()
+    for group_id in group_ids:
+        above |= Q(group_id=group_id, id__gt=watermarks.get(group_id, 0))
+    rows = (GroupMessage.objects.filter(above).exclude(sender=_id(user))
+            .order_by().values('group_id').annotate(count=Count('id')))
+    counts = dict.fromkeys(group_ids, 0)
+    counts.update({row['group_id']: row['count'] for row in rows})
+    return counts
+
+
+def read_counts(group, messages):
+    """{message id: members other than the sender who have read it} for messages of one group (one query)."""
+    group_id = _id(group)
+    watermarks = dict(GroupReadWatermark.objects.filter(group_id=group_id, user__group_memberships=group_id)
+                      .values_list('user_id', 'last_read_message_id'))
+    ordered = sorted(watermarks.values())
+    counts = {}
+    for message in messages:
+        read = len(ordered) - bisect_left(ordered, message.id)
+        if watermarks.get(message.sender_id, 0) >= message.id:
+            read -= 1  # The sender's own watermark doesn't make it "read by" anyone
+        counts[message.id] = read
+    return counts
@@ -0,0 +1,168 @@
+# link_checker.py
+#
+# Download-link validation for publication URLs.
+# - URLs are probed concurrently from a bounded thread pool that shares one pooled
+#   requests.Session, so a batch of N links costs roughly one timeout, not N.
+# - Every result, good or bad, is cached in LinkCheck: valid links for
+#   LINK_CHECK_TTL_HOURS, invalid ones (negative cache) for LINK_CHECK_NEGATIVE_TTL_MINUTES.
+# - Views never wait on a remote server: schedule_publication_check() hands the
+#   check to a background thread, and `manage.py check_links` re-checks stale links.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .email import notify_invalid_publication_url
+from .models import LinkCheck, Publication
+from .utils import is_document_response
+
+# Defaults used when the LINK_CHECK_* settings are not set
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 5
+DEFAULT_TTL_HOURS = 24
+DEFAULT_NEGATIVE_TTL_MINUTES = 60
+# Status codes from servers that refuse HEAD; those URLs are retried with a streamed GET
+HEAD_REFUSED = {403, 405, 501}
+
+_session = None
+_background = None
+_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_session():
+    """Return the process-wide requests.Session, sized for LINK_CHECK_WORKERS connections per host."""
+    global _session
+    with _lock:
+        if _session is None:
+            workers = _setting("LINK_CHECK_WORKERS", DEFAULT_WORKERS)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def probe(url, timeout=None):
+    """
+    Check one URL without touching the database.
+    Returns {"is_valid", "status_code", "content_type", "error"}.
+    """
+    timeout = timeout or _setting("LINK_CHECK_TIMEOUT", DEFAULT_TIMEOUT)
+    session = get_session()
+    try:
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+        if response.status_code in HEAD_REFUSED:
+            response = session.get(url, allow_redirects=True, timeout=timeout, stream=True)
+            response.close()  # Only the headers are needed
+    except requests.RequestException as e:
+        return {"is_valid": False, "status_code": None, "content_type": "", "error": str(e)[:500]}
+
+    content_type = response.headers.get("Content-Type", "")
+    return {
+        "is_valid": is_document_response(response.status_code, content_type),
+        "status_code": response.status_code,
+        "content_type": content_type[:200],
+        "error": "",
+    }
+
+
+def _expiry(now, is_valid):
+    if is_valid:
+        return now + timedelta(hours=_setting("LINK_CHECK_TTL_HOURS", DEFAULT_TTL_HOURS))
+    return now + timedelta(minutes=_setting("LINK_CHECK_NEGATIVE_TTL_MINUTES", DEFAULT_NEGATIVE_TTL_MINUTES))
+
+
+def check_urls(urls, force=False, workers=None):
+    """
+    Return {url: LinkCheck} for the given URLs.
+    Cached results that have not expired are reused unless force is set; the rest are
+    probed concurrently and written back in one upsert.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    if not urls:
+        return {}
+
+    cached = {}
+    if not force:
+        cached = {check.url: check for check in LinkCheck.objects.filter(url__in=urls, expires_at__gt=timezone.now())}
+    to_probe = [url for url in urls if url not in cached]
+
+    if to_probe:
+        workers = min(workers or _setting("LINK_CHECK_WORKERS", DEFAULT_WORKERS), len(to_probe))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="link-check") as pool:
+            results = list(pool.map(probe, to_probe))
+
+        now = timezone.now()
+        LinkCheck.objects.bulk_create(
+            [
+                LinkCheck(url=url, checked_at=now, expires_at=_expiry(now, result["is_valid"]), **result)
+                for url, result in zip(to_probe, results)
+            ],
+            update_conflicts=True,
+            unique_fields=["url"],
+            update_fields=["is_valid", "status_code", "content_type", "error", "checked_at", "expires_at"],
+        )
+        cached.update({check.url: check for check in LinkCheck.objects.filter(url__in=to_probe)})
+
+    return cached
+
+
+def cached_check(url):
+    """Return the cached LinkCheck for url (possibly expired), or None if it was never checked."""
+    return LinkCheck.objects.filter(url=url).first()
+
+
+def stale_publication_urls(limit=None):
+    """Publication URLs that were never checked or whose cached result has expired."""
+    fresh = LinkCheck.objects.filter(expires_at__gt=timezone.now()).values("url")
+    urls = (Publication.objects.exclude(url="").exclude(url__in=fresh)
+            .order_by().values_list("url", flat=True).distinct())
+    return list(urls[:limit] if limit else urls)
+
+
+def check_publication_links(publication_ids, notify_email=None, force=False):
+    """
+    Check the URLs of the given publications.
+    With notify_email, the researcher is emailed about each publication whose link is invalid.
+    Returns {publication_id: LinkCheck}.
+    """
+    publications = list(Publication.objects.filter(id__in=publication_ids).exclude(url="").select_related("project"))
+    checks = check_urls([publication.url for publication in publications], force=force)
+
+    results = {}
+    for publication in publications:
+        check = checks[publication.url]
+        results[publication.id] = check
+        if notify_email and not check.is_valid:
+            notify_invalid_publication_url(publication, notify_email)
+    return results
+
+
+def _run_in_background(publication_ids, notify_email):
+    try:
+        check_publication_links(publication_ids, notify_email=notify_email)
+    except Exception as e:
+        print(f"❌ Link check failed for publications {publication_ids}: {e}")
+    finally:
+        # Background threads get their own database connection; don't leak it
+        connection.close()
+
+
+def schedule_publication_check(publication_ids, notify_email=None):
+    """Check publication links on a background thread; returns immediately."""
+    global _background
+    with _lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="link-check-bg")
+    return _background.submit(_run_in_background, list(publication_ids), notify_email)
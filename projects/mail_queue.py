@@ -0,0 +1,245 @@
+# mail_queue.py
+#
+# Outbound mail queue. Sending code only inserts OutboundEmail rows;
+# `manage.py run_mail_worker` keeps one authenticated SMTP connection open and
+# delivers the queue in batches with
+# - retry with exponential backoff for temporary failures,
+# - a per-recipient rate limit (MAIL_QUEUE_RATE_LIMIT per MAIL_QUEUE_RATE_WINDOW_MINUTES),
+# - delivery status written back to OutboundEmail and Notification.is_email_sent
+#   (also for notifications summarized in a digest, see digests.py).
+
+import smtplib
+import ssl
+import time
+import uuid
+from datetime import timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Notification, OutboundEmail
+
+# Defaults used when the MAIL_QUEUE_* settings are not set
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 60
+DEFAULT_RATE_LIMIT = 20
+DEFAULT_RATE_WINDOW_MINUTES = 60
+# Seconds an idle worker keeps its SMTP connection before closing it
+DEFAULT_IDLE_SECONDS = 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(recipient, subject, html_body='', text_body='', notification=None):
+    """Queue one email for the mail worker and return the OutboundEmail."""
+    return OutboundEmail.objects.create(
+        recipient=recipient,
+        subject=subject,
+        html_body=html_body,
+        text_body=text_body,
+        notification=notification,
+    )
+
+
+def enqueue_many(recipients, subject, html_body='', text_body=''):
+    """Queue the same email for many recipients in one insert."""
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(recipient=recipient, subject=subject, html_body=html_body, text_body=text_body)
+        for recipient in dict.fromkeys(recipients) if recipient
+    ])
+
+
+def enqueue_all(emails):
+    """Queue already-built (unsaved) OutboundEmail instances in one insert."""
+    return OutboundEmail.objects.bulk_create([email for email in emails if email.recipient])
+
+
+def build_message(email, sender):
+    """Build the MIME message for a queued email."""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = email.subject
+    msg['From'] = sender
+    msg['To'] = email.recipient
+    if email.text_body:
+        msg.attach(MIMEText(email.text_body, 'plain', 'utf-8'))
+    if email.html_body:
+        msg.attach(MIMEText(email.html_body, 'html', 'utf-8'))
+    return msg
+
+
+class MailConnection:
+    """One SMTP session that is opened lazily, reused across messages and re-opened if dropped."""
+
+    def __init__(self):
+        self.host = _setting('EMAIL_HOST', 'smtp.gmail.com')
+        self.port = _setting('EMAIL_PORT', 587)
+        self.use_tls = _setting('EMAIL_USE_TLS', True)
+        # Credentials come from the environment through settings, never from source
+        self.username = _setting('EMAIL_HOST_USER', '')
+        self.password = _setting('EMAIL_HOST_PASSWORD', '')
+        self.sender = self.username or settings.DEFAULT_FROM_EMAIL
+        self.timeout = _setting('EMAIL_TIMEOUT', None) or 30
+        self.smtp = None
+        self.last_used = 0.0
+        self.opened = 0
+
+    def open(self):
+        if self.smtp is not None:
+            return
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls(context=ssl.create_default_context())
+        if self.username and self.password and smtp.has_extn('auth'):
+            smtp.login(self.username, self.password)
+        self.smtp = smtp
+        self.opened += 1
+
+    def close(self):
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        self.smtp = None
+
+    def close_if_idle(self, idle_seconds=None):
+        idle_seconds = idle_seconds or _setting('MAIL_QUEUE_IDLE_SECONDS', DEFAULT_IDLE_SECONDS)
+        if self.smtp is not None and time.monotonic() - self.last_used > idle_seconds:
+            self.close()
+
+    def send(self, email):
+        """Send one queued email, reconnecting once if the server dropped the session."""
+        message = build_message(email, self.sender).as_string()
+        for attempt in (1, 2):
+            self.open()
+            try:
+                self.smtp.sendmail(self.sender, [email.recipient], message)
+                self.last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.smtp = None
+                if attempt == 2:
+                    raise
+
+
+def claim_emails(batch_size=None):
+    """Atomically move up to batch_size due emails to 'sending' and return them."""
+    batch_size = batch_size or _setting('MAIL_QUEUE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        email_ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not email_ids:
+            return []
+        # Without SKIP LOCKED (SQLite) another worker may have read the same ids; only the rows
+        # still pending get this claim's token, so each email is returned to exactly one worker
+        token = uuid.uuid4().hex
+        OutboundEmail.objects.filter(id__in=email_ids, status='pending').update(
+            status='sending', attempts=F('attempts') + 1, claimed_at=now, claim_token=token
+        )
+    return list(OutboundEmail.objects.filter(claim_token=token, status='sending').order_by('id'))
+
+
+def requeue_stale_emails(older_than=timedelta(minutes=15)):
+    """Put emails left in 'sending' by a worker that died back into the queue."""
+    cutoff = timezone.now() - older_than
+    return OutboundEmail.objects.filter(status='sending', claimed_at__lt=cutoff).update(status='pending')
+
+
+def _recent_counts(recipients):
+    window = timedelta(minutes=_setting('MAIL_QUEUE_RATE_WINDOW_MINUTES', DEFAULT_RATE_WINDOW_MINUTES))
+    rows = (OutboundEmail.objects.filter(recipient__in=recipients, status='sent', sent_at__gte=timezone.now() - window)
+            .values_list('recipient').annotate(count=Count('id')).order_by())
+    return dict(rows)
+
+
+def _is_temporary(error):
+    """True if the server rejected a message with a 4xx (try again later) reply."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+    else:
+        codes = [error.smtp_code]
+    return bool(codes) and all(400 <= code < 500 for code in codes)
+
+
+def deliver(emails, mail_connection):
+    """
+    Send a batch of claimed emails over one connection.
+    Returns (sent, deferred, failed) counts.
+    """
+    rate_limit = _setting('MAIL_QUEUE_RATE_LIMIT', DEFAULT_RATE_LIMIT)
+    window = timedelta(minutes=_setting('MAIL_QUEUE_RATE_WINDOW_MINUTES', DEFAULT_RATE_WINDOW_MINUTES))
+    max_attempts = _setting('MAIL_QUEUE_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    backoff = _setting('MAIL_QUEUE_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS)
+
+    counts = _recent_counts({email.recipient for email in emails})
+    sent_ids, sent_notification_ids = [], []
+    deferred = failed = 0
+    for email in emails:
+        if counts.get(email.recipient, 0) >= rate_limit:
+            # Over the per-recipient limit: try again once the window has moved on, without using up an attempt
+            OutboundEmail.objects.filter(id=email.id).update(
+                status='pending', attempts=F('attempts') - 1, next_attempt_at=timezone.now() + window
+            )
+            deferred += 1
+            continue
+
+        try:
+            mail_connection.send(email)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+            if not _is_temporary(e):
+                # Permanent rejection of this message: retrying will not help
+                OutboundEmail.objects.filter(id=email.id).update(status='failed', last_error=str(e)[:1000])
+                failed += 1
+                continue
+            # 4xx (mailbox busy, greylisting...): retry later; the session itself is still usable
+            error = e
+        except (smtplib.SMTPException, OSError) as e:
+            mail_connection.close()
+            error = e
+        else:
+            error = None
+
+        if error is not None:
+            if email.attempts >= max_attempts:
+                OutboundEmail.objects.filter(id=email.id).update(status='failed', last_error=str(error)[:1000])
+                failed += 1
+            else:
+                delay = timedelta(seconds=backoff * 2 ** (email.attempts - 1))
+                OutboundEmail.objects.filter(id=email.id).update(
+                    status='pending', last_error=str(error)[:1000], next_attempt_at=timezone.now() + delay
+                )
+                deferred += 1
+            continue
+
+        counts[email.recipient] = counts.get(email.recipient, 0) + 1
+        sent_ids.append(email.id)
+        if email.notification_id:
+            sent_notification_ids.append(email.notification_id)
+
+    if sent_ids:
+        OutboundEmail.objects.filter(id__in=sent_ids).update(status='sent', sent_at=timezone.now(), last_error='')
+    if sent_ids:
+        # Notifications emailed on their own, and those summarized in a delivered digest
+        Notification.objects.filter(Q(id__in=sent_notification_ids) | Q(digest_id__in=sent_ids)).update(is_email_sent=True)
+    return len(sent_ids), deferred, failed
+
+
+def run_pending_emails(mail_connection, batch_size=None):
+    """Claim and deliver one batch. Returns (claimed, sent, deferred, failed)."""
+    emails = claim_emails(batch_size)
+    if not emails:
+        return 0, 0, 0, 0
+    return (len(emails),) + deliver(emails, mail_connection)
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import Project, Publication
+from projects.AI.model_registry import get_model
+from projects.AI.parity import compare_encoders
+
+
+class Command(BaseCommand):
+    help = 'Check that an ONNX / int8 encoder backend finds the same top-k matches as the float model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            choices=['onnx', 'int8'],
+            default=None,
+            help='Backend to check against the float model (default: settings.AI_MATCHING_BACKEND)'
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=5,
+            help='Number of nearest projects compared per publication (default: 5)'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.9,
+            help='Minimum mean top-k overlap required to pass (default: 0.9)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Only use the first N projects and N publications'
+        )
+
+    def handle(self, *args, **options):
+        # Imported here so the command module itself stays cheap to load
+        import pandas as pd
+        from projects.AI import nlp_ba_model_1_with_adminreq_ as matcher
+
+        backend = options['backend'] or getattr(settings, 'AI_MATCHING_BACKEND', 'torch')
+        if backend == 'torch':
+            raise CommandError("AI_MATCHING_BACKEND is 'torch'; pass --backend onnx or --backend int8.")
+
+        projects = Project.objects.order_by('id').values('title')
+        papers = Publication.objects.order_by('id').values('title', 'abstract', 'body_text__text')
+        if options['limit']:
+            projects, papers = projects[:options['limit']], papers[:options['limit']]
+        projects, papers = list(projects), list(papers)
+        if not projects or not papers:
+            raise CommandError("Need at least one project and one publication to compare.")
+        # Built by the matcher's own helpers, so the texts compared are the ones it encodes
+        project_texts = list(matcher.project_texts(pd.DataFrame(projects)))
+        paper_texts = list(matcher.paper_texts(pd.DataFrame(papers)))
+
+        result = compare_encoders(
+            get_model(backend='torch'), get_model(backend=backend),
+            project_texts, paper_texts, k=options['top_k'],
+        )
+
+        self.stdout.write(
+            f"{backend}: top-{options['top_k']} overlap {result['overlap']:.3f}, "
+            f"cosine min {result['min_cosine']:.4f} / mean {result['mean_cosine']:.4f}, "
+            f"{result['speedup']:.2f}x faster ({result['reference_seconds']:.2f}s -> {result['candidate_seconds']:.2f}s)"
+        )
+        if result['overlap'] < options['tolerance']:
+            raise CommandError(
+                f"Top-k overlap {result['overlap']:.3f} is below the tolerance {options['tolerance']}."
+            )
+        self.stdout.write(self.style.SUCCESS("Encoder backends agree within tolerance."))
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.link_checker import check_urls, stale_publication_urls
+from projects.models import Publication
+
+
+class Command(BaseCommand):
+    help = 'Validate publication download links concurrently, re-checking those whose cached result expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-check every publication URL, ignoring cached results'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent checks (default: settings.LINK_CHECK_WORKERS)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Check at most this many stale URLs per pass'
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running, re-checking stale links every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=300.0,
+            help='Seconds between passes with --watch (default: 300)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                if options['all']:
+                    urls = list(Publication.objects.exclude(url='').order_by()
+                                .values_list('url', flat=True).distinct())
+                else:
+                    urls = stale_publication_urls(limit=options['limit'])
+
+                if urls:
+                    start = time.perf_counter()
+                    checks = check_urls(urls, force=options['all'], workers=options['workers'])
+                    invalid = sum(1 for check in checks.values() if not check.is_valid)
+                    self.stdout.write(
+                        f"Checked {len(checks)} link(s) in {time.perf_counter() - start:.1f}s, {invalid} invalid."
+                    )
+                options['all'] = False  # Later passes only pick up expired results
+                if not options['watch']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Link check finished."))
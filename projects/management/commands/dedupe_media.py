@@ -0,0 +1,136 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from projects.models import Publication, StoredBlob
+from projects.storage import INCOMING_DIR, blob_name, get_publication_storage, hash_file
+
+# Publication fields backed by content-addressed storage
+FIELDS = ('file', 'image')
+
+
+class Command(BaseCommand):
+    help = 'Move publication files and images into content-addressed storage, removing duplicate copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be moved and freed without touching files or the database'
+        )
+        parser.add_argument(
+            '--delete-orphans',
+            action='store_true',
+            help='Also delete files in the upload directories that no publication refers to'
+        )
+
+    def handle(self, *args, **options):
+        storage = get_publication_storage()
+        dry_run = options['dry_run']
+        moved = removed = freed = missing = 0
+        stored = set()  # Targets written during this run (lets --dry-run count duplicates correctly)
+
+        for field in FIELDS:
+            names = list(Publication.objects.exclude(**{field: ''})
+                         .values_list(field, flat=True).distinct())
+            for name in names:
+                full_path = storage.path(name)
+                if not os.path.exists(full_path):
+                    missing += 1
+                    self.stdout.write(f"Missing: {name}")
+                    continue
+
+                digest, size = hash_file(full_path)
+                target = blob_name(self.upload_dir(field, name), digest)
+                if target == name:
+                    continue  # Already content-addressed
+
+                target_path = storage.path(target)
+                duplicate = target in stored or os.path.exists(target_path)
+                if duplicate:
+                    removed += 1
+                    freed += size
+                else:
+                    moved += 1
+                stored.add(target)
+                if dry_run:
+                    continue
+
+                if not duplicate:
+                    # The old copy stays in place until no row refers to it
+                    self.place(full_path, target_path)
+                with transaction.atomic():
+                    # Queryset update: rewriting the path must not re-queue AI matching
+                    Publication.objects.filter(**{field: name}).update(**{field: target})
+                    StoredBlob.objects.get_or_create(path=target, defaults={'sha256': digest, 'size': size})
+                # Committed: the rows now point at target, so the old name can go
+                os.remove(full_path)
+
+        if not dry_run:
+            self.recount_references()
+
+        if options['delete_orphans']:
+            orphans, orphan_bytes = self.delete_orphans(storage, dry_run)
+            removed += orphans
+            freed += orphan_bytes
+
+        prefix = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {moved} file(s) into content-addressed storage, removed {removed} duplicate/orphan "
+            f"file(s), freeing {freed / (1024 * 1024):.1f} MB ({missing} missing)."
+        ))
+
+    def place(self, source, target_path):
+        """Give target_path the content of source without removing source (hard link, else a copy)."""
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            os.link(source, target_path)
+        except OSError:
+            # Copied under a temporary name so a partial copy never sits at a blob's name
+            temp_path = f"{target_path}.{os.getpid()}.tmp"
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, target_path)
+
+    def upload_dir(self, field, name):
+        """Keep each blob under its field's upload_to directory."""
+        upload_to = Publication._meta.get_field(field).upload_to.rstrip('/')
+        return f"{upload_to}/{os.path.basename(name)}"
+
+    def recount_references(self):
+        """Set every blob's refcount to the number of publication fields that point at it."""
+        counts = {}
+        for field in FIELDS:
+            for path, count in (Publication.objects.exclude(**{field: ''})
+                                .values_list(field).annotate(count=Count('id')).order_by()):
+                counts[path] = counts.get(path, 0) + count
+
+        blobs = list(StoredBlob.objects.all())
+        for blob in blobs:
+            blob.refcount = counts.get(blob.path, 0)
+        StoredBlob.objects.bulk_update(blobs, ['refcount'], batch_size=500)
+
+    def delete_orphans(self, storage, dry_run):
+        """Remove files under the upload directories that nothing refers to."""
+        referenced = set(StoredBlob.objects.filter(refcount__gt=0).values_list('path', flat=True))
+        for field in FIELDS:
+            referenced.update(Publication.objects.exclude(**{field: ''}).values_list(field, flat=True))
+
+        count = size = 0
+        for field in FIELDS:
+            root = storage.path(Publication._meta.get_field(field).upload_to)
+            for directory, _, files in os.walk(root):
+                for file_name in files:
+                    full_path = os.path.join(directory, file_name)
+                    name = os.path.relpath(full_path, storage.location).replace(os.sep, '/')
+                    if name in referenced or name.startswith(INCOMING_DIR):
+                        continue
+                    count += 1
+                    size += os.path.getsize(full_path)
+                    if not dry_run:
+                        os.remove(full_path)
+        if not dry_run:
+            StoredBlob.objects.filter(refcount=0).delete()
+        return count, size
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from projects.AI.model_registry import get_model_name
+
+
+class Command(BaseCommand):
+    help = 'Export the matching encoder to ONNX (optionally int8-quantized) for AI_MATCHING_BACKEND = "onnx"'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Directory to write the exported model to (use it as AI_MATCHING_MODEL_PATH)'
+        )
+        parser.add_argument(
+            '--quantize',
+            choices=['arm64', 'avx2', 'avx512', 'avx512_vnni'],
+            default=None,
+            help='Also write an int8-quantized ONNX file tuned for this CPU family'
+        )
+
+    def handle(self, *args, **options):
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+        name = get_model_name(backend='torch')
+        model = SentenceTransformer(name, device='cpu', backend='onnx')
+        model.save_pretrained(options['output'])
+        self.stdout.write(f"Exported {name} to {options['output']}/onnx/model.onnx")
+
+        if options['quantize']:
+            export_dynamic_quantized_onnx_model(model, options['quantize'], options['output'])
+            for path in sorted(Path(options['output'], 'onnx').glob(f"model_*int8_{options['quantize']}.onnx")):
+                self.stdout.write(
+                    f"Set AI_MATCHING_ONNX_FILE = \"onnx/{path.name}\" to use the int8 copy."
+                )
+        self.stdout.write(self.style.SUCCESS("Export finished."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from projects.AI.text_extraction import extract_publication_texts
+
+
+class Command(BaseCommand):
+    help = 'Extract body text from uploaded publication files for AI matching (cached by file hash)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes used to hash and parse files (default: 1)'
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Re-hash files of publications that already have text (picks up re-uploaded files)'
+        )
+
+    def handle(self, *args, **options):
+        linked, parsed = extract_publication_texts(workers=options['workers'], refresh=options['refresh'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Linked {linked} publication(s) to extracted text; parsed {parsed} new file(s)."
+        ))
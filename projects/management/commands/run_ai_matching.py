@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import Publication
+from projects.AI import match_all_projects_and_papers, match_publication
+
+
+class Command(BaseCommand):
+    help = 'Run AI project/publication matching for one publication or, with --all, for the whole corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--publication',
+            type=int,
+            help='ID of a single publication to match against all projects'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Sweep every project against every publication (batch mode)'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.65,
+            help='Minimum cosine similarity for a match (default: 0.65)'
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=3,
+            help='Number of nearest candidates to consider (default: 3)'
+        )
+
+    def handle(self, *args, **options):
+        if options['publication'] is None and not options['all']:
+            raise CommandError("Pass --publication ID or --all.")
+
+        if options['publication'] is not None:
+            try:
+                publication = Publication.objects.get(pk=options['publication'])
+            except Publication.DoesNotExist:
+                raise CommandError(f"Publication {options['publication']} does not exist.")
+            matches = match_publication(publication, threshold=options['threshold'], top_k=options['top_k'])
+        else:
+            matches = match_all_projects_and_papers(threshold=options['threshold'], top_k=options['top_k'])
+
+        count = 0 if matches is None else len(matches)
+        self.stdout.write(self.style.SUCCESS(f"AI matching finished with {count} new match request(s)."))
@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from projects.digests import flush_digests
+from projects.mail_queue import MailConnection, requeue_stale_emails, run_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Queue due notification digests and deliver outbound emails over one persistent SMTP connection until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails to claim per iteration (default: settings.MAIL_QUEUE_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=15,
+            help='Minutes after which an email left in "sending" is considered abandoned and re-queued (default: 15)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_emails(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} abandoned email(s).")
+
+        mail_connection = MailConnection()
+        total = 0
+        started = time.perf_counter()
+        self.stdout.write("Mail worker started.")
+        try:
+            while True:
+                # Turn notifications whose digest window has elapsed into queued digest emails
+                flush_digests()
+                batch_started = time.perf_counter()
+                claimed, sent, deferred, failed = run_pending_emails(mail_connection, batch_size=options['batch_size'])
+                if claimed:
+                    total += sent
+                    elapsed = time.perf_counter() - batch_started
+                    self.stdout.write(
+                        f"Sent {sent}, deferred {deferred}, failed {failed} of {claimed} email(s) "
+                        f"({sent / elapsed if elapsed else 0:.1f} msgs/sec)."
+                    )
+                    continue
+                if options['once']:
+                    break
+                mail_connection.close_if_idle()
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            mail_connection.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Mail worker stopped: {total} email(s) sent over {mail_connection.opened} connection(s) in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from projects.matching_jobs import requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued AI matching jobs in batches until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Jobs to claim per iteration (default: settings.AI_MATCHING_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when the queue is empty (default: 5)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=30,
+            help='Minutes after which a running job is considered abandoned and re-queued (default: 30)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} abandoned job(s).")
+
+        self.stdout.write("Matching worker started.")
+        try:
+            while True:
+                processed, created = run_pending_jobs(batch_size=options['batch_size'])
+                if processed:
+                    self.stdout.write(f"Processed {processed} job(s), created {created} match request(s).")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Matching worker stopped."))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from projects.email import send_due_project_reminders
+
+
+class Command(BaseCommand):
+    help = 'Queue upload reminders for projects whose reminder or end date has passed and that were not notified yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            default=None,
+            help='Treat this day (YYYY-MM-DD) as today (default: today)'
+        )
+
+    def handle(self, *args, **options):
+        sent = send_due_project_reminders(today=options['date'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Queued {sent['reminder.html']} upload reminder(s) and {sent['upload_reminder.html']} final reminder(s)."
+        ))
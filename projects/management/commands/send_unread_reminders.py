@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from projects.email import send_unread_message_reminders
+
+
+class Command(BaseCommand):
+    help = 'Queue one reminder per user about messages left unread, each message at most once'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=2,
+            help='Only remind about messages unread for longer than this many hours (default: 2)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Recipients fetched and queued per chunk (default: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        reminders, messages = send_unread_message_reminders(
+            older_than=timedelta(hours=options['hours']), chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Queued {reminders} reminder(s) covering {messages} unread message(s)."
+        ))
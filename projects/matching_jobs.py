@@ -0,0 +1,109 @@
+# matching_jobs.py
+#
+# Database-backed job queue for AI matching. Saving a publication only queues a
+# MatchingJob; `manage.py run_matching_worker` claims pending jobs in batches,
+# encodes the publications together and writes the MatchRequest rows.
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MatchingJob, Publication
+from projects.AI.text_extraction import extract_publication_texts
+# Lazy facade: processes that only enqueue jobs never load the NLP stack
+from projects.AI import match_publications
+
+# Jobs claimed per worker iteration when AI_MATCHING_BATCH_SIZE is not set
+DEFAULT_BATCH_SIZE = 32
+# Attempts before a job is marked failed when AI_MATCHING_MAX_ATTEMPTS is not set
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def enqueue_publication(publication_id):
+    """
+    Queue a matching job for a publication.
+    Does nothing if the publication already has a job waiting to be picked up.
+    """
+    if MatchingJob.objects.filter(publication_id=publication_id, status='pending').exists():
+        return None
+    return MatchingJob.objects.create(publication_id=publication_id)
+
+
+def claim_jobs(batch_size=None):
+    """
+    Atomically move up to batch_size pending jobs to 'running' and return them.
+    Uses SKIP LOCKED where the database supports it so several workers can share the queue.
+    """
+    batch_size = batch_size or getattr(settings, 'AI_MATCHING_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    with transaction.atomic():
+        pending = MatchingJob.objects.filter(status='pending').order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        job_ids = list(pending.values_list('id', flat=True)[:batch_size])
+        if not job_ids:
+            return []
+        # Only the jobs still pending get this claim's token, so a job read by two workers runs once
+        token = uuid.uuid4().hex
+        MatchingJob.objects.filter(id__in=job_ids, status='pending').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+            claim_token=token,
+        )
+    return list(MatchingJob.objects.filter(claim_token=token, status='running'))
+
+
+def requeue_stale_jobs(older_than=timedelta(minutes=30)):
+    """Put 'running' jobs whose worker apparently died back into the queue."""
+    cutoff = timezone.now() - older_than
+    return MatchingJob.objects.filter(status='running', started_at__lt=cutoff).update(status='pending')
+
+
+def process_jobs(jobs, threshold=0.65, top_k=3):
+    """
+    Extract the text of any new or replaced uploads, then match the publications of a batch of
+    claimed jobs in one encoder pass.
+    - On success, marks jobs done and records ai_processed / ai_confidence on each publication.
+    - On failure, re-queues jobs that still have attempts left and marks the rest failed.
+    Returns the number of match requests created.
+    """
+    if not jobs:
+        return 0
+
+    job_ids = [job.id for job in jobs]
+    publication_ids = sorted({job.publication_id for job in jobs})
+
+    try:
+        # Pipeline stage: pull body text out of new or replaced files before they are encoded.
+        # refresh re-hashes the batch's files so a re-upload doesn't keep its predecessor's text;
+        # only content not seen before is parsed.
+        extract_publication_texts(Publication.objects.filter(id__in=publication_ids), refresh=True)
+        matched_df, best_scores = match_publications(publication_ids, threshold=threshold, top_k=top_k)
+    except Exception as e:
+        max_attempts = getattr(settings, 'AI_MATCHING_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        MatchingJob.objects.filter(id__in=job_ids, attempts__lt=max_attempts).update(
+            status='pending', error=str(e)
+        )
+        MatchingJob.objects.filter(id__in=job_ids, status='running').update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+        print(f"❌ Matching batch failed for publications {publication_ids}: {e}")
+        return 0
+
+    # Use queryset updates so recording progress doesn't fire post_save and re-queue the publication
+    Publication.objects.filter(id__in=publication_ids).update(ai_processed=True)
+    for publication_id, score in best_scores.items():
+        Publication.objects.filter(id=publication_id).update(ai_confidence=score)
+
+    MatchingJob.objects.filter(id__in=job_ids).update(status='done', error='', finished_at=timezone.now())
+    return len(matched_df)
+
+
+def run_pending_jobs(batch_size=None, threshold=0.65, top_k=3):
+    """Claim and process one batch. Returns (jobs processed, match requests created)."""
+    jobs = claim_jobs(batch_size)
+    return len(jobs), process_jobs(jobs, threshold=threshold, top_k=top_k)
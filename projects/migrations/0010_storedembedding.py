@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_alter_message_options_alter_messagerequest_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('publication', 'Publication')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('model_name', models.CharField(max_length=200)),
+                ('content_hash', models.CharField(max_length=40)),
+                ('dim', models.PositiveIntegerField()),
+                ('vector', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id', 'model_name')},
+            },
+        ),
+    ]
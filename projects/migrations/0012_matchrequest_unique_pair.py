@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+
+def remove_duplicate_match_requests(apps, schema_editor):
+    """Keep one MatchRequest per (project, publication): a reviewed one if any, else the newest."""
+    MatchRequest = apps.get_model('projects', 'MatchRequest')
+    keep = {}
+    duplicates = []
+    for match in MatchRequest.objects.order_by('id').values('id', 'project_id', 'publication_id', 'approved'):
+        pair = (match['project_id'], match['publication_id'])
+        kept = keep.get(pair)
+        if kept is None:
+            keep[pair] = match
+        elif kept['approved'] is not None and match['approved'] is None:
+            duplicates.append(match['id'])
+        else:
+            duplicates.append(kept['id'])
+            keep[pair] = match
+    for start in range(0, len(duplicates), 500):
+        MatchRequest.objects.filter(id__in=duplicates[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_matchingjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_match_requests, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='matchrequest',
+            constraint=models.UniqueConstraint(fields=('project', 'publication'), name='unique_match_request_pair'),
+        ),
+    ]
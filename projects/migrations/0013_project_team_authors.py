@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:16
+
+from django.db import migrations, models
+
+
+def resolve_existing_teams(apps, schema_editor):
+    """Parse every project's free-text team into Author ids once."""
+    from projects.AI.author_index import normalize_email, normalize_name, split_team
+
+    Author = apps.get_model('projects', 'Author')
+    Project = apps.get_model('projects', 'Project')
+
+    by_name, by_email = {}, {}
+    for author_id, name, email in Author.objects.values_list('id', 'name', 'email'):
+        if name:
+            by_name.setdefault(normalize_name(name), author_id)
+        if email:
+            by_email.setdefault(normalize_email(email), author_id)
+
+    for project in Project.objects.all():
+        names, emails = split_team(project.team)
+        author_ids = {by_name[name] for name in names if name in by_name}
+        author_ids |= {by_email[email] for email in emails if email in by_email}
+        if author_ids:
+            project.team_authors.set(author_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_matchrequest_unique_pair'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='team_authors',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='team_projects', to='projects.author'),
+        ),
+        migrations.RunPython(resolve_existing_teams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_project_team_authors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=40, unique=True)),
+                ('text', models.TextField(blank=True)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='body_text',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='publications', to='projects.publicationtext'),
+        ),
+    ]
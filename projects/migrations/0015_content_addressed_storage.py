@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:30
+
+import projects.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_publicationtext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='publication',
+            name='file',
+            field=models.FileField(blank=True, storage=projects.storage.get_publication_storage, upload_to='publications/files/'),
+        ),
+        migrations.AlterField(
+            model_name='publication',
+            name='image',
+            field=models.ImageField(blank=True, storage=projects.storage.get_publication_storage, upload_to='publications/images/'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='digest',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='digested_notifications', to='projects.outboundemail'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='digested_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
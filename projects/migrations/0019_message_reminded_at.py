@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0018_notification_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['is_read', 'reminded_at', 'sent_at'], name='message_reminder_due_idx'),
+        ),
+    ]
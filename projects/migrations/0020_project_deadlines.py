@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    """
+    Parse every existing project's duration into end_date / reminder_date once.
+    Stages whose date has already passed are marked as sent: nothing tracked them
+    before, so the first send_due_reminders run would otherwise remind every old project.
+    """
+    from django.utils import timezone
+    from projects.deadlines import compute_deadlines
+
+    Project = apps.get_model('projects', 'Project')
+    today, now = timezone.localdate(), timezone.now()
+    projects = list(Project.objects.only('id', 'created', 'duration'))
+    for project in projects:
+        project.end_date, project.reminder_date = compute_deadlines(project.created, project.duration)
+        if project.reminder_date and project.reminder_date <= today:
+            project.reminder_sent_at = now
+        if project.end_date and project.end_date <= today:
+            project.final_reminder_sent_at = now
+    Project.objects.bulk_update(
+        projects, ['end_date', 'reminder_date', 'reminder_sent_at', 'final_reminder_sent_at'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0019_message_reminded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='end_date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='final_reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='reminder_date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
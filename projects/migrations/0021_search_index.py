@@ -0,0 +1,51 @@
+from django.db import migrations
+
+from projects.search import TABLES
+
+
+def create_search_tables(apps, schema_editor):
+    """Create the full-text index tables for this database, then fill them."""
+    vendor = schema_editor.connection.vendor
+    for table in TABLES.values():
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                f"title, body, authors, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute(f"CREATE TABLE IF NOT EXISTS {table} (rowid bigint PRIMARY KEY, document tsvector NOT NULL)")
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {table}_document ON {table} USING GIN (document)")
+        else:
+            return  # No index on this database; projects.search falls back to icontains
+
+    # Fill the index from the historical models (the current ones may have columns this schema lacks)
+    from projects.search import project_document, publication_document, write_rows
+
+    Project = apps.get_model('projects', 'Project')
+    Publication = apps.get_model('projects', 'Publication')
+    write_rows('project', [(project.id,) + project_document(project) for project in Project.objects.all()], replace=False)
+
+    names = {}
+    for publication_id, name in Publication.objects.filter(primary_author__isnull=False).values_list('id', 'primary_author__name'):
+        names.setdefault(publication_id, []).append(name)
+    for publication_id, name in Publication.collaborators.through.objects.values_list('publication_id', 'author__name'):
+        names.setdefault(publication_id, []).append(name)
+    write_rows('publication', [(publication.id,) + publication_document(publication, names.get(publication.id, ()))
+                               for publication in Publication.objects.all()], replace=False)
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for table in TABLES.values():
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0020_project_deadlines'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
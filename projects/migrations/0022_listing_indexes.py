@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0021_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created', 'id'], name='project_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['year', 'id'], name='publication_year_id_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def watermarks_from_read_receipts(apps, schema_editor):
+    """One watermark per (group, reader) at the newest message they had marked read."""
+    GroupMessage = apps.get_model('projects', 'GroupMessage')
+    GroupReadWatermark = apps.get_model('projects', 'GroupReadWatermark')
+    receipts = (GroupMessage.is_read_by.through.objects
+                .values('groupmessage__group_id', 'user_id')
+                .annotate(last_read=Max('groupmessage_id'))
+                .order_by())
+    GroupReadWatermark.objects.bulk_create([
+        GroupReadWatermark(group_id=row['groupmessage__group_id'], user_id=row['user_id'],
+                           last_read_message_id=row['last_read'])
+        for row in receipts
+    ], batch_size=500)
+
+
+def read_receipts_from_watermarks(apps, schema_editor):
+    """Expand each watermark back into per-message receipts for others' messages up to it."""
+    GroupMessage = apps.get_model('projects', 'GroupMessage')
+    GroupReadWatermark = apps.get_model('projects', 'GroupReadWatermark')
+    Receipt = GroupMessage.is_read_by.through
+    for watermark in GroupReadWatermark.objects.iterator():
+        message_ids = (GroupMessage.objects.filter(group_id=watermark.group_id, id__lte=watermark.last_read_message_id)
+                       .exclude(sender_id=watermark.user_id).values_list('id', flat=True))
+        Receipt.objects.bulk_create([Receipt(groupmessage_id=message_id, user_id=watermark.user_id)
+                                     for message_id in message_ids], batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0022_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupReadWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_watermarks', to='projects.groupchat')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_read_watermarks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('group', 'user')},
+            },
+        ),
+        migrations.RunPython(watermarks_from_read_receipts, read_receipts_from_watermarks),
+        migrations.RemoveField(
+            model_name='groupmessage',
+            name='is_read_by',
+        ),
+    ]
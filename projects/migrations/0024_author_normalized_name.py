@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+def backfill_normalized_names(apps, schema_editor):
+    """Normalize every author's name once and re-resolve project teams against it."""
+    from projects.AI.author_index import normalize_email, normalize_name, split_team
+
+    Author = apps.get_model('projects', 'Author')
+    Project = apps.get_model('projects', 'Project')
+
+    authors = list(Author.objects.only('id', 'name'))
+    for author in authors:
+        author.normalized_name = normalize_name(author.name)
+    Author.objects.bulk_update(authors, ['normalized_name'], batch_size=500)
+
+    # Teams saved since 0013 were resolved against raw names and lost titled authors
+    by_name, by_email = {}, {}
+    for author_id, name, email in Author.objects.values_list('id', 'normalized_name', 'email'):
+        if name:
+            by_name.setdefault(name, author_id)
+        if email:
+            by_email.setdefault(normalize_email(email), author_id)
+    for project in Project.objects.all():
+        names, emails = split_team(project.team)
+        author_ids = {by_name[name] for name in names if name in by_name}
+        author_ids |= {by_email[email] for email in emails if email in by_email}
+        project.team_authors.set(author_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0023_group_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+    ]
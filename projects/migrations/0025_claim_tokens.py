@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0024_author_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingjob',
+            name='claim_token',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='claim_token',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+    ]
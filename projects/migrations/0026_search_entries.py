@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from projects.search import TABLES
+
+
+def _rename_postgres_keys(schema_editor, old, new):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for table in TABLES.values():
+            columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+            if old in columns:
+                schema_editor.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+
+
+def rename_postgres_keys(apps, schema_editor):
+    """Rename the key of PostgreSQL index tables created with an id column to rowid, as FTS5 tables are keyed."""
+    _rename_postgres_keys(schema_editor, 'id', 'rowid')
+
+
+def restore_postgres_keys(apps, schema_editor):
+    _rename_postgres_keys(schema_editor, 'rowid', 'id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0025_claim_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSearchEntry',
+            fields=[
+                ('project', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='projects.project')),
+            ],
+            options={
+                'db_table': 'project_search',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PublicationSearchEntry',
+            fields=[
+                ('publication', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='projects.publication')),
+            ],
+            options={
+                'db_table': 'publication_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(rename_postgres_keys, restore_postgres_keys),
+    ]
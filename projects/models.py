@@ -4,6 +4,9 @@ from django.core.exceptions import ValidationError
 import uuid
 from django.contrib.auth.models import User
 from django.utils import timezone
+
+from .deadlines import compute_deadlines
+from .storage import get_publication_storage
 # The Project model represents a research or work project.
 class Project(models.Model):
     # Project title
@@ -12,10 +15,20 @@ class Project(models.Model):
     created = models.DateField()
     # Team members involved in the project
     team = models.CharField(max_length=300)
+    # Authors resolved from the free-text team field (kept in sync on save, used for AI matching)
+    team_authors = models.ManyToManyField('Author', related_name='team_projects', blank=True, editable=False)
     # Project abstract, defaulting to a placeholder if not provided
     abstract = models.TextField(default="No abstract yet")
     # Duration or timeframe of the project
     duration = models.CharField(max_length=100)
+    # End of the project, derived from created + duration on save (null if the duration can't be parsed)
+    end_date = models.DateField(null=True, blank=True, editable=False, db_index=True)
+    # Date the upload reminder becomes due (90% of the way to end_date), derived on save
+    reminder_date = models.DateField(null=True, blank=True, editable=False, db_index=True)
+    # When the upload reminder was sent (reset if the deadline moves)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # When the final reminder was sent after end_date (reset if the deadline moves)
+    final_reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
     # Domain or field of research/study
     domain = models.CharField(max_length=100)
     # Scientific case or justification for the project
@@ -43,6 +56,22 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            # Serves the keyset-paginated project listing, ordered on (created, id) either way
+            models.Index(fields=['created', 'id'], name='project_created_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the indexed deadline columns in sync with the free-text duration
+        end_date, reminder_date = compute_deadlines(self.created, self.duration)
+        if (end_date, reminder_date) != (self.end_date, self.reminder_date):
+            self.end_date, self.reminder_date = end_date, reminder_date
+            self.reminder_sent_at = self.final_reminder_sent_at = None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {
+                    'end_date', 'reminder_date', 'reminder_sent_at', 'final_reminder_sent_at'
+                }
+        super().save(*args, **kwargs)
 
     def get_keywords_list(self):
         """Get keywords as a list"""
@@ -62,6 +91,8 @@ class Project(models.Model):
 class Author(models.Model):
     # Author's name must be unique; can be null or blank
     name = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    # Name as team mentions are compared to it (lower-case, no titles or punctuation), kept in sync on save
+    normalized_name = models.CharField(max_length=200, blank=True, db_index=True, editable=False)
     # Author's email address
     email = models.EmailField()
     # Author's profile picture
@@ -84,6 +115,15 @@ class Author(models.Model):
     class Meta:
         ordering = ['name']
 
+    def save(self, *args, **kwargs):
+        from projects.AI.author_index import normalize_name
+
+        self.normalized_name = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_name'}
+        super().save(*args, **kwargs)
+
     def get_publications_count(self):
         """Get total number of publications by this author"""
         return self.primary_publications.count() + self.collaborated_publications.count()
@@ -141,9 +181,9 @@ class Publication(models.Model):
     # Year of publication
     year = models.PositiveIntegerField()
     # Optional file upload for the publication (e.g., PDF)
-    file = models.FileField(upload_to='publications/files/', blank=True)
+    file = models.FileField(upload_to='publications/files/', storage=get_publication_storage, blank=True)
     # Optional image related to the publication
-    image = models.ImageField(upload_to='publications/images/', blank=True)
+    image = models.ImageField(upload_to='publications/images/', storage=get_publication_storage, blank=True)
     # Publication type (from the choices defined above)
     type = models.CharField(max_length=100, choices=PUBLICATION_TYPES)
     # Collaborators, can be multiple authors
@@ -158,6 +198,9 @@ class Publication(models.Model):
     ai_processed = models.BooleanField(default=False)
     # AI confidence score
     ai_confidence = models.FloatField(null=True, blank=True)
+    # Text extracted from the uploaded file (shared by every publication with identical file content)
+    body_text = models.ForeignKey('PublicationText', on_delete=models.SET_NULL, related_name='publications',
+                                  null=True, blank=True, editable=False)
 
     # Custom validation: ensures either file or URL is provided for the publication
     def clean(self):
@@ -185,6 +228,12 @@ class Publication(models.Model):
             author_names = [author.name for author in authors[:-1]]
             return f"{', '.join(author_names)}, and {authors[-1].name}"
 
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated publication listing, ordered on (year, id) either way
+            models.Index(fields=['year', 'id'], name='publication_year_id_idx'),
+        ]
+
     # Returns the publication title when the object is printed
     def __str__(self):
         if self.primary_author:
@@ -237,10 +286,153 @@ class MatchRequest(models.Model):
     # Approval status (nullable)
     approved = models.BooleanField(null=True)
 
+    class Meta:
+        # One match request per (project, publication) pair; re-runs update it in place
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'publication'], name='unique_match_request_pair'),
+        ]
+
     # Returns a string describing the match request
     def __str__(self):
         return f"MatchRequest({self.project.title} ← {self.publication.title})"
 
+# StoredEmbedding model caches the sentence embedding of a project or publication for the AI matcher.
+class StoredEmbedding(models.Model):
+    KIND_CHOICES = [
+        ('project', 'Project'),
+        ('publication', 'Publication'),
+    ]
+    # Which model the embedded object belongs to
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Primary key of the embedded Project or Publication
+    object_id = models.PositiveBigIntegerField()
+    # Encoder that produced the vector
+    model_name = models.CharField(max_length=200)
+    # SHA-1 of the cleaned text that was encoded; a changed hash means the vector is stale
+    content_hash = models.CharField(max_length=40)
+    # Number of float32 components in the vector
+    dim = models.PositiveIntegerField()
+    # Raw float32 bytes of the vector
+    vector = models.BinaryField()
+    # Timestamp of the last (re-)encode
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id', 'model_name']
+
+    # Returns a string describing the stored embedding
+    def __str__(self):
+        return f"Embedding({self.kind} {self.object_id}, {self.model_name})"
+
+# PublicationText model caches the body text extracted from an uploaded publication file.
+class PublicationText(models.Model):
+    # SHA-1 of the file contents the text was extracted from
+    content_hash = models.CharField(max_length=40, unique=True)
+    # First words of the body text (capped by AI_MATCHING_BODY_TOKENS)
+    text = models.TextField(blank=True)
+    # Number of pages read before the word cap was reached
+    pages = models.PositiveIntegerField(default=0)
+    # Number of words stored in text
+    token_count = models.PositiveIntegerField(default=0)
+    # Why extraction failed, if it did (e.g. the upload is not a valid PDF)
+    error = models.TextField(blank=True)
+    # Timestamp of the extraction
+    extracted_at = models.DateTimeField(auto_now_add=True)
+
+    # Returns a string describing the extracted text
+    def __str__(self):
+        return f"PublicationText({self.content_hash[:12]}, {self.token_count} words)"
+
+# StoredBlob model tracks one content-addressed upload and how many publication fields refer to it.
+class StoredBlob(models.Model):
+    # Path of the file relative to MEDIA_ROOT
+    path = models.CharField(max_length=255, unique=True)
+    # SHA-256 of the file contents
+    sha256 = models.CharField(max_length=64, db_index=True)
+    # File size in bytes
+    size = models.PositiveBigIntegerField(default=0)
+    # Number of Publication.file / Publication.image values pointing at this file
+    refcount = models.PositiveIntegerField(default=0)
+    # Timestamp of the first upload
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Returns a string describing the blob
+    def __str__(self):
+        return f"{self.path} ({self.refcount} refs)"
+
+# ProjectSearchEntry and PublicationSearchEntry map the full-text index tables of projects/search.py,
+# so search() can join them into a queryset. The tables are created by migration 0021, not by Django.
+class ProjectSearchEntry(models.Model):
+    # Indexed project; the index row is keyed by its id
+    project = models.OneToOneField(Project, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+                                   db_constraint=False, related_name='search_entry')
+
+    class Meta:
+        managed = False
+        db_table = 'project_search'
+
+class PublicationSearchEntry(models.Model):
+    # Indexed publication; the index row is keyed by its id
+    publication = models.OneToOneField(Publication, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+                                       db_constraint=False, related_name='search_entry')
+
+    class Meta:
+        managed = False
+        db_table = 'publication_search'
+
+# LinkCheck model caches the result of validating a publication download URL.
+class LinkCheck(models.Model):
+    # The URL that was checked
+    url = models.CharField(max_length=500, unique=True)
+    # Whether the URL answered 200 with a PDF / Word content type
+    is_valid = models.BooleanField(default=False)
+    # HTTP status of the final response (null if the request failed)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Content-Type header of the final response
+    content_type = models.CharField(max_length=200, blank=True)
+    # Connection / timeout error, if any
+    error = models.TextField(blank=True)
+    # When the URL was last probed
+    checked_at = models.DateTimeField()
+    # When the cached result must be re-checked (sooner for invalid links)
+    expires_at = models.DateTimeField(db_index=True)
+
+    # Returns a string describing the check
+    def __str__(self):
+        return f"{self.url} ({'valid' if self.is_valid else 'invalid'})"
+
+# MatchingJob model is a durable queue entry asking the matching worker to score one publication.
+class MatchingJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    # Publication to match against all projects
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE, related_name='matching_jobs')
+    # Current state of the job
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    # Number of times a worker has picked the job up
+    attempts = models.PositiveIntegerField(default=0)
+    # Last error message, if the job failed
+    error = models.TextField(blank=True)
+    # Timestamp for when the job was queued
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Timestamp for when a worker last claimed the job
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Random token of the worker's last claim: a worker reads back only the jobs its own claim stamped
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
+    # Timestamp for when the job finished (successfully or not)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    # Returns a string describing the job
+    def __str__(self):
+        return f"MatchingJob({self.publication_id}, {self.status})"
+
 # UploadToken model is used for secure upload actions, e.g., file uploads.
 class UploadToken(models.Model):
     # Unique token for upload, using UUID
@@ -299,9 +491,15 @@ class Message(models.Model):
     sent_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     request = models.ForeignKey(MessageRequest, on_delete=models.CASCADE, null=True, blank=True)
+    # When an unread-message reminder covered this message (at most once, see email.send_unread_message_reminders)
+    reminded_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['sent_at']
+        indexes = [
+            # Serves the reminder job's "unread, not yet reminded, older than X" range scan
+            models.Index(fields=['is_read', 'reminded_at', 'sent_at'], name='message_reminder_due_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.username} → {self.recipient.username}: {self.content[:50]}"
@@ -328,6 +526,10 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     is_email_sent = models.BooleanField(default=False)
+    # Digest email that included this notification (see digests.py); null until it is digested
+    digest = models.ForeignKey('OutboundEmail', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='digested_notifications')
+    digested_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     class Meta:
         ordering = ['-created_at']
@@ -369,7 +571,6 @@ class GroupMessage(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='group_messages_sent')
     content = models.TextField()
     sent_at = models.DateTimeField(auto_now_add=True)
-    is_read_by = models.ManyToManyField(User, related_name='read_group_messages', blank=True)
     
     class Meta:
         ordering = ['sent_at']
@@ -378,10 +579,30 @@ class GroupMessage(models.Model):
         return f"{self.sender.username} in {self.group.name}: {self.content[:50]}"
     
     def mark_as_read_by(self, user):
-        self.is_read_by.add(user)
+        # Reading a message means having read the group up to it (see GroupReadWatermark)
+        from .group_reads import mark_group_read
+        mark_group_read(self.group_id, user, self.id)
     
     def get_read_count(self):
-        return self.is_read_by.count()
+        # Current members other than the sender whose watermark has reached this message
+        return (GroupReadWatermark.objects.filter(group_id=self.group_id, last_read_message_id__gte=self.id,
+                                                  user__group_memberships=self.group_id)
+                .exclude(user_id=self.sender_id).count())
+
+# GroupReadWatermark model is how far one member has read a group chat: every message with
+# an id up to last_read_message_id counts as read by them (see group_reads.py).
+class GroupReadWatermark(models.Model):
+    group = models.ForeignKey(GroupChat, on_delete=models.CASCADE, related_name='read_watermarks')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='group_read_watermarks')
+    # Id of the newest GroupMessage the member has seen; ids only grow, so this never moves back
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['group', 'user']
+    
+    def __str__(self):
+        return f"{self.user.username} read {self.group.name} up to #{self.last_read_message_id}"
 
 class GroupInvitation(models.Model):
     group = models.ForeignKey(GroupChat, on_delete=models.CASCADE, related_name='invitations')
@@ -400,4 +621,47 @@ class GroupInvitation(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Invitation to {self.invitee.username} for {self.group.name}"
\ No newline at end of file
+        return f"Invitation to {self.invitee.username} for {self.group.name}"
+
+# OutboundEmail model is one queued email, delivered by the mail worker (see mail_queue.py).
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    # Address the email goes to
+    recipient = models.EmailField()
+    # Subject line
+    subject = models.CharField(max_length=255)
+    # HTML body (optional if text_body is set)
+    html_body = models.TextField(blank=True)
+    # Plain-text body (optional if html_body is set)
+    text_body = models.TextField(blank=True)
+    # In-app notification whose is_email_sent flag is set once this email is delivered
+    notification = models.ForeignKey(Notification, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='outbound_emails')
+    # Delivery state
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    # Delivery attempts so far
+    attempts = models.PositiveIntegerField(default=0)
+    # Error from the last failed attempt
+    last_error = models.TextField(blank=True)
+    # Earliest time the worker may (re)try this email (pushed back by retries and rate limits)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # When a worker last claimed the email
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Random token of the worker's last claim: a worker reads back only the emails its own claim stamped
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
+    # Timestamp of successful delivery
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Timestamp of queueing
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    # Returns a string describing the queued email
+    def __str__(self):
+        return f"Email to {self.recipient}: {self.subject} ({self.status})"
@@ -0,0 +1,135 @@
+# pagination.py
+#
+# Keyset (seek) pagination for the publication and project listings.
+# Instead of OFFSET, each page starts right after the sort key of the last row
+# shown, so fetching page 1000 costs the same as page 1 and no page count is
+# ever computed. Cursors are opaque query-string tokens holding that sort key
+# and a direction, which makes them stable while rows are added or removed.
+# The ordering must end with a unique field (usually 'id') to be a total order.
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Rows per page when LIST_PAGE_SIZE is not set
+DEFAULT_PAGE_SIZE = 50
+# Largest page a client may ask for with ?page_size= when LIST_MAX_PAGE_SIZE is not set
+DEFAULT_MAX_PAGE_SIZE = 200
+
+
+def page_size_from(request):
+    """Page size from ?page_size=, clamped to [1, LIST_MAX_PAGE_SIZE]."""
+    default = getattr(settings, 'LIST_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, getattr(settings, 'LIST_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)))
+
+
+def encode_cursor(values, direction):
+    """Opaque token for a sort key; direction is 'n' (rows after it) or 'p' (rows before it)."""
+    values = [value if isinstance(value, (int, float)) else str(value) for value in values]
+    payload = json.dumps([direction] + values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    """(direction, values) from a cursor token; raises ValueError if it does not fit the ordering."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+    if not isinstance(payload, list) or len(payload) != len(ordering) + 1 or payload[0] not in ('n', 'p'):
+        raise ValueError("Cursor does not match the ordering")
+
+    values = []
+    for name, value in zip(_field_names(ordering), payload[1:]):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            values.append(value)  # Annotation such as search_rank: stored as-is
+            continue
+        try:
+            values.append(field.to_python(value))
+        except ValidationError as e:
+            raise ValueError(f"Bad cursor value for {name}: {e}")
+    return payload[0], values
+
+
+def _field_names(ordering):
+    return [name.lstrip('-') for name in ordering]
+
+
+def _reverse(ordering):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+
+def seek_filter(ordering, values):
+    """
+    Q selecting the rows that come after `values` in `ordering`.
+    Written as f1 <= v1 AND (f1 < v1 OR ...) rather than a plain OR chain so the
+    leading column stays usable as an index range.
+    """
+    name, value = ordering[0].lstrip('-'), values[0]
+    before, strict = ('lte', 'lt') if ordering[0].startswith('-') else ('gte', 'gt')
+    if len(ordering) == 1:
+        return Q(**{f'{name}__{strict}': value})
+    return Q(**{f'{name}__{before}': value}) & (Q(**{f'{name}__{strict}': value}) | seek_filter(ordering[1:], values[1:]))
+
+
+class KeysetPage:
+    """One page of rows plus the cursors of its neighbours (None when there is no such page)."""
+
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.next_cursor = self._cursor(object_list[-1], 'n') if has_next and object_list else None
+        self.previous_cursor = self._cursor(object_list[0], 'p') if has_previous and object_list else None
+
+    def _cursor(self, obj, direction):
+        return encode_cursor([getattr(obj, name) for name in _field_names(self.ordering)], direction)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(queryset, ordering, cursor=None, page_size=None):
+    """
+    Fetch the page of queryset (ordered by `ordering`) that `cursor` points at;
+    the first page when cursor is empty or invalid. Only page_size + 1 rows are read.
+    """
+    page_size = page_size or getattr(settings, 'LIST_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    ordering = list(ordering)
+    direction, values = 'n', None
+    if cursor:
+        try:
+            direction, values = decode_cursor(cursor, queryset.model, ordering)
+        except ValueError:
+            direction, values = 'n', None
+
+    if direction == 'p':
+        # Walk backwards from the cursor, then restore the display order
+        rows = list(queryset.filter(seek_filter(_reverse(ordering), values)).order_by(*_reverse(ordering))[:page_size + 1])
+        has_previous = len(rows) > page_size
+        return KeysetPage(rows[:page_size][::-1], ordering, has_next=True, has_previous=has_previous)
+
+    if values is not None:
+        queryset = queryset.filter(seek_filter(ordering, values))
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    return KeysetPage(rows[:page_size], ordering, has_next=len(rows) > page_size, has_previous=values is not None)
@@ -0,0 +1,202 @@
+# search.py
+#
+# Full-text search for projects and publications.
+# - SQLite: one FTS5 virtual table per kind (project_search, publication_search)
+#   whose rowid is the object's id, ranked with FTS5's built-in BM25.
+# - PostgreSQL: one table per kind, keyed by rowid as well, holding a weighted
+#   tsvector with a GIN index, ranked with ts_rank_cd.
+# - Other databases fall back to unranked icontains filters over the same fields.
+# On SQLite and PostgreSQL the tables are required: migration 0021 creates them,
+# and ProjectSearchEntry / PublicationSearchEntry map them for the ORM join.
+# Documents cover title, abstract, keywords, scientific case and author names;
+# signals.py keeps them in sync and `manage.py rebuild_search_index` rebuilds them.
+# search() is the one entry point the list views use; it keeps every match and
+# annotates the rank, so filters and pagination apply to the full result set.
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Index table per kind
+TABLES = {"project": "project_search", "publication": "publication_search"}
+# Column weights (title, body, authors); BM25 on SQLite, tsvector weight classes on PostgreSQL
+WEIGHTS = (10.0, 1.0, 5.0)
+PG_WEIGHTS = ("A", "C", "B")
+# Default abstract of Project and Publication; left out of the index
+PLACEHOLDER_ABSTRACT = "No abstract yet"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def backend(using=None):
+    """'fts5', 'postgres' or None (no index: icontains fallback)."""
+    vendor = (using or connection).vendor
+    if vendor == "sqlite":
+        return "fts5"
+    if vendor == "postgresql":
+        return "postgres"
+    return None
+
+
+def _model_kind(model):
+    return model._meta.model_name
+
+
+# ========================
+# Documents
+# ========================
+
+def _abstract(value):
+    # The model default is a placeholder, not content worth matching
+    return "" if not value or value == PLACEHOLDER_ABSTRACT else value
+
+
+def project_document(project):
+    """(title, body, authors) indexed for a project."""
+    body = " ".join(filter(None, [_abstract(project.abstract), project.keywords, project.scientific_case, project.domain]))
+    authors = " ".join(filter(None, [project.team, project.principal_investigator]))
+    return project.title, body, authors
+
+
+def publication_document(publication, author_names=()):
+    """(title, body, authors) indexed for a publication."""
+    return publication.title, _abstract(publication.abstract), " ".join(name for name in author_names if name)
+
+
+def _publication_rows(publications):
+    """(id, title, body, authors) for publications, with author names fetched in two queries."""
+    from projects.models import Publication
+
+    publications = list(publications)
+    ids = [publication.id for publication in publications]
+    names = {}
+    primary = dict(Publication.objects.filter(id__in=ids, primary_author__isnull=False)
+                   .values_list("id", "primary_author__name"))
+    for publication_id, name in primary.items():
+        names.setdefault(publication_id, []).append(name)
+    through = Publication.collaborators.through
+    for publication_id, name in (through.objects.filter(publication_id__in=ids)
+                                 .values_list("publication_id", "author__name")):
+        names.setdefault(publication_id, []).append(name)
+    return [(publication.id,) + publication_document(publication, names.get(publication.id, ()))
+            for publication in publications]
+
+
+def _project_rows(projects):
+    return [(project.id,) + project_document(project) for project in projects]
+
+
+# ========================
+# Index maintenance
+# ========================
+
+def write_rows(kind, rows, replace=True):
+    """Insert (or, with replace, insert or replace) index rows (id, title, body, authors)."""
+    kind_backend = backend()
+    if not rows or kind_backend is None:
+        return
+    table = TABLES[kind]
+    # One transaction per batch: in autocommit mode every row would be committed on its own
+    with transaction.atomic(), connection.cursor() as cursor:
+        if kind_backend == "fts5":
+            if replace:
+                cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(f"INSERT INTO {table} (rowid, title, body, authors) VALUES (%s, %s, %s, %s)", rows)
+        else:
+            a, b, c = PG_WEIGHTS
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, document) VALUES (%s, "
+                f"setweight(to_tsvector('english', %s), '{a}') || setweight(to_tsvector('english', %s), '{b}') || "
+                f"setweight(to_tsvector('english', %s), '{c}')) "
+                f"ON CONFLICT (rowid) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def index_projects(projects, replace=True):
+    write_rows("project", _project_rows(projects), replace)
+
+
+def index_publications(publications, replace=True):
+    write_rows("publication", _publication_rows(publications), replace)
+
+
+def remove(kind, object_id):
+    if backend() is None:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLES[kind]} WHERE rowid = %s", [object_id])
+
+
+def rebuild(batch_size=1000):
+    """Re-index every project and publication. Returns (projects, publications) indexed."""
+    from projects.models import Project, Publication
+
+    counts = []
+    for kind, model, index in (("project", Project, index_projects), ("publication", Publication, index_publications)):
+        if backend() is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {TABLES[kind]}")
+        total = 0
+        batch = []
+        for obj in model.objects.order_by("id").iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                index(batch, replace=False)  # The table was just emptied
+                total += len(batch)
+                batch = []
+        index(batch, replace=False)
+        counts.append(total + len(batch))
+    return tuple(counts)
+
+
+# ========================
+# Queries
+# ========================
+
+def fts5_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    return " ".join(f'"{token}"*' for token in _TOKEN.findall(text))
+
+
+def _fallback(queryset, text):
+    """Unranked icontains match on the indexed fields, for databases without an index."""
+    condition = Q()
+    for token in _TOKEN.findall(text):
+        if queryset.model._meta.model_name == "project":
+            condition &= (Q(title__icontains=token) | Q(abstract__icontains=token) | Q(keywords__icontains=token)
+                          | Q(scientific_case__icontains=token) | Q(team__icontains=token))
+        else:
+            condition &= (Q(title__icontains=token) | Q(abstract__icontains=token)
+                          | Q(primary_author__name__icontains=token) | Q(collaborators__name__icontains=token))
+    return queryset.filter(condition).distinct().annotate(search_rank=Value(0, output_field=IntegerField()))
+
+
+def search(queryset, text):
+    """
+    Restrict a Project or Publication queryset to full-text matches of text.
+    The index table is joined into the query (through the search_entry relation)
+    and the result is annotated with search_rank (lower is better) and ordered by
+    it; callers may filter and re-order it (e.g. by date). Every match is kept, so
+    later filters, facet counts and pagination see the whole result set.
+    """
+    kind_backend = backend()
+    if kind_backend is None:
+        return _fallback(queryset, text).order_by("search_rank", "-pk")
+    # The join keeps the table's own name as its alias, which the match and rank SQL refer to
+    table = TABLES[_model_kind(queryset.model)]
+    if kind_backend == "fts5":
+        query = fts5_query(text)
+        match = RawSQL(f"{table} MATCH %s", [query], output_field=BooleanField())
+        rank = RawSQL(f"bm25({table}, {', '.join(map(str, WEIGHTS))})", [], output_field=FloatField())
+    else:
+        query = " & ".join(f"{token}:*" for token in _TOKEN.findall(text))
+        match = RawSQL(f"{table}.document @@ to_tsquery('english', %s)", [query], output_field=BooleanField())
+        # Negated so that, as with bm25, ascending order puts the best match first
+        rank = RawSQL(f"-ts_rank_cd({table}.document, to_tsquery('english', %s))", [query], output_field=FloatField())
+    if not query:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return (queryset.filter(search_entry__isnull=False).filter(match)
+            .annotate(search_rank=rank).order_by("search_rank", "-pk"))
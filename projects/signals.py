@@ -1,13 +1,17 @@
 # signals.py
 import os
+from functools import partial
 
-from django.core.mail import send_mail
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import Publication
+from .models import Author, Project, Publication
 from .models import Message, Notification
-from projects.AI.nlp_ba_model_1_with_adminreq_ import match_projects_and_papers
+from .matching_jobs import enqueue_publication
+from projects.AI import delete_embeddings
+from projects.AI.author_index import refresh_projects_for_author, refresh_team_authors
+from . import facets, search
 
 @receiver(post_save, sender=Publication)
 def run_ai_matching(sender, instance, created, **kwargs):
@@ -20,18 +24,116 @@ def run_ai_matching(sender, instance, created, **kwargs):
     if getattr(settings, 'SIGNALS_ENABLED', True) is False:
         return
     
-    match_projects_and_papers(publication=instance)
+    # Only queue the work; run_matching_worker does the NLP outside the request
+    publication_id = instance.pk
+    transaction.on_commit(lambda: enqueue_publication(publication_id))
+
+@receiver(post_save, sender=Project)
+def resolve_project_team(sender, instance, **kwargs):
+    # Parse the free-text team into Author ids once per save instead of on every matching run
+    refresh_team_authors(instance)
+
+@receiver(post_save, sender=Author)
+def resolve_teams_mentioning_author(sender, instance, **kwargs):
+    # A new or renamed author may now match names already written in project teams
+    refresh_projects_for_author(instance)
+
+@receiver(post_delete, sender=Publication)
+def release_publication_files(sender, instance, **kwargs):
+    # Drop this publication's references to its content-addressed file and image,
+    # once the delete has committed (a rolled-back delete keeps its files)
+    for field_file in (instance.file, instance.image):
+        if field_file:
+            transaction.on_commit(partial(field_file.storage.delete, field_file.name))
+
+@receiver(pre_save, sender=Publication)
+def count_publication_file_references(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Keep StoredBlob refcounts in step with the names this save writes:
+    # - a field set to an already stored name (new or existing row) adds a reference;
+    #   uploads, and names FieldFile.save() just wrote, were counted by the storage itself
+    # - a replaced or cleared name gives up its reference, but only once the save has committed
+    if raw:
+        return
+    fields = [name for name in ('file', 'image') if update_fields is None or name in update_fields]
+    if not fields:
+        return
+    old = None
+    if instance.pk is not None:
+        old = Publication.objects.filter(pk=instance.pk).values(*fields).first()
+    old = old or dict.fromkeys(fields, '')
+    for name in fields:
+        field_file = getattr(instance, name)
+        if field_file._committed and field_file.name == old[name]:
+            if field_file.name and field_file.storage.claim_written(field_file.name):
+                # The same content was written again: the row still holds just one reference
+                field_file.storage.delete(field_file.name)
+            continue
+        if field_file._committed and field_file.name and not field_file.storage.claim_written(field_file.name):
+            field_file.storage.reference(field_file.name)
+        if old[name]:
+            transaction.on_commit(partial(field_file.storage.delete, old[name]))
+
+@receiver(post_save, sender=Publication)
+def settle_written_publication_files(sender, instance, raw=False, **kwargs):
+    # Uploads are written during the save, after pre_save: their reference is counted, so forget the write
+    if raw:
+        return
+    for field_file in (instance.file, instance.image):
+        if field_file:
+            field_file.storage.claim_written(field_file.name)
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Publication)
+def drop_stored_embeddings(sender, instance, **kwargs):
+    # Stored vectors are keyed by plain id, so clean them up with the object
+    kind = 'project' if sender is Project else 'publication'
+    delete_embeddings(kind, instance.pk)
 
 @receiver(post_save, sender=Message)
 def notify_unread_message(sender, instance, created, **kwargs):
     if created:
         # Create in-app notification
-        Notification.objects.create(user=instance.recipient, message=instance)
-        # Send email notification
-        send_mail(
-            'New Message Received',
-            f'You have received a new message from {instance.sender.username}: "{instance.content[:100]}"',
-            'noreply@yourdomain.com',
-            [instance.recipient.email],
-            fail_silently=True,
-        )
+        # No email here: unread notifications are summarized in the recipient's next digest (digests.py)
+        Notification.objects.create(user=instance.recipient, message=instance, notification_type='message_received')
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, **kwargs):
+    # Keep the full-text search index in step with the project
+    search.index_projects([instance])
+
+@receiver(post_save, sender=Publication)
+def index_publication(sender, instance, **kwargs):
+    search.index_publications([instance])
+
+@receiver(m2m_changed, sender=Publication.collaborators.through)
+def index_publication_collaborators(sender, instance, action, **kwargs):
+    # Collaborator names are part of the indexed document
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if isinstance(instance, Publication):
+            search.index_publications([instance])
+        else:
+            search.index_publications(Publication.objects.filter(collaborators=instance))
+
+@receiver(post_save, sender=Author)
+def index_author_publications(sender, instance, created, **kwargs):
+    # A renamed author changes the documents of their publications
+    if not created:
+        search.index_publications(Publication.objects.filter(
+            models.Q(primary_author=instance) | models.Q(collaborators=instance)
+        ).distinct())
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Publication)
+def unindex_deleted(sender, instance, **kwargs):
+    search.remove('project' if sender is Project else 'publication', instance.pk)
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Publication)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Publication)
+@receiver(m2m_changed, sender=Publication.collaborators.through)
+@receiver(post_save, sender=Author)
+def invalidate_facets(sender, **kwargs):
+    # Any of these can move the listing facet counts (author names through search matches).
+    # Wait for the commit so a concurrent request can't cache the pre-commit counts again.
+    transaction.on_commit(facets.invalidate)
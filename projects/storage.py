@@ -0,0 +1,127 @@
+# storage.py
+#
+# Content-addressed storage for publication uploads. Each upload is hashed
+# (SHA-256) while it is streamed to disk and stored once under
+#     <upload_to>/<first two hex digits>/<sha256><extension>
+# so re-uploading or re-seeding the same PDF or image adds a reference instead
+# of another copy. References are counted in StoredBlob; the file is removed
+# when the last reference is deleted or replaced (see signals.py).
+
+import hashlib
+import os
+import posixpath
+import tempfile
+import threading
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# Directory (inside MEDIA_ROOT) that holds uploads while they are being hashed
+INCOMING_DIR = ".incoming"
+
+# Names _save() wrote (and retained) on this thread that no model save has accounted for yet
+_written = threading.local()
+
+
+def blob_name(name, digest):
+    """Content-addressed name for an upload called `name` whose SHA-256 is `digest`."""
+    directory, basename = posixpath.split(name.replace("\\", "/"))
+    extension = os.path.splitext(basename)[1].lower()
+    return posixpath.join(directory, digest[:2], digest + extension)
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest and size of a file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct upload once and reference-counts it."""
+
+    def _save(self, name, content):
+        incoming = os.path.join(self.location, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    handle.write(chunk)
+                    size += len(chunk)
+
+            name = blob_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(temp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.retain(name, digest.hexdigest(), size)
+        _written.__dict__.setdefault("names", set()).add(name)
+        return name
+
+    def claim_written(self, name):
+        """
+        True if _save() just wrote name on this thread (its reference is already counted).
+        Each write is claimed once, so a later assignment of the same name counts again.
+        """
+        names = _written.__dict__.get("names", set())
+        if name in names:
+            names.discard(name)
+            return True
+        return False
+
+    def retain(self, name, digest, size):
+        """Add one reference to the blob stored under name."""
+        from projects.models import StoredBlob
+
+        blob, _ = StoredBlob.objects.get_or_create(path=name, defaults={"sha256": digest, "size": size})
+        StoredBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+
+    def reference(self, name):
+        """Add one reference to a blob that is already stored (a field set to its name)."""
+        from projects.models import StoredBlob
+
+        StoredBlob.objects.filter(path=name).update(refcount=F("refcount") + 1)
+
+    def delete(self, name):
+        """
+        Drop one reference to name and remove the file once nothing refers to it.
+        Files this storage did not write (no StoredBlob row) are left alone.
+        """
+        from projects.models import StoredBlob
+
+        if not name:
+            return
+        if StoredBlob.objects.filter(path=name, refcount__gt=1).update(refcount=F("refcount") - 1):
+            return
+        if StoredBlob.objects.filter(path=name).delete()[0]:
+            super().delete(name)
+
+
+publication_storage = ContentAddressedStorage()
+
+
+def get_publication_storage():
+    """Storage used for Publication.file and Publication.image."""
+    return publication_storage
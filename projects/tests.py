@@ -8,8 +8,10 @@ from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
 from datetime import date
+import importlib.util
 import tempfile
 import os
+import unittest
 
 from .models import Project, Publication, Author, UserProfile, MessageRequest, Message, Notification
 
@@ -739,6 +741,1761 @@ class PerformanceTests(PublicationLogTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertGreater(len(response.context['publications']), 0)
 
+# ---------------------------
+# AI Matching Tests
+# ---------------------------
+
+class FakeEncoder:
+    """Deterministic stand-in for a SentenceTransformer that records what it encodes"""
+    
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.encoded = []
+    
+    def encode(self, texts, **kwargs):
+        import numpy as np
+        
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row, sum(map(ord, word)) % self.dim] += 1.0
+        return vectors
+
+class ModelRegistryTests(TestCase):
+    """Test the process-wide encoder cache used by the AI matcher"""
+    
+    def setUp(self):
+        from .AI import model_registry
+        self.registry = model_registry
+        self.registry.clear()
+        self.addCleanup(self.registry.clear)
+    
+    def test_model_loaded_once_per_name_and_device(self):
+        """Test that repeated lookups reuse the loaded encoder"""
+        from unittest import mock
+        
+        with mock.patch.object(self.registry, 'SentenceTransformer') as loader:
+            first = self.registry.get_model("test-model", "cpu")
+            second = self.registry.get_model("test-model", "cpu")
+        
+        self.assertIs(first, second)
+        loader.assert_called_once_with("test-model", device="cpu")
+        stats = self.registry.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertIn(("test-model", "cpu"), stats['load_seconds'])
+    
+    @override_settings(AI_MATCHING_MODEL="settings-model", AI_MATCHING_DEVICE="cpu")
+    def test_model_name_from_settings(self):
+        """Test that the default model name and device come from settings"""
+        from unittest import mock
+        
+        with mock.patch.object(self.registry, 'SentenceTransformer') as loader:
+            self.registry.warm_up()
+        
+        loader.assert_called_once_with("settings-model", device="cpu")
+
+    @override_settings(AI_MATCHING_MODEL="settings-model", AI_MATCHING_BACKEND="onnx",
+                       AI_MATCHING_MODEL_PATH="/models/minilm-onnx", AI_MATCHING_ONNX_FILE="onnx/model_qint8.onnx")
+    def test_onnx_backend_loads_local_copy(self):
+        """Test that the ONNX backend loads the local export under its own model name"""
+        from unittest import mock
+
+        self.assertEqual(self.registry.get_model_name(), "settings-model:onnx")
+        self.assertEqual(self.registry.get_model_name(backend="torch"), "settings-model")
+        with mock.patch.object(self.registry, 'SentenceTransformer') as loader:
+            first = self.registry.get_model()
+            second = self.registry.get_model("settings-model:onnx")
+
+        self.assertIs(first, second)
+        loader.assert_called_once_with("/models/minilm-onnx", device="cpu", backend="onnx",
+                                       model_kwargs={"file_name": "onnx/model_qint8.onnx"})
+
+    @override_settings(AI_MATCHING_BACKEND="tensorrt")
+    def test_unknown_backend_rejected(self):
+        """Test that a misspelled backend fails loudly"""
+        from django.core.exceptions import ImproperlyConfigured
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.registry.get_model_name()
+
+class EncoderParityTests(TestCase):
+    """Test the top-k agreement check between encoder backends"""
+
+    def test_compare_encoders(self):
+        """Test that identical encoders agree fully and a different one does not"""
+        import numpy as np
+        from .AI.parity import compare_encoders
+
+        projects = ["graph neural networks", "quantum computing", "protein folding", "climate models"]
+        papers = ["graph networks for molecules", "quantum error correction"]
+
+        same = compare_encoders(FakeEncoder(), FakeEncoder(), projects, papers, k=2)
+        self.assertEqual(same["overlap"], 1.0)
+        self.assertAlmostEqual(same["min_cosine"], 1.0, places=5)
+
+        class RotatedEncoder(FakeEncoder):
+            def encode(self, texts, **kwargs):
+                return np.roll(super().encode(texts, **kwargs), 1, axis=1)
+
+        # Rotating every vector keeps the rankings but moves each vector away from the original
+        rotated = compare_encoders(FakeEncoder(), RotatedEncoder(), projects, papers, k=2)
+        self.assertEqual(rotated["overlap"], 1.0)
+        self.assertLess(rotated["min_cosine"], 1.0)
+
+        class BlindEncoder(FakeEncoder):
+            def encode(self, texts, **kwargs):
+                return np.ones((len(texts), self.dim), dtype=np.float32) + np.arange(len(texts))[:, None] % 2
+
+        blind = compare_encoders(FakeEncoder(), BlindEncoder(), projects, papers, k=1)
+        self.assertLess(blind["overlap"], 1.0)
+
+    def test_command_compares_the_texts_the_matcher_encodes(self):
+        """Test that check_encoder_parity leaves out the placeholder abstract and includes body text"""
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+        from .AI.nlp_ba_model_1_with_adminreq_ import load_papers
+        from .models import PublicationText
+
+        project = create_test_project(title="Graph Neural Networks")
+        Publication.objects.create(project=project, title="Placeholder Abstract", year=2024, type="Journal")
+        Publication.objects.create(project=project, title="Real Abstract", abstract="Message passing.", year=2024,
+                                   type="Journal", body_text=PublicationText.objects.create(
+                                       content_hash="abc", text="Molecules and graphs"))
+        result = {"overlap": 1.0, "min_cosine": 1.0, "mean_cosine": 1.0, "speedup": 1.0,
+                  "reference_seconds": 0.0, "candidate_seconds": 0.0}
+
+        with mock.patch("projects.management.commands.check_encoder_parity.get_model", return_value=FakeEncoder()), \
+                mock.patch("projects.management.commands.check_encoder_parity.compare_encoders",
+                           return_value=result) as compare:
+            call_command("check_encoder_parity", "--backend", "onnx", stdout=StringIO())
+
+        project_texts, paper_texts = compare.call_args.args[2:4]
+        papers_df, _ = load_papers(FakeEncoder())
+        self.assertEqual(project_texts, ["graph neural networks"])
+        self.assertEqual(paper_texts, list(papers_df.sort_values("id")["combined_text"]))
+        self.assertEqual(paper_texts, ["placeholder abstract", "real abstract. message passing. molecules and graphs"])
+
+class EncodingServiceTests(TestCase):
+    """Test the batched, length-sorted encoding service"""
+
+    def test_encode_texts_sorted_truncated_and_in_input_order(self):
+        """Test that texts are truncated, encoded longest-first and returned in input order"""
+        from unittest import mock
+        from .AI import encoding
+
+        encoder = FakeEncoder()
+        encoder.max_seq_length = 4
+        texts = ["short title", "a much longer title plus an abstract that goes on", "three word text"]
+
+        with mock.patch.object(encoder, "encode", wraps=encoder.encode) as encode:
+            vectors = encoding.encode_texts(texts, model=encoder, batch_size=2)
+
+        self.assertEqual(encode.call_args.kwargs["batch_size"], 2)
+        self.assertEqual(encoder.encoded, ["a much longer title", "three word text", "short title"])
+        expected = FakeEncoder().encode(["short title", "a much longer title", "three word text"])
+        self.assertTrue((vectors == expected).all())
+        self.assertGreater(encoding.get_stats()["texts"], 0)
+
+    def test_thread_cap_applied_once(self):
+        """Test that the torch thread cap comes from settings and is only set once"""
+        from unittest import mock
+        from .AI import encoding
+
+        with mock.patch.object(encoding, "_threads_configured", False), \
+                mock.patch("torch.set_num_threads") as set_threads, \
+                self.settings(AI_MATCHING_THREADS=2):
+            encoding.configure_threads()
+            encoding.configure_threads()
+        set_threads.assert_called_once_with(2)
+
+class EmbeddingStoreTests(TestCase):
+    """Test incremental persistence of matcher embeddings"""
+    
+    def test_only_changed_texts_are_reencoded(self):
+        """Test that unchanged rows are served from the store"""
+        from .AI.embedding_store import sync_embeddings
+        from .models import StoredEmbedding
+        
+        encoder = FakeEncoder()
+        first = sync_embeddings('publication', {1: 'deep learning', 2: 'quantum computing'},
+                                model=encoder, model_name='fake')
+        self.assertEqual(first.shape, (2, encoder.dim))
+        self.assertEqual(len(encoder.encoded), 2)
+        
+        encoder.encoded.clear()
+        second = sync_embeddings('publication', {1: 'deep learning', 2: 'quantum networks'},
+                                 model=encoder, model_name='fake')
+        self.assertEqual(encoder.encoded, ['quantum networks'])
+        self.assertTrue((second[0] == first[0]).all())
+        self.assertEqual(StoredEmbedding.objects.filter(kind='publication', model_name='fake').count(), 2)
+
+class IncrementalMatchingTests(TestCase):
+    """Test that single-publication matching only touches that publication"""
+    
+    def setUp(self):
+        from .AI import model_registry, vector_index
+        self.encoder = FakeEncoder()
+        model_registry.clear()
+        vector_index.clear()
+        model_registry.register_model(self.encoder)
+        self.addCleanup(model_registry.clear)
+        self.addCleanup(vector_index.clear)
+    
+    @override_settings(SIGNALS_ENABLED=False)
+    def test_match_publication_encodes_only_that_publication(self):
+        """Test that other publications are neither loaded nor encoded"""
+        from .AI.nlp_ba_model_1_with_adminreq_ import match_publication
+        
+        project = create_test_project(title="Graph Neural Networks")
+        others = [
+            Publication.objects.create(project=project, title=f"Other Paper {i}", year=2024,
+                                       type="Journal", url="https://example.com/p.pdf")
+            for i in range(3)
+        ]
+        target = Publication.objects.create(project=project, title="Target Paper", year=2024,
+                                            type="Journal", url="https://example.com/t.pdf")
+        
+        match_publication(target)
+        
+        self.assertIn("graph neural networks", self.encoder.encoded)
+        self.assertTrue(any(text.startswith("target paper") for text in self.encoder.encoded))
+        self.assertEqual(len(others), 3)
+        self.assertFalse(any(text.startswith("other paper") for text in self.encoder.encoded))
+
+class MatchingJobQueueTests(TestCase):
+    """Test that publication saves queue matching work instead of running it inline"""
+    
+    def setUp(self):
+        from .AI import model_registry, vector_index
+        self.encoder = FakeEncoder()
+        model_registry.clear()
+        vector_index.clear()
+        model_registry.register_model(self.encoder)
+        self.addCleanup(model_registry.clear)
+        self.addCleanup(vector_index.clear)
+        self.project = create_test_project()
+    
+    def create_publication(self, title="Queued Paper"):
+        return Publication.objects.create(project=self.project, title=title, year=2024,
+                                          type="Journal", url="https://example.com/q.pdf")
+    
+    def test_save_enqueues_job_on_commit(self):
+        """Test that saving a publication queues exactly one pending job and encodes nothing"""
+        from .models import MatchingJob
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            publication = self.create_publication()
+            publication.save()
+        
+        self.assertEqual(MatchingJob.objects.filter(publication=publication, status='pending').count(), 1)
+        self.assertEqual(self.encoder.encoded, [])
+    
+    def test_worker_processes_batch(self):
+        """Test that the worker marks jobs done and records AI progress on the publication"""
+        from .matching_jobs import enqueue_publication, run_pending_jobs
+        from .models import MatchingJob
+        
+        with override_settings(SIGNALS_ENABLED=False):
+            publications = [self.create_publication(f"Queued Paper {i}") for i in range(2)]
+        for publication in publications:
+            enqueue_publication(publication.pk)
+        
+        processed, _ = run_pending_jobs(batch_size=10)
+        
+        self.assertEqual(processed, 2)
+        self.assertFalse(MatchingJob.objects.exclude(status='done').exists())
+        for publication in publications:
+            publication.refresh_from_db()
+            self.assertTrue(publication.ai_processed)
+            self.assertIsNotNone(publication.ai_confidence)
+    
+    def test_racing_claims_run_each_job_once(self):
+        """Test that a worker whose claim lost the race gets no jobs instead of the same ones"""
+        from unittest import mock
+        from django.db.models.query import QuerySet
+        from .matching_jobs import claim_jobs, enqueue_publication
+        
+        with override_settings(SIGNALS_ENABLED=False):
+            for i in range(2):
+                enqueue_publication(self.create_publication(f"Queued Paper {i}").pk)
+        other = []
+        original_update = QuerySet.update
+        
+        def racing_update(queryset, **kwargs):
+            if not other:
+                # Another worker claims the same jobs between this worker's read and its update
+                other.append(None)
+                other[0] = claim_jobs()
+            return original_update(queryset, **kwargs)
+        
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=racing_update):
+            mine = claim_jobs()
+        
+        self.assertEqual(len(other[0]), 2)
+        self.assertEqual(mine, [])
+    
+    def test_uploads_are_matched_without_pdf_support(self):
+        """Test that a missing pypdf skips body-text extraction instead of failing the batch"""
+        from unittest import mock
+        from .matching_jobs import enqueue_publication, run_pending_jobs
+        from .models import MatchingJob
+        
+        with override_settings(SIGNALS_ENABLED=False):
+            publication = self.create_publication()
+        Publication.objects.filter(pk=publication.pk).update(file="publications/files/uploaded.pdf")
+        enqueue_publication(publication.pk)
+        
+        with mock.patch("projects.AI.text_extraction.pdf_support", return_value=False), \
+                self.assertLogs("projects.AI.text_extraction", "WARNING"):
+            self.assertEqual(run_pending_jobs(batch_size=10)[0], 1)
+        
+        self.assertEqual(MatchingJob.objects.get(publication=publication).status, "done")
+        publication.refresh_from_db()
+        self.assertTrue(publication.ai_processed)
+        self.assertIsNone(publication.body_text)
+
+class VectorIndexTests(TestCase):
+    """Test the exact and approximate top-k similarity backends"""
+    
+    def setUp(self):
+        from .AI import vector_index
+        self.vector_index = vector_index
+        vector_index.clear()
+        self.addCleanup(vector_index.clear)
+    
+    def test_exact_index_returns_best_matches_first(self):
+        """Test exact top-k search, updates and removals"""
+        import numpy as np
+        
+        index = self.vector_index.ExactIndex(2)
+        index.upsert([10, 20, 30], np.array([[1, 0], [0, 1], [1, 1]], dtype=np.float32))
+        ids, scores = index.search(np.array([[1, 0.1]], dtype=np.float32), 2)
+        self.assertEqual(list(ids[0]), [10, 30])
+        self.assertGreater(scores[0][0], scores[0][1])
+        
+        index.remove([10])
+        index.upsert([20], np.array([[1, 0]], dtype=np.float32))
+        ids, _ = index.search(np.array([[1, 0]], dtype=np.float32), 1)
+        self.assertEqual(list(ids[0]), [20])
+        self.assertEqual(len(index), 2)
+    
+    def test_hnsw_index_agrees_with_exact(self):
+        """Test that the HNSW backend finds the same neighbours on a small corpus"""
+        import numpy as np
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            self.skipTest("hnswlib is not installed")
+        
+        vectors = np.random.default_rng(0).normal(size=(200, 16)).astype(np.float32)
+        exact = self.vector_index.ExactIndex(16)
+        approx = self.vector_index.HNSWIndex(16, initial_capacity=50)
+        for index in (exact, approx):
+            index.upsert(range(200), vectors)
+        
+        exact_ids, _ = exact.search(vectors[:20], 5)
+        approx_ids, _ = approx.search(vectors[:20], 5)
+        self.assertGreaterEqual((exact_ids == approx_ids).mean(), 0.9)
+    
+    def test_index_built_from_store_and_updated_incrementally(self):
+        """Test that newly stored embeddings show up in an already-built index"""
+        from .AI.embedding_store import sync_embeddings
+        
+        encoder = FakeEncoder()
+        sync_embeddings('project', {1: 'deep learning'}, model=encoder, model_name='fake')
+        index = self.vector_index.get_index('project', 'exact', model_name='fake')
+        self.assertEqual(len(index), 1)
+        
+        sync_embeddings('project', {2: 'quantum computing'}, model=encoder, model_name='fake')
+        self.assertEqual(len(self.vector_index.get_index('project', 'exact', model_name='fake')), 2)
+    
+    def test_rows_deleted_by_another_process_leave_the_index(self):
+        """Test that a refresh drops ids whose stored embeddings were deleted elsewhere"""
+        from .AI.embedding_store import sync_embeddings
+        from .models import StoredEmbedding
+        
+        encoder = FakeEncoder()
+        sync_embeddings('project', {901: 'deep learning', 902: 'quantum computing', 903: 'protein folding'},
+                        model=encoder, model_name='fake')
+        index = self.vector_index.get_index('project', 'exact', model_name='fake')
+        self.assertEqual(index.ids(), {901, 902, 903})
+        
+        # Deleted straight from the table, as another process would, bypassing remove_from_indexes()
+        StoredEmbedding.objects.filter(kind='project', object_id=901).delete()
+        index = self.vector_index.get_index('project', 'exact', model_name='fake')
+        self.assertEqual(index.ids(), {902, 903})
+        ids, _ = index.search(encoder.encode(['deep learning']), 3)
+        self.assertNotIn(901, ids[0])
+
+class VectorizedScoringTests(TestCase):
+    """Test the batched date / shared-author masks used by the matcher"""
+    
+    def test_eligible_pairs_masks(self):
+        """Test that only later, co-authored, present pairs are eligible"""
+        import numpy as np
+        import pandas as pd
+        from .AI.nlp_ba_model_1_with_adminreq_ import eligible_pairs, rows_for_ids
+        
+        projects_df = pd.DataFrame({
+            "id": [1, 2],
+            "created": pd.to_datetime(["2020-01-01", "2025-01-01"], utc=True),
+            "author_ids": [{1}, {2}],
+        })
+        papers_df = pd.DataFrame({
+            "id": [7, 8],
+            "published_date": pd.to_datetime(["2024-06-01", "2024-06-01"], utc=True),
+            "author_ids": [{1, 3}, {2}],
+        })
+        
+        project_rows = rows_for_ids(projects_df["id"], np.array([[1, 2, 99]]))
+        self.assertEqual(list(project_rows[0]), [0, 1, -1])
+        
+        paper_rows = np.zeros_like(project_rows)  # paper 7 against projects 1, 2 and a missing one
+        mask = eligible_pairs(projects_df, papers_df, project_rows, paper_rows)
+        self.assertEqual(list(mask[0]), [True, False, False])
+        
+        # Paper 8 shares Alan Turing with project 2 but was published before the project started
+        mask = eligible_pairs(projects_df, papers_df, np.array([[1]]), np.array([[1]]))
+        self.assertFalse(mask[0][0])
+
+class MatchRequestUpsertTests(TestCase):
+    """Test that repeated matching runs update match requests instead of duplicating them"""
+    
+    @override_settings(SIGNALS_ENABLED=False)
+    def test_record_matches_upserts_pairs(self):
+        """Test that a re-run updates the score in place and keeps the review decision"""
+        import numpy as np
+        import pandas as pd
+        from .AI.nlp_ba_model_1_with_adminreq_ import record_matches
+        from .models import MatchRequest
+        
+        author = create_test_author(name="Ada Lovelace", email="ada@example.com")
+        project = create_test_project()
+        publication = Publication.objects.create(project=project, title="Upserted Paper", year=2024,
+                                                 type="Journal", url="https://example.com/u.pdf")
+        projects_df = pd.DataFrame({"id": [project.id], "title": [project.title],
+                                    "author_ids": [{author.id}]})
+        papers_df = pd.DataFrame({"id": [publication.id], "title": [publication.title],
+                                  "author_ids": [{author.id}]})
+        
+        record_matches(projects_df, papers_df, np.array([0]), np.array([0]), np.array([0.7]))
+        MatchRequest.objects.update(approved=True)
+        record_matches(projects_df, papers_df, np.array([0, 0]), np.array([0, 0]), np.array([0.8, 0.75]))
+        
+        match = MatchRequest.objects.get()
+        self.assertEqual(match.match_score, 0.8)
+        self.assertTrue(match.approved)
+        self.assertEqual(match.match_authors, "Ada Lovelace")
+
+class AuthorIndexTests(TestCase):
+    """Test resolving free-text project teams to Author ids for matching"""
+    
+    def setUp(self):
+        from .AI import model_registry, vector_index
+        model_registry.clear()
+        vector_index.clear()
+        model_registry.register_model(FakeEncoder())
+        self.addCleanup(model_registry.clear)
+        self.addCleanup(vector_index.clear)
+    
+    def test_split_team(self):
+        """Test that names, titles, separators and emails are all handled"""
+        from .AI.author_index import split_team
+        
+        names, emails = split_team("Dr. Ada Lovelace, Alan Turing and grace@Example.com; ['Edsger Dijkstra']")
+        self.assertEqual(names, {"ada lovelace", "alan turing", "edsger dijkstra"})
+        self.assertEqual(emails, {"grace@example.com"})
+    
+    def test_team_resolved_on_save(self):
+        """Test that project and author saves keep team_authors current"""
+        ada = create_test_author(name="Ada Lovelace", email="ada@example.com")
+        grace = create_test_author(name="Grace Hopper", email="grace@example.com")
+        project = create_test_project(team="Prof. Ada Lovelace, GRACE@example.com, Alan Turing")
+        self.assertEqual(set(project.team_authors.all()), {ada, grace})
+        
+        alan = create_test_author(name="Alan Turing", email="alan@example.com")
+        self.assertEqual(set(project.team_authors.all()), {ada, grace, alan})
+
+    def test_titled_and_punctuated_author_names(self):
+        """Test that authors stored with titles or apostrophes match the plain names in a team"""
+        from .AI.author_index import resolve_team
+
+        ada = create_test_author(name="Dr. Ada Lovelace", email="ada@example.com")
+        jean = create_test_author(name="Jean-Luc O'Brien", email="jl@example.com")
+        alan = create_test_author(name="Alan Turing", email="alan@example.com")
+        self.assertEqual(resolve_team("Ada Lovelace, Jean-Luc O'Brien and Alan Turing"), {ada.id, jean.id, alan.id})
+
+        project = create_test_project(team="Ada Lovelace and Jean-Luc O'Brien")
+        self.assertEqual(set(project.team_authors.all()), {ada, jean})
+
+        # A rename is picked up by the projects that named the author before and after
+        jean.name = "Prof. Jean-Luc Picard"
+        jean.save()
+        self.assertEqual(set(project.team_authors.all()), {ada})
+        project.team = "Ada Lovelace, Jean-Luc Picard"
+        project.save()
+        self.assertEqual(set(project.team_authors.all()), {ada, jean})
+
+    @override_settings(SIGNALS_ENABLED=False)
+    def test_match_publication_uses_author_ids(self):
+        """Test that a shared collaborator produces a match request with their name"""
+        from .AI.nlp_ba_model_1_with_adminreq_ import match_publication
+        from .models import MatchRequest
+        
+        ada = create_test_author(name="Ada Lovelace", email="ada@example.com")
+        other = create_test_author(name="Someone Else", email="else@example.com")
+        project = create_test_project(title="Graph Neural Networks", team="Ada Lovelace and Alan Turing")
+        publication = Publication.objects.create(project=project, title="Graph Neural Networks", year=2024,
+                                                 type="Journal", url="https://example.com/g.pdf",
+                                                 primary_author=other)
+        publication.collaborators.add(ada)
+        
+        match_publication(publication, threshold=0.5)
+        
+        match = MatchRequest.objects.get()
+        self.assertEqual(match.project, project)
+        self.assertEqual(match.match_authors, "Ada Lovelace")
+
+def make_test_pdf(pages):
+    """Build a minimal PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+@unittest.skipUnless(importlib.util.find_spec("pypdf"), "pypdf is not installed")
+@override_settings(SIGNALS_ENABLED=False)
+class TextExtractionTests(TestCase):
+    """Test PDF body-text extraction and its use as a matching signal"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(__import__("shutil").rmtree, media_root, True)
+        override = self.settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.project = create_test_project()
+    
+    def create_publication(self, title, content):
+        return Publication.objects.create(project=self.project, title=title, year=2024, type="Journal",
+                                          file=SimpleUploadedFile("paper.pdf", content))
+    
+    def test_extract_file_stops_at_token_cap(self):
+        """Test that pages after the word cap are never read"""
+        from django.conf import settings
+        from .AI.text_extraction import extract_file
+        
+        path = os.path.join(settings.MEDIA_ROOT, "paper.pdf")
+        with open(path, "wb") as handle:
+            handle.write(make_test_pdf(["one two three four", "five six seven eight", "nine ten"]))
+        
+        result = extract_file(path, max_tokens=6)
+        self.assertEqual(result, {"text": "one two three four five six", "pages": 2, "error": ""})
+    
+    def test_text_cached_by_file_hash_and_matched_on(self):
+        """Test that identical uploads share one parse and the text reaches the matcher"""
+        from .AI.text_extraction import extract_publication_texts
+        from .AI.nlp_ba_model_1_with_adminreq_ import load_papers
+        from .models import PublicationText
+        
+        pdf = make_test_pdf(["Graph neural networks for molecules"])
+        first = self.create_publication("First Upload", pdf)
+        second = self.create_publication("Second Upload", pdf)
+        broken = self.create_publication("Broken Upload", b"<html>not a pdf</html>")
+        
+        self.assertEqual(extract_publication_texts(), (3, 2))
+        self.assertEqual(extract_publication_texts(refresh=True), (3, 0))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(first.body_text, second.body_text)
+        self.assertEqual(first.body_text.text, "Graph neural networks for molecules")
+        self.assertNotEqual(broken.body_text.error, "")
+        self.assertEqual(PublicationText.objects.count(), 2)
+        
+        papers_df, _ = load_papers(FakeEncoder(), publication_ids=[first.id])
+        self.assertEqual(papers_df.loc[0, "combined_text"], "first upload. graph neural networks for molecules")
+    
+    def test_matching_job_re_extracts_replaced_file(self):
+        """Test that a job for a re-uploaded publication picks up the new file's text"""
+        from unittest import mock
+        from .matching_jobs import process_jobs
+        from .models import MatchingJob
+        
+        publication = self.create_publication("Paper", make_test_pdf(["Draft about graphs"]))
+        with mock.patch("projects.matching_jobs.match_publications", return_value=([], {})):
+            process_jobs([MatchingJob.objects.create(publication=publication)])
+            publication.refresh_from_db()
+            self.assertEqual(publication.body_text.text, "Draft about graphs")
+            
+            publication.file = SimpleUploadedFile("paper.pdf", make_test_pdf(["Final about molecules"]))
+            publication.save()
+            process_jobs([MatchingJob.objects.create(publication=publication)])
+            publication.refresh_from_db()
+            self.assertEqual(publication.body_text.text, "Final about molecules")
+            
+            publication.file = ""
+            publication.save()
+            process_jobs([MatchingJob.objects.create(publication=publication)])
+            publication.refresh_from_db()
+            self.assertIsNone(publication.body_text)
+
+@override_settings(SIGNALS_ENABLED=False)
+class ContentAddressedStorageTests(TestCase):
+    """Test that publication uploads are stored once per distinct content"""
+    
+    def setUp(self):
+        import shutil
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.project = create_test_project()
+    
+    def create_publication(self, name, content):
+        return Publication.objects.create(project=self.project, title=name, year=2024, type="Journal",
+                                          file=SimpleUploadedFile(name, content))
+    
+    def test_identical_uploads_share_one_refcounted_blob(self):
+        """Test that duplicates reuse the blob and the last delete removes it"""
+        from .models import StoredBlob
+        
+        first = self.create_publication("Attention.pdf", b"same bytes")
+        second = self.create_publication("Attention_FrlpbnV.PDF", b"same bytes")
+        other = self.create_publication("Other.pdf", b"other bytes")
+        
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertRegex(first.file.name, r"^publications/files/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$")
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual(StoredBlob.objects.get(path=first.file.name).refcount, 2)
+        
+        path = first.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.filter(path=second.file.name).exists())
+    
+    def test_dedupe_media_command(self):
+        """Test that legacy duplicate uploads are collapsed into one blob"""
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import StoredBlob
+        
+        legacy_dir = os.path.join(self.media_root, "publications", "files")
+        os.makedirs(legacy_dir)
+        for name, content in [("Paper.pdf", b"pdf"), ("Paper_Zcr0Pnj.pdf", b"pdf"), ("Orphan_x.pdf", b"old")]:
+            with open(os.path.join(legacy_dir, name), "wb") as handle:
+                handle.write(content)
+        first = Publication.objects.create(project=self.project, title="A", year=2024, type="Journal")
+        second = Publication.objects.create(project=self.project, title="B", year=2024, type="Journal")
+        Publication.objects.filter(id=first.id).update(file="publications/files/Paper.pdf")
+        Publication.objects.filter(id=second.id).update(file="publications/files/Paper_Zcr0Pnj.pdf")
+        
+        call_command("dedupe_media", "--delete-orphans", stdout=StringIO())
+        
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(StoredBlob.objects.get().refcount, 2)
+        self.assertEqual(os.listdir(legacy_dir), [first.file.name.split("/")[2]])
+        with open(first.file.path, "rb") as handle:
+            self.assertEqual(handle.read(), b"pdf")
+    
+    def test_dedupe_media_keeps_the_file_until_rows_are_rewritten(self):
+        """Test that a failed database update leaves the legacy file in place"""
+        from unittest import mock
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import StoredBlob
+        
+        legacy_dir = os.path.join(self.media_root, "publications", "files")
+        os.makedirs(legacy_dir)
+        with open(os.path.join(legacy_dir, "Paper.pdf"), "wb") as handle:
+            handle.write(b"pdf")
+        publication = Publication.objects.create(project=self.project, title="A", year=2024, type="Journal")
+        Publication.objects.filter(id=publication.id).update(file="publications/files/Paper.pdf")
+        
+        with mock.patch.object(StoredBlob.objects, "get_or_create", side_effect=RuntimeError("database gone")):
+            with self.assertRaises(RuntimeError):
+                call_command("dedupe_media", stdout=StringIO())
+        
+        publication.refresh_from_db()
+        self.assertEqual(publication.file.name, "publications/files/Paper.pdf")
+        self.assertTrue(os.path.exists(publication.file.path))
+    
+    def test_replacing_a_file_releases_the_old_blob(self):
+        """Test that replacing or clearing an upload drops the old reference after commit"""
+        from .models import StoredBlob
+        
+        publication = self.create_publication("Draft.pdf", b"draft")
+        keeper = self.create_publication("Draft.pdf", b"draft")
+        draft_name, draft_path = publication.file.name, publication.file.path
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.file = SimpleUploadedFile("Final.pdf", b"final")
+            publication.save()
+        self.assertEqual(StoredBlob.objects.get(path=draft_name).refcount, 1)
+        self.assertEqual(StoredBlob.objects.get(path=publication.file.name).refcount, 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            keeper.file = ""
+            keeper.save()
+        self.assertFalse(StoredBlob.objects.filter(path=draft_name).exists())
+        self.assertFalse(os.path.exists(draft_path))
+        
+        # Re-uploading the same content keeps exactly one reference
+        final_name = publication.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.file = SimpleUploadedFile("Final again.pdf", b"final")
+            publication.save()
+        self.assertEqual(publication.file.name, final_name)
+        self.assertEqual(StoredBlob.objects.get(path=final_name).refcount, 1)
+        self.assertTrue(os.path.exists(publication.file.path))
+    
+    def test_assigning_a_stored_name_adds_a_reference(self):
+        """Test that a new publication pointing at an existing blob keeps the file alive for both"""
+        from .models import StoredBlob
+        
+        first = self.create_publication("Shared.pdf", b"shared")
+        second = Publication.objects.create(project=self.project, title="Copy", year=2024, type="Journal",
+                                            file=first.file.name)
+        self.assertEqual(StoredBlob.objects.get(path=first.file.name).refcount, 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(second.file.path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(second.file.path))
+    
+    def test_field_file_save_counts_one_reference(self):
+        """Test that FieldFile.save(..., save=True), as used for URL downloads, is counted once"""
+        from django.core.files.base import ContentFile
+        from .models import StoredBlob
+        
+        publication = Publication.objects.create(project=self.project, title="Fetched", year=2024, type="Journal")
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.file.save("fetched.pdf", ContentFile(b"fetched"), save=True)
+        self.assertEqual(StoredBlob.objects.get(path=publication.file.name).refcount, 1)
+        
+        # Fetching the same content again does not add a second reference either
+        publication.file.save("fetched.pdf", ContentFile(b"fetched"), save=True)
+        self.assertEqual(StoredBlob.objects.get(path=publication.file.name).refcount, 1)
+        
+        path = publication.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.delete()
+        self.assertFalse(os.path.exists(path))
+    
+    def test_rolled_back_delete_keeps_the_file(self):
+        """Test that files are only released once the delete commits"""
+        from django.db import transaction
+        
+        publication = self.create_publication("Kept.pdf", b"kept")
+        pk, path = publication.pk, publication.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                publication.delete()
+                raise RuntimeError("rolled back")
+        self.assertTrue(Publication.objects.filter(pk=pk).exists())
+        self.assertTrue(os.path.exists(path))
+
+class LinkCheckTests(TestCase):
+    """Test concurrent, cached download-link validation against a local HTTP server"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        cls.requests_seen = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            routes = {
+                "/paper.pdf": (200, "application/pdf"),
+                "/page.html": (200, "text/html"),
+                "/missing.pdf": (404, "text/html"),
+            }
+            
+            def respond(self):
+                cls.requests_seen.append((self.command, self.path))
+                if self.path == "/no-head.pdf":
+                    status, content_type = (405, "text/plain") if self.command == "HEAD" else (200, "application/pdf")
+                else:
+                    status, content_type = self.routes.get(self.path, (404, "text/html"))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            
+            do_HEAD = do_GET = respond
+            
+            def log_message(self, *args):
+                pass
+        
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+    
+    def setUp(self):
+        self.requests_seen.clear()
+    
+    def test_check_urls_concurrent_and_cached(self):
+        """Test results, the HEAD-refused fallback, and positive / negative caching"""
+        from datetime import timedelta
+        from .link_checker import check_urls
+        
+        urls = [f"{self.base_url}{path}" for path in ("/paper.pdf", "/page.html", "/missing.pdf", "/no-head.pdf")]
+        urls.append("http://127.0.0.1:1/unreachable.pdf")
+        checks = check_urls(urls, workers=4)
+        
+        self.assertEqual([checks[url].is_valid for url in urls], [True, False, False, True, False])
+        self.assertEqual(checks[urls[2]].status_code, 404)
+        self.assertNotEqual(checks[urls[4]].error, "")
+        self.assertIn(("GET", "/no-head.pdf"), self.requests_seen)
+        # Invalid results are cached for a shorter time than valid ones
+        self.assertLess(checks[urls[2]].expires_at - checks[urls[2]].checked_at, timedelta(hours=2))
+        self.assertGreaterEqual(checks[urls[0]].expires_at - checks[urls[0]].checked_at, timedelta(hours=2))
+        
+        self.requests_seen.clear()
+        check_urls(urls)
+        self.assertEqual(self.requests_seen, [])
+        check_urls(urls[:1], force=True)
+        self.assertEqual(self.requests_seen, [("HEAD", "/paper.pdf")])
+    
+    @override_settings(SIGNALS_ENABLED=False)
+    def test_invalid_publication_link_emails_uploader(self):
+        """Test that only publications with broken links trigger the issue email"""
+        from unittest import mock
+        from .link_checker import check_publication_links
+        
+        project = create_test_project()
+        good = Publication.objects.create(project=project, title="Good", year=2024, type="Journal",
+                                          url=f"{self.base_url}/paper.pdf")
+        bad = Publication.objects.create(project=project, title="Bad", year=2024, type="Journal",
+                                         url=f"{self.base_url}/page.html")
+        
+        with mock.patch("projects.link_checker.notify_invalid_publication_url") as notify:
+            results = check_publication_links([good.id, bad.id], notify_email="researcher@example.com")
+        
+        self.assertTrue(results[good.id].is_valid)
+        self.assertFalse(results[bad.id].is_valid)
+        notify.assert_called_once_with(bad, "researcher@example.com")
+
+@unittest.skipUnless(importlib.util.find_spec("aiosmtpd"), "aiosmtpd is not installed")
+class MailQueueTests(TestCase):
+    """Test the outbound mail queue against a local aiosmtpd server"""
+    
+    REFUSED = "refused@example.com"
+    GREYLISTED = "greylisted@example.com"
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import socket
+        from aiosmtpd.controller import Controller
+        
+        cls.received = []
+        
+        class Handler:
+            async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+                if address == MailQueueTests.REFUSED:
+                    return "550 No such user"
+                if address == MailQueueTests.GREYLISTED:
+                    return "451 Greylisted, try again later"
+                envelope.rcpt_tos.append(address)
+                return "250 OK"
+            
+            async def handle_DATA(self, server, session, envelope):
+                cls.received.append((envelope.rcpt_tos[0], envelope.content))
+                return "250 Message accepted for delivery"
+        
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            cls.port = sock.getsockname()[1]
+        cls.controller = Controller(Handler(), hostname="127.0.0.1", port=cls.port)
+        cls.controller.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.controller.stop()
+        super().tearDownClass()
+    
+    def setUp(self):
+        self.received.clear()
+        self.smtp_settings = override_settings(EMAIL_HOST="127.0.0.1", EMAIL_PORT=self.port, EMAIL_USE_TLS=False)
+        self.smtp_settings.enable()
+        self.addCleanup(self.smtp_settings.disable)
+    
+    def test_group_send_is_queued_and_delivered_over_one_connection(self):
+        """Test that a 50-member group send only inserts rows and the worker sends them on one connection"""
+        from .email import send_group_message_notification_email
+        from .mail_queue import MailConnection, run_pending_emails
+        from .models import OutboundEmail
+        
+        sender = User.objects.create_user(username="sender", email="sender@example.com", password="pw")
+        members = [User(username=f"member{i}", email=f"member{i}@example.com") for i in range(50)]
+        
+        self.assertTrue(send_group_message_notification_email(members, sender, "Lab", "Hello everyone"))
+        self.assertEqual(self.received, [])
+        self.assertEqual(OutboundEmail.objects.filter(status="pending").count(), 50)
+        
+        mail_connection = MailConnection()
+        claimed, sent, deferred, failed = run_pending_emails(mail_connection, batch_size=50)
+        mail_connection.close()
+        
+        self.assertEqual((claimed, sent, deferred, failed), (50, 50, 0, 0))
+        self.assertEqual(mail_connection.opened, 1)
+        self.assertEqual(len(self.received), 50)
+        self.assertEqual(OutboundEmail.objects.filter(status="sent", sent_at__isnull=False).count(), 50)
+    
+    def test_delivery_marks_notification_email_sent(self):
+        """Test that a new message's notification is flagged once its digest is delivered"""
+        from .digests import flush_digests
+        from .mail_queue import MailConnection, run_pending_emails
+        
+        alice = User.objects.create_user(username="alice", email="alice@example.com", password="pw")
+        bob = User.objects.create_user(username="bob", email="bob@example.com", password="pw")
+        Message.objects.create(sender=alice, recipient=bob, content="Hi Bob")
+        notification = Notification.objects.get(user=bob)
+        flush_digests(force=True)
+        self.assertFalse(notification.is_email_sent)
+        
+        mail_connection = MailConnection()
+        run_pending_emails(mail_connection)
+        mail_connection.close()
+        
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_email_sent)
+        self.assertEqual(self.received[0][0], "bob@example.com")
+    
+    @override_settings(MAIL_QUEUE_RATE_LIMIT=2)
+    def test_rate_limit_defers_and_refused_recipient_fails(self):
+        """Test the per-recipient rate limit and permanent failures"""
+        from .mail_queue import MailConnection, enqueue_email, run_pending_emails
+        from .models import OutboundEmail
+        
+        for i in range(3):
+            enqueue_email("busy@example.com", f"Update {i}", text_body="...")
+        refused = enqueue_email(self.REFUSED, "Hello", text_body="...")
+        
+        mail_connection = MailConnection()
+        claimed, sent, deferred, failed = run_pending_emails(mail_connection)
+        mail_connection.close()
+        
+        self.assertEqual((claimed, sent, deferred, failed), (4, 2, 1, 1))
+        refused.refresh_from_db()
+        self.assertEqual(refused.status, "failed")
+        self.assertIn("550", refused.last_error)
+        waiting = OutboundEmail.objects.get(status="pending")
+        self.assertEqual(waiting.attempts, 0)
+        self.assertGreater(waiting.next_attempt_at, timezone.now())
+        # Nothing is due until the rate window has passed
+        self.assertEqual(run_pending_emails(mail_connection), (0, 0, 0, 0))
+    
+    @override_settings(MAIL_QUEUE_BACKOFF_SECONDS=30)
+    def test_unreachable_server_backs_off(self):
+        """Test that connection errors reschedule the email with exponential backoff"""
+        from datetime import timedelta
+        from .mail_queue import MailConnection, enqueue_email, run_pending_emails
+        
+        email = enqueue_email("someone@example.com", "Hello", text_body="...")
+        with override_settings(EMAIL_PORT=1):
+            mail_connection = MailConnection()
+        
+        self.assertEqual(run_pending_emails(mail_connection), (1, 0, 1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ("pending", 1))
+        self.assertNotEqual(email.last_error, "")
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+    def test_racing_claims_return_each_email_once(self):
+        """Test that a worker whose claim lost the race gets nothing instead of the same emails"""
+        from unittest import mock
+        from django.db.models.query import QuerySet
+        from .mail_queue import claim_emails, enqueue_email
+        
+        for i in range(3):
+            enqueue_email(f"user{i}@example.com", "Hello", text_body="...")
+        other = []
+        original_update = QuerySet.update
+        
+        def racing_update(queryset, **kwargs):
+            if not other:
+                # Another worker claims the same rows between this worker's read and its update
+                other.append(None)
+                other[0] = claim_emails()
+            return original_update(queryset, **kwargs)
+        
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=racing_update):
+            mine = claim_emails()
+        
+        self.assertEqual(len(other[0]), 3)
+        self.assertEqual(mine, [])
+    
+    @override_settings(MAIL_QUEUE_BACKOFF_SECONDS=30)
+    def test_temporary_rejection_backs_off(self):
+        """Test that a 4xx recipient rejection is retried later instead of failing the email"""
+        from datetime import timedelta
+        from .mail_queue import MailConnection, enqueue_email, run_pending_emails
+        
+        greylisted = enqueue_email(self.GREYLISTED, "Hello", text_body="...")
+        enqueue_email("someone@example.com", "Hello", text_body="...")
+        
+        mail_connection = MailConnection()
+        self.assertEqual(run_pending_emails(mail_connection), (2, 1, 1, 0))
+        mail_connection.close()
+        
+        self.assertEqual(mail_connection.opened, 1)
+        greylisted.refresh_from_db()
+        self.assertEqual((greylisted.status, greylisted.attempts), ("pending", 1))
+        self.assertIn("451", greylisted.last_error)
+        self.assertGreater(greylisted.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+class EmailCompositionTests(TestCase):
+    """Test that email composition carries its recipient explicitly and is thread-safe"""
+    
+    def test_reminders_are_addressed_per_project(self):
+        """Test that each due reminder goes to its own recipient with their own name"""
+        from django.test import RequestFactory
+        from .email import send_90_percent_reminders
+        from .models import OutboundEmail
+        
+        User.objects.create_user(username="ada", email="ada@example.com", password="pw")
+        Author.objects.create(name="Ada Lovelace", email="ada@example.com")
+        projects = [
+            ("ada@example.com", "Engines", "2020-01-01", 12),
+            ("grace@example.com", "Compilers", "2020-01-01", 12),
+            ("future@example.com", "Later", "2999-01-01", 12),  # Not due yet
+        ]
+        
+        self.assertEqual(send_90_percent_reminders(RequestFactory().get("/"), projects), 2)
+        
+        emails = {email.recipient: email for email in OutboundEmail.objects.all()}
+        self.assertEqual(set(emails), {"ada@example.com", "grace@example.com"})
+        self.assertIn("Ada Lovelace", emails["ada@example.com"].html_body)
+        self.assertIn("/upload/", emails["ada@example.com"].html_body)
+        self.assertIn("Compilers", emails["grace@example.com"].subject)
+        self.assertIn("No upload link available", emails["grace@example.com"].html_body)
+    
+    def test_parallel_composition_does_not_cross_recipients(self):
+        """Test that messages composed on many threads at once keep their own recipient"""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from .email import compose_email, welcome_context
+        from .email_templates import render
+        
+        barrier = threading.Barrier(8)
+        
+        def slow_link(request, email):
+            barrier.wait()  # Make every thread be mid-composition at the same time
+            time.sleep(0.01)
+            return f"https://example.com/upload/{email}/"
+        
+        def compose(i):
+            email = f"user{i}@example.com"
+            html_body = render("welcome_email.html", welcome_context(None, email, f"User {i}"))
+            return compose_email(email, "Welcome", html_body)
+        
+        with mock.patch("projects.email.generate_upload_link", side_effect=slow_link):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                emails = list(pool.map(compose, range(8)))
+        
+        for i, email in enumerate(emails):
+            self.assertEqual(email.recipient, f"user{i}@example.com")
+            self.assertIn(f"Welcome User {i}!", email.html_body)
+            self.assertIn(f'href="https://example.com/upload/user{i}@example.com/"', email.html_body)
+            self.assertNotIn(f"user{(i + 1) % 8}@", email.html_body)
+
+class EmailTemplateTests(TestCase):
+    """Test the compiled, mtime-invalidated email template cache"""
+    
+    def setUp(self):
+        from unittest import mock
+        from . import email_templates
+        
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.object(email_templates, "EMAIL_TEMPLATE_DIR", self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        email_templates.clear_cache()
+        email_templates.reset_stats()
+        self.addCleanup(email_templates.clear_cache)
+    
+    def write(self, name, source, mtime_ns=None):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+    
+    def test_batch_render_compiles_once_and_escapes(self):
+        """Test that a batch renders every context from one compiled template"""
+        from .email_templates import get_stats, render_many
+        
+        self.write("hello.html", "Hello {{ researcher_name }}")
+        contexts = [{"researcher_name": f"User {i}"} for i in range(1000)] + [{"researcher_name": "<b>"}]
+        
+        bodies = render_many("hello.html", contexts)
+        render_many("hello.html", contexts[:1])
+        
+        self.assertEqual(bodies[0], "Hello User 0")
+        self.assertEqual(bodies[-1], "Hello &lt;b&gt;")
+        self.assertEqual(get_stats(), {"compiled": 1, "hits": 1})
+    
+    def test_edited_template_is_recompiled(self):
+        """Test that changing the file's mtime invalidates the cached template"""
+        from .email_templates import get_stats, render
+        
+        self.write("note.html", "v1 {{ x }}", mtime_ns=1_000_000_000)
+        self.assertEqual(render("note.html", {"x": 1}), "v1 1")
+        self.write("note.html", "v2 {{ x }}", mtime_ns=2_000_000_000)
+        self.assertEqual(render("note.html", {"x": 1}), "v2 1")
+        self.assertEqual(get_stats()["compiled"], 2)
+        
+        with self.assertRaises(FileNotFoundError):
+            render("missing.html", {})
+
+class NotificationDigestTests(TestCase):
+    """Test that notifications are batched into one digest email per user per window"""
+    
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", email="alice@example.com", password="pw")
+        self.bob = User.objects.create_user(username="bob", email="bob@example.com", password="pw")
+        self.carol = User.objects.create_user(username="carol", email="carol@example.com", password="pw")
+    
+    def age(self, minutes):
+        """Backdate every notification so the digest window has elapsed."""
+        from datetime import timedelta
+        Notification.objects.update(created_at=timezone.now() - timedelta(minutes=minutes))
+    
+    def test_messages_are_not_emailed_per_event(self):
+        """Test that new messages only create notifications until the window elapses"""
+        from .digests import flush_digests
+        from .models import OutboundEmail
+        
+        for i in range(5):
+            Message.objects.create(sender=self.alice, recipient=self.bob, content=f"Message {i}")
+        
+        self.assertEqual(OutboundEmail.objects.count(), 0)
+        self.assertEqual(flush_digests(), (0, 0))  # Window still open
+        self.age(16)
+        self.assertEqual(flush_digests(), (1, 5))
+        self.assertEqual(flush_digests(), (0, 0))  # Already included
+        
+        digest = OutboundEmail.objects.get()
+        self.assertEqual(digest.recipient, "bob@example.com")
+        self.assertIn("New messages from alice (5)", digest.html_body)
+        self.assertIn("Message 4", digest.html_body)
+        self.assertEqual(digest.digested_notifications.count(), 5)
+    
+    def test_duplicates_collapse_and_read_notifications_are_skipped(self):
+        """Test collapsing of several notifications for one message and per-user digests"""
+        from .digests import flush_digests
+        from .models import OutboundEmail
+        
+        message = Message.objects.create(sender=self.alice, recipient=self.bob, content="Hello")
+        Notification.objects.create(user=self.bob, message=message, notification_type="message_received",
+                                    title="New message from alice")
+        Message.objects.create(sender=self.carol, recipient=self.bob, content="Hi from Carol")
+        read = Message.objects.create(sender=self.bob, recipient=self.alice, content="Seen already")
+        Notification.objects.filter(message=read).update(is_read=True)
+        self.age(20)
+        
+        self.assertEqual(flush_digests(), (1, 3))
+        digest = OutboundEmail.objects.get()
+        self.assertIn("New messages from alice", digest.html_body)
+        self.assertNotIn("New messages from alice (2)", digest.html_body)
+        self.assertIn("New messages from carol", digest.html_body)
+        self.assertIn("2 new notifications", digest.subject)
+        self.assertFalse(OutboundEmail.objects.filter(recipient="alice@example.com").exists())
+    
+    def test_delivered_digest_marks_notifications_sent(self):
+        """Test that delivering a digest sets is_email_sent on every notification it covered"""
+        from unittest import mock
+        from .digests import flush_digests
+        from .mail_queue import run_pending_emails
+        
+        Message.objects.create(sender=self.alice, recipient=self.bob, content="One")
+        Message.objects.create(sender=self.carol, recipient=self.bob, content="Two")
+        flush_digests(force=True)
+        
+        run_pending_emails(mock.Mock())
+        
+        self.assertEqual(Notification.objects.filter(user=self.bob, is_email_sent=True).count(), 2)
+
+    def test_concurrent_flush_does_not_duplicate_a_digest(self):
+        """Test that a digest whose notifications another worker took meanwhile is not queued"""
+        from unittest import mock
+        from . import digests
+        from .models import OutboundEmail
+
+        Message.objects.create(sender=self.alice, recipient=self.bob, content="One")
+        Message.objects.create(sender=self.alice, recipient=self.carol, content="Two")
+        render_many = digests.render_many
+
+        def other_worker_flushes_bob(name, contexts):
+            # Another worker digests bob's notification after this flush has read it
+            other = OutboundEmail.objects.create(recipient="bob@example.com", subject="other digest")
+            Notification.objects.filter(user=self.bob).update(digest=other, digested_at=timezone.now())
+            return render_many(name, contexts)
+
+        with mock.patch.object(digests, "render_many", side_effect=other_worker_flushes_bob):
+            self.assertEqual(digests.flush_digests(force=True), (1, 1))
+
+        self.assertEqual(sorted(OutboundEmail.objects.values_list("recipient", "subject")),
+                         [("bob@example.com", "other digest"), ("carol@example.com", "🔔 1 new notification")])
+
+class UnreadReminderTests(TestCase):
+    """Test the grouped, at-most-once unread message reminder job"""
+    
+    def setUp(self):
+        from datetime import timedelta
+        self.alice = User.objects.create_user(username="alice", email="alice@example.com", password="pw")
+        self.bob = User.objects.create_user(username="bob", email="bob@example.com", password="pw")
+        self.carol = User.objects.create_user(username="carol", email="carol@example.com", password="pw")
+        self.long_ago = timezone.now() - timedelta(hours=3)
+    
+    def send(self, sender, recipient, count, old=True):
+        for i in range(count):
+            message = Message.objects.create(sender=sender, recipient=recipient, content=f"Message {i}")
+            if old:
+                Message.objects.filter(pk=message.pk).update(sent_at=self.long_ago)
+    
+    def test_one_reminder_per_recipient_in_constant_queries(self):
+        """Test per-recipient aggregation with a query count independent of the number of messages"""
+        from .email import send_unread_message_reminders
+        from .models import OutboundEmail
+        
+        self.send(self.alice, self.bob, 30)
+        self.send(self.carol, self.bob, 5)
+        self.send(self.bob, self.alice, 1)
+        self.send(self.carol, self.alice, 1, old=False)  # Too recent
+        
+        with self.assertNumQueries(6):
+            self.assertEqual(send_unread_message_reminders(), (2, 36))
+        
+        reminders = {email.recipient: email for email in OutboundEmail.objects.all()}
+        self.assertEqual(reminders["bob@example.com"].subject, "Reminder: 35 Unread Messages")
+        self.assertIn("from 2 people", reminders["bob@example.com"].text_body)
+        self.assertEqual(reminders["alice@example.com"].subject, "Reminder: Unread Message")
+    
+    def test_messages_are_reminded_at_most_once(self):
+        """Test that the reminded_at watermark stops repeat reminders"""
+        from .email import send_unread_message_reminders
+        from .models import OutboundEmail
+        
+        self.send(self.alice, self.bob, 3)
+        Message.objects.filter(recipient=self.bob).order_by("id").first().mark_as_read()
+        
+        self.assertEqual(send_unread_message_reminders(), (1, 2))
+        self.assertEqual(send_unread_message_reminders(), (0, 0))
+        
+        self.send(self.carol, self.bob, 1)
+        self.assertEqual(send_unread_message_reminders(), (1, 1))
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+        self.assertFalse(Message.objects.filter(is_read=False, reminded_at__isnull=True).exists())
+
+@override_settings(SIGNALS_ENABLED=False)
+class ProjectDeadlineTests(TestCase):
+    """Test deadline columns derived from Project.duration and the scheduled reminders"""
+    
+    def test_parse_duration(self):
+        """Test free-text durations"""
+        from dateutil.relativedelta import relativedelta
+        from .deadlines import parse_duration
+        
+        self.assertEqual(parse_duration("3 years"), relativedelta(years=3))
+        self.assertEqual(parse_duration("18 months"), relativedelta(months=18))
+        self.assertEqual(parse_duration("1 year 6 months"), relativedelta(months=18))
+        self.assertEqual(parse_duration("1.5 Years"), relativedelta(months=18))
+        self.assertEqual(parse_duration("2 weeks"), relativedelta(days=14))
+        self.assertIsNone(parse_duration("ongoing"))
+    
+    def test_deadlines_follow_duration_on_save(self):
+        """Test that saving keeps end_date / reminder_date in sync and re-arms reminders"""
+        project = create_test_project(created=date(2024, 1, 1), duration="1 year")
+        self.assertEqual((project.end_date, project.reminder_date), (date(2025, 1, 1), date(2024, 11, 25)))
+        
+        Project.objects.filter(pk=project.pk).update(reminder_sent_at=timezone.now())
+        project.refresh_from_db()
+        project.duration = "2 years"
+        project.save(update_fields=["duration"])
+        project.refresh_from_db()
+        self.assertEqual(project.end_date, date(2026, 1, 1))
+        self.assertIsNone(project.reminder_sent_at)
+        
+        project.duration = "until funding runs out"
+        project.save()
+        self.assertIsNone(project.end_date)
+    
+    def test_due_reminders_are_sent_once_per_stage(self):
+        """Test that only due projects are selected and each stage is queued once per team author"""
+        from .email import send_due_project_reminders
+        from .models import OutboundEmail
+        
+        ada = create_test_author(name="Ada", email="ada@example.com")
+        grace = create_test_author(name="Grace", email="grace@example.com")
+        almost = create_test_project(title="Almost done", created=date(2024, 1, 1), duration="1 year")
+        ended = create_test_project(title="Ended", created=date(2020, 1, 1), duration="2 years")
+        create_test_project(title="Young", created=date(2024, 12, 1), duration="3 years")
+        almost.team_authors.set([ada, grace])
+        ended.team_authors.set([ada])
+        today = date(2024, 12, 15)
+        
+        with self.assertNumQueries(18):
+            sent = send_due_project_reminders(today=today)
+        self.assertEqual(sent, {"reminder.html": 2, "upload_reminder.html": 1})
+        self.assertEqual(send_due_project_reminders(today=today), {"reminder.html": 0, "upload_reminder.html": 0})
+        
+        subjects = sorted(OutboundEmail.objects.values_list("recipient", "subject"))
+        self.assertEqual(subjects, [
+            ("ada@example.com", "⏰ Reminder: Upload Publication for 'Almost done'"),
+            ("ada@example.com", "⚠️ Final Reminder: Project 'Ended' Ended"),
+            ("grace@example.com", "⏰ Reminder: Upload Publication for 'Almost done'"),
+        ])
+        # Once the first project ends, its final reminder follows
+        self.assertEqual(send_due_project_reminders(today=date(2025, 1, 2)), {"reminder.html": 0, "upload_reminder.html": 2})
+    
+    def test_project_without_team_email_stays_due(self):
+        """Test that a due project nobody could be reminded about is not marked as sent"""
+        from .email import send_due_project_reminders
+        
+        project = create_test_project(title="Ended", created=date(2020, 1, 1), duration="2 years")
+        project.team_authors.set([create_test_author(name="Anonymous", email="")])
+        today = date(2024, 12, 15)
+        
+        self.assertEqual(send_due_project_reminders(today=today), {"reminder.html": 0, "upload_reminder.html": 0})
+        project.refresh_from_db()
+        self.assertIsNone(project.final_reminder_sent_at)
+        
+        project.team_authors.add(create_test_author(name="Ada", email="ada@example.com"))
+        self.assertEqual(send_due_project_reminders(today=today), {"reminder.html": 0, "upload_reminder.html": 1})
+    
+    def test_backfill_marks_past_stages_as_sent(self):
+        """Test that the deadline backfill does not leave already-passed stages to be mass-sent"""
+        import importlib
+        from datetime import timedelta
+        from django.apps import apps
+        from .email import send_due_project_reminders
+        
+        backfill = importlib.import_module("projects.migrations.0020_project_deadlines").backfill_deadlines
+        ended = create_test_project(title="Ended", created=date(2020, 1, 1), duration="2 years")
+        almost = create_test_project(title="Almost done", created=timezone.localdate() - timedelta(days=350), duration="1 year")
+        young = create_test_project(title="Young", created=timezone.localdate(), duration="3 years")
+        ada = create_test_author(name="Ada", email="ada@example.com")
+        for project in (ended, almost, young):
+            project.team_authors.set([ada])
+        Project.objects.update(end_date=None, reminder_date=None)
+        
+        backfill(apps, None)
+        
+        for project in (ended, almost, young):
+            project.refresh_from_db()
+        self.assertIsNotNone(ended.reminder_sent_at)
+        self.assertIsNotNone(ended.final_reminder_sent_at)
+        self.assertIsNotNone(almost.reminder_sent_at)
+        self.assertIsNone(almost.final_reminder_sent_at)
+        self.assertEqual((young.reminder_sent_at, young.final_reminder_sent_at), (None, None))
+        self.assertEqual(send_due_project_reminders(), {"reminder.html": 0, "upload_reminder.html": 0})
+
+@override_settings(SIGNALS_ENABLED=False)
+class FullTextSearchTests(TestCase):
+    """Test the full-text search index and its use by the list views"""
+    
+    def setUp(self):
+        self.project = create_test_project(title="Quantum Sensors", keywords="metrology, interferometry",
+                                           scientific_case="Squeezed light improves gravitational wave detectors.")
+        self.other = create_test_project(title="Coral Reef Survey", abstract="Mapping reefs with quantum-free drones.")
+        self.ada = create_test_author(name="Ada Lovelace", email="ada@example.com")
+    
+    def publish(self, project, title, abstract="No abstract yet", type="Journal"):
+        return Publication.objects.create(project=project, title=title, abstract=abstract, year=2024, type=type)
+    
+    def titles(self, queryset):
+        return [obj.title for obj in queryset]
+    
+    def test_ranked_search_over_all_fields(self):
+        """Test that abstract, keywords, scientific case and author names match, best match first"""
+        from .search import search
+        
+        title_hit = self.publish(self.project, "Graph neural networks")
+        abstract_hit = self.publish(self.project, "Message passing",
+                                  abstract="We study graph neural networks on molecules.")
+        self.publish(self.project, "Unrelated")
+        
+        self.assertEqual(self.titles(search(Publication.objects.all(), "graph networks")),
+                         [title_hit.title, abstract_hit.title])
+        self.assertEqual(self.titles(search(Project.objects.all(), "interferometry")), ["Quantum Sensors"])
+        self.assertEqual(self.titles(search(Project.objects.all(), "gravitational")), ["Quantum Sensors"])
+        self.assertEqual(self.titles(search(Project.objects.all(), "quant")), ["Quantum Sensors", "Coral Reef Survey"])
+        self.assertEqual(self.titles(search(Project.objects.all(), '"; DROP')), [])
+        self.assertEqual(self.titles(search(Publication.objects.all(), "yet")), [])  # Placeholder abstracts aren't indexed
+    
+    def test_index_follows_changes(self):
+        """Test that edits, collaborator changes, author renames and deletes reach the index"""
+        from .search import search
+        
+        publication = self.publish(self.project, "Analytical engines")
+        self.assertEqual(self.titles(search(Publication.objects.all(), "lovelace")), [])
+        
+        publication.collaborators.add(self.ada)
+        self.assertEqual(self.titles(search(Publication.objects.all(), "lovelace")), ["Analytical engines"])
+        
+        self.ada.name = "Augusta King"
+        self.ada.save()
+        self.assertEqual(self.titles(search(Publication.objects.all(), "lovelace")), [])
+        self.assertEqual(self.titles(search(Publication.objects.all(), "augusta")), ["Analytical engines"])
+        
+        publication.title = "Difference engines"
+        publication.save()
+        self.assertEqual(self.titles(search(Publication.objects.all(), "difference")), ["Difference engines"])
+        
+        publication.delete()
+        self.assertEqual(self.titles(search(Publication.objects.all(), "engines")), [])
+    
+    def test_filters_and_pages_see_every_match(self):
+        """Test that filtering and paging a search covers all matches, not just the top-ranked ones"""
+        from .facets import publication_facets
+        from .pagination import paginate
+        from .search import search
+
+        for year in (2015, 2016, 2017, 2018, 2019):
+            Publication.objects.create(project=self.project, title=f"Graph study {year}", year=year, type="Journal")
+        self.assertEqual(self.titles(search(Publication.objects.all(), "graph").filter(year=2019)), ["Graph study 2019"])
+
+        pages, cursor = [], None
+        while True:
+            page = paginate(search(Publication.objects.all(), "graph"), ("search_rank", "-id"), cursor, 2)
+            pages.extend(self.titles(page))
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sorted(pages), [f"Graph study {year}" for year in (2015, 2016, 2017, 2018, 2019)])
+        self.assertEqual(publication_facets(search_query="graph")["years"][0], (2019, 1))
+
+    def test_project_list_uses_search(self):
+        """Test that the project list searches beyond titles and keeps other filters"""
+        response = self.client.get(reverse('projects_page'), {'search': 'squeezed light'})
+        self.assertEqual(self.titles(response.context['projects']), ["Quantum Sensors"])
+        
+        response = self.client.get(reverse('projects_page'), {'search': 'quantum', 'domain': 'Biology'})
+        self.assertEqual(self.titles(response.context['projects']), [])
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the project and publication listings"""
+
+    def setUp(self):
+        self.project = create_test_project()
+        self.ada = create_test_author(name="Ada Lovelace", email="ada@example.com")
+        # Three publications per year, so the id tie-breaker is exercised within a year
+        for year in (2022, 2023, 2024):
+            for i in range(3):
+                publication = Publication.objects.create(project=self.project, title=f"{year}-{i}", year=year,
+                                                         type="Journal", primary_author=self.ada)
+                publication.collaborators.add(self.ada)
+
+    def walk(self, queryset, ordering, page_size):
+        from .pagination import paginate
+
+        pages, cursor = [], None
+        while True:
+            page = paginate(queryset, ordering, cursor, page_size)
+            pages.append([obj.title for obj in page])
+            if not page.has_next:
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        """Test that following next cursors yields the full (-year, -id) ordering without gaps or repeats"""
+        from .pagination import paginate
+
+        expected = [p.title for p in Publication.objects.order_by('-year', '-id')]
+        pages, last = self.walk(Publication.objects.all(), ('-year', '-id'), 4)
+        self.assertEqual([len(page) for page in pages], [4, 4, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        # Walking back from the last page returns the page before it
+        previous = paginate(Publication.objects.all(), ('-year', '-id'), last.previous_cursor, 4)
+        self.assertEqual([p.title for p in previous], pages[1])
+        self.assertTrue(previous.has_previous and previous.has_next)
+
+        # A tampered cursor falls back to the first page
+        self.assertEqual([p.title for p in paginate(Publication.objects.all(), ('-year', '-id'), "garbage!", 4)],
+                         pages[0])
+
+    def test_cursor_is_stable_under_inserts(self):
+        """Test that rows added before the cursor don't shift the next page"""
+        from .pagination import paginate
+
+        first = paginate(Publication.objects.all(), ('-year', '-id'), None, 3)
+        Publication.objects.create(project=self.project, title="new", year=2025, type="Journal")
+        second = paginate(Publication.objects.all(), ('-year', '-id'), first.next_cursor, 3)
+        self.assertEqual([p.title for p in second], ["2023-2", "2023-1", "2023-0"])
+
+    def test_page_loads_authors_in_constant_queries(self):
+        """Test that a publication page costs the same number of queries whatever its size"""
+        from .pagination import paginate
+
+        queryset = Publication.objects.select_related('primary_author', 'project').prefetch_related('collaborators')
+        with self.assertNumQueries(2):
+            page = paginate(queryset, ('year', 'id'), None, 9)
+            self.assertEqual([(p.primary_author.name, p.project.title, [c.name for c in p.collaborators.all()])
+                              for p in page][0], ("Ada Lovelace", self.project.title, ["Ada Lovelace"]))
+
+    def test_project_list_pages(self):
+        """Test that the project list serves one page and links the next one"""
+        for i in range(4):
+            create_test_project(title=f"Extra {i}")
+        response = self.client.get(reverse('projects_page'), {'page_size': 2, 'sort': 'oldest'})
+        page = response.context['page']
+        self.assertEqual(len(response.context['projects']), 2)
+        self.assertTrue(page.has_next)
+        self.assertContains(response, f"cursor={page.next_cursor}")
+
+        response = self.client.get(reverse('projects_page'), {'page_size': 2, 'sort': 'oldest', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['projects']), 2)
+        self.assertTrue(response.context['page'].has_previous)
+
+class FacetTests(TestCase):
+    """Test the cached filter facets of the listing pages"""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()  # The cache outlives each test's rolled-back database
+        self.physics = create_test_project(title="Optics", domain="Physics", created=date(2023, 5, 1))
+        self.biology = create_test_project(title="Genomes", domain="Biology", created=date(2024, 2, 1))
+        for project, year, type in ((self.physics, 2023, "Journal"), (self.physics, 2024, "Journal"),
+                                    (self.biology, 2024, "Conference")):
+            Publication.objects.create(project=project, title=f"{project.title} {year}", year=year, type=type)
+
+    def test_counts_follow_the_other_filters(self):
+        """Test that each facet counts results under every filter except its own"""
+        from .facets import project_facets, publication_facets
+
+        facets = publication_facets()
+        self.assertEqual(facets["domains"], [("Biology", 1), ("Physics", 2)])
+        self.assertEqual(facets["years"], [(2024, 2), (2023, 1)])
+        self.assertIn(("Journal", 2), facets["types"])
+        self.assertIn(("Book", 0), facets["types"])  # Every type stays selectable
+
+        facets = publication_facets(domain="Physics", type="Journal")
+        self.assertEqual(facets["domains"], [("Physics", 2)])
+        self.assertEqual(facets["years"], [(2024, 1), (2023, 1)])
+        self.assertIn(("Conference", 0), facets["types"])
+
+        self.assertEqual(project_facets(search_query="optics")["domains"], [("Physics", 1)])
+        self.assertEqual(project_facets(domain="Biology")["years"], [(2024, 1)])
+
+    def test_warm_cache_costs_no_queries_until_a_save(self):
+        """Test that cached facets are served without queries and dropped when a publication changes"""
+        from .facets import publication_facets
+
+        publication_facets(year="2024")
+        with self.assertNumQueries(0):
+            self.assertEqual(publication_facets(year="2024")["domains"], [("Biology", 1), ("Physics", 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Publication.objects.create(project=self.biology, title="Genomes again", year=2024, type="Journal")
+        self.assertEqual(publication_facets(year="2024")["domains"], [("Biology", 2), ("Physics", 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.physics.delete()
+        self.assertEqual(publication_facets(year="2024")["domains"], [("Biology", 2)])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_per_process_cache_is_not_used(self):
+        """Test that facets are computed every time when the cache is not shared between processes"""
+        from django.core.cache import cache
+        from .facets import publication_facets
+
+        publication_facets(year="2024")
+        Publication.objects.filter(project=self.physics).delete()  # As another process would, unseen here
+        self.assertEqual(publication_facets(year="2024")["domains"], [("Biology", 1)])
+        self.assertEqual(cache.get("facets:generation"), None)
+
+    def test_project_list_shows_counts(self):
+        """Test that the project list dropdowns carry the facet counts"""
+        response = self.client.get(reverse('projects_page'))
+        self.assertEqual(response.context['domains'], [("Biology", 1), ("Physics", 1)])
+        self.assertContains(response, "Physics (1)")
+
+@override_settings(SIGNALS_ENABLED=False)
+class InteractionStatusTests(TestCase):
+    """Test bulk interaction-status resolution for the messaging user lists"""
+
+    def setUp(self):
+        self.me = User.objects.create_user(username="me", password="pw", email="me@example.com")
+        self.sent = User.objects.create_user(username="alice", first_name="Alice")
+        self.received = User.objects.create_user(username="bob")
+        self.approved = User.objects.create_user(username="carol")
+        self.stranger = User.objects.create_user(username="dave")
+        MessageRequest.objects.create(sender=self.me, recipient=self.sent)
+        MessageRequest.objects.create(sender=self.received, recipient=self.me)
+        approved = MessageRequest.objects.create(sender=self.approved, recipient=self.me, status="approved")
+        Message.objects.create(sender=self.approved, recipient=self.me, content="hi", request=approved)
+        for user in (self.sent, self.received, self.approved):
+            UserProfile.objects.create(user=user)
+        self.client.force_login(self.me)
+
+    def test_statuses_resolved_in_one_query(self):
+        """Test that every status seen from one side comes from a single query"""
+        from .views import get_interaction_status, get_interaction_statuses
+
+        with self.assertNumQueries(1):
+            statuses = get_interaction_statuses(self.me)
+        self.assertEqual(statuses, {self.sent.id: "request_sent", self.received.id: "request_received",
+                                    self.approved.id: "approved"})
+        self.assertEqual(get_interaction_status(self.sent, self.me), "request_received")
+        self.assertEqual(get_interaction_status(self.me, self.stranger), "no_interaction")
+
+    def test_user_interactions(self):
+        """Test that the messaging home list covers request and message partners only"""
+        from .views import get_user_interactions
+
+        with self.assertNumQueries(3):
+            interactions = [(i['user'].username, i['interaction_status'], i['user'].userprofile.is_online)
+                            for i in get_user_interactions(self.me)]
+        self.assertEqual(interactions, [("alice", "request_sent", False), ("bob", "request_received", False),
+                                        ("carol", "approved", False)])
+
+    def test_user_list_pages_and_filters(self):
+        """Test that the user list is paged and filtered server-side in constant queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        response = self.client.get(reverse('user_list'), {'page_size': 2})
+        data = response.json()
+        self.assertEqual([u['username'] for u in data['users']], ["alice", "bob"])
+        self.assertEqual(data['users'][0]['interaction_status'], "request_sent")
+
+        data = self.client.get(reverse('user_list'), {'page_size': 2, 'cursor': data['next_cursor']}).json()
+        self.assertEqual([u['username'] for u in data['users']], ["carol", "dave"])
+        self.assertIsNone(data['next_cursor'])
+
+        data = self.client.get(reverse('user_list'), {'status': 'no_interaction'}).json()
+        self.assertEqual([u['username'] for u in data['users']], ["dave"])
+        data = self.client.get(reverse('user_list'), {'q': 'ALI'}).json()
+        self.assertEqual([u['full_name'] for u in data['users']], ["Alice"])
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('user_list'))
+        User.objects.bulk_create([User(username=f"user{i}") for i in range(30)])
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('user_list'))
+        self.assertEqual(len(many), len(few))
+
+class GroupReadWatermarkTests(TestCase):
+    """Test group chat read receipts kept as per-member watermarks"""
+
+    def setUp(self):
+        from .models import GroupChat, GroupMessage
+
+        self.alice, self.bob, self.carol = (User.objects.create_user(username=name) for name in ("alice", "bob", "carol"))
+        self.group = GroupChat.objects.create(name="Lab", created_by=self.alice)
+        self.group.members.add(self.alice, self.bob, self.carol)
+        self.other = GroupChat.objects.create(name="Other", created_by=self.bob)
+        self.other.members.add(self.alice, self.bob)
+        self.messages = [GroupMessage.objects.create(group=self.group, sender=sender, content=str(i))
+                         for i, sender in enumerate([self.alice, self.bob, self.alice, self.bob])]
+        GroupMessage.objects.create(group=self.other, sender=self.bob, content="hi")
+
+    def test_opening_a_chat_is_one_write(self):
+        """Test that advancing a watermark is a single update and never moves it back"""
+        from .group_reads import mark_group_read
+        from .models import GroupReadWatermark
+
+        mark_group_read(self.group, self.carol, self.messages[1].id)
+        with self.assertNumQueries(1):
+            mark_group_read(self.group, self.carol, self.messages[3].id)
+        mark_group_read(self.group, self.carol, self.messages[0].id)
+        self.assertEqual(GroupReadWatermark.objects.get(group=self.group, user=self.carol).last_read_message_id,
+                         self.messages[3].id)
+
+    def test_unread_and_read_by_counts(self):
+        """Test unread counts per group and "read by N" per message from the watermarks"""
+        from .group_reads import mark_group_read, read_counts, unread_counts
+
+        self.assertEqual(unread_counts(self.alice, [self.group, self.other]), {self.group.id: 2, self.other.id: 1})
+        mark_group_read(self.group, self.alice, self.messages[1].id)
+        mark_group_read(self.group, self.carol, self.messages[3].id)
+        with self.assertNumQueries(2):
+            self.assertEqual(unread_counts(self.alice, [self.group, self.other]), {self.group.id: 1, self.other.id: 1})
+
+        with self.assertNumQueries(1):
+            counts = read_counts(self.group, self.messages)
+        # alice's own watermark doesn't count for her messages; carol has read everything
+        self.assertEqual([counts[m.id] for m in self.messages], [1, 2, 1, 1])
+        self.assertEqual(self.messages[1].get_read_count(), 2)
+
+        self.group.members.remove(self.carol)  # Former members no longer count as readers
+        self.assertEqual(self.messages[3].get_read_count(), 0)
+        self.messages[3].mark_as_read_by(self.alice)
+        self.assertEqual(self.messages[3].get_read_count(), 1)
+
+class StartupImportTests(TestCase):
+    """Test that loading the app stays cheap and leaves the AI stack unimported"""
+    
+    # Total import time allowed for django.setup() plus urls/admin, in milliseconds
+    IMPORT_BUDGET_MS = 1500
+    # Modules that must only load when matching actually runs
+    HEAVY_MODULES = {"torch", "pandas", "scipy", "sentence_transformers", "transformers", "hnswlib"}
+    
+    def test_app_import_within_budget(self):
+        """Test `python -X importtime` of the app against the budget"""
+        import subprocess
+        import sys
+        from django.conf import settings
+        
+        code = "import django; django.setup(); import projects.urls, projects.admin, projects.matching_jobs"
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="config.settings")
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=settings.BASE_DIR,
+                                env=env, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        
+        total_us, imported = 0, set()
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _, name = line[len("import time:"):].split("|")
+            total_us += int(self_us)
+            imported.add(name.strip().split(".")[0])
+        
+        self.assertFalse(self.HEAVY_MODULES & imported, "AI stack imported at startup")
+        self.assertLess(total_us / 1000, self.IMPORT_BUDGET_MS)
+
 # ---------------------------
 # Cleanup
 # ---------------------------
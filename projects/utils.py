@@ -1,6 +1,17 @@
 # utils.py
 import requests
 
+# Content types accepted as a downloadable publication document
+DOCUMENT_CONTENT_TYPES = (
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+)
+
+# Returns True if a response with this status and Content-Type is a supported document
+def is_document_response(status_code, content_type):
+    return status_code == 200 and any(document_type in (content_type or '') for document_type in DOCUMENT_CONTENT_TYPES)
+
 # Checks if a given URL is a valid download link for a supported document type
 def is_valid_download_link(url): 
     try:
@@ -12,15 +23,11 @@ def is_valid_download_link(url):
         # Return True only if:
         # - The server responds with HTTP 200 OK
         # - The content type is PDF, MS Word (.doc), or Word (.docx)
-        if response.status_code == 200 and (
-            'application/pdf' in content_type or
-            'application/msword' in content_type or
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document' in content_type
-        ):
+        if is_document_response(response.status_code, content_type):
             return True
     # If any requests-related exception occurs, ignore and continue
     except requests.RequestException:
         pass
 
     # If checks failed or an exception occurred, return False
-    return False
\ No newline at end of file
+    return False
@@ -4,15 +4,13 @@ from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
-from django.db.models.functions import ExtractYear
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.db.models import Count, Max
 from django.utils import timezone
 from datetime import timedelta
@@ -20,7 +18,12 @@ import json
 
 from projects.models import MatchRequest, AVATAR_CHOICES
 
-from .email import notify_invalid_publication_url,send_welcome_email
+from .email import send_welcome_email
+from .facets import project_facets, publication_facets
+from .group_reads import mark_group_read, read_counts, unread_counts
+from .link_checker import schedule_publication_check
+from .pagination import page_size_from, paginate
+from .search import search
 from .forms import (
     MessageForm,
     MessageRequestForm,
@@ -28,7 +31,17 @@ from .forms import (
     UserCreation,
     UserUpdateForm,
 )
-from .models import Message, MessageRequest, Notification, Project, Publication, UserProfile
+from .models import (
+    GroupChat,
+    GroupInvitation,
+    GroupMessage,
+    Message,
+    MessageRequest,
+    Notification,
+    Project,
+    Publication,
+    UserProfile,
+)
 
 # ========================
 # Project Views
@@ -37,40 +50,45 @@ from .models import Message, MessageRequest, Notification, Project, Publication,
 def projects_list(request):
     """
     Display a list of all projects with optional filtering by search, domain, year, and sorting.
-    - Allows searching by project title, filtering by domain and year, and sorting by creation date.
+    - Allows full-text search (best matches first), filtering by domain and year, and sorting by creation date.
     - Also provides lists of available domains and years for filter dropdowns.
+    - Shows one keyset page at a time (?cursor=, ?page_size=).
     """
     projects = Project.objects.all()
 
     search_query = request.GET.get('search', '')
     domain = request.GET.get('domain', '')
     year = request.GET.get('year', '')
-    sort = request.GET.get('sort', '')
+    sort = request.GET.get('sort', 'relevance' if search_query else 'newest')
 
     if search_query:
-        projects = projects.filter(title__istartswith=search_query)
+        # Full-text match on title, abstract, keywords, scientific case and team, best first
+        projects = search(projects, search_query)
 
     if domain:
         projects = projects.filter(domain=domain)
     if year:
         projects = projects.filter(created__year=year)
-    if sort == 'newest':
-        projects = projects.order_by('-created')
+    if sort == 'relevance' and search_query:
+        ordering = ('search_rank', '-id')  # Keep the search ranking
     elif sort == 'oldest':
-        projects = projects.order_by('created')
+        ordering = ('created', 'id')
+    else:
+        ordering = ('-created', '-id')
+    page = paginate(projects, ordering, request.GET.get('cursor'), page_size_from(request))
 
-    # Get all distinct domains and years for filters
-    domains = Project.objects.values_list('domain', flat=True).distinct()
-    years = Project.objects.annotate(year=ExtractYear('created')).values_list('year', flat=True).distinct().order_by('-year')
+    # Domains and years with result counts for the filter dropdowns (cached)
+    facets = project_facets(search_query, domain, year)
 
     context = {
-        'projects': projects,
+        'projects': page.object_list,
+        'page': page,
         'search_query': search_query,
         'selected_domain': domain,
         'selected_year': year,
         'selected_sort': sort,
-        'domains': domains,
-        'years': years,
+        'domains': facets['domains'],
+        'years': facets['years'],
     }
     return render(request, 'projects/projects_page.html', context)
 
@@ -101,9 +119,10 @@ def add_publication(request, project_id):
             publication.save()
             form.save_m2m()
 
-            # Check publication URL validity and send notification if needed
+            # Check the publication URL in the background and email the uploader if it is invalid
             if publication.url:
-                notify_invalid_publication_url(publication)
+                publication_id, email = publication.id, request.user.email
+                transaction.on_commit(lambda: schedule_publication_check([publication_id], notify_email=email))
 
             return redirect('project_detail', pk=project.id)
     else:
@@ -127,6 +146,8 @@ def publication_list(request):
     Display a list of all publications with filters for search, domain, year, type, and sorting.
     - Allows filtering by publication type, domain, and year.
     - Provides dropdowns for available domains, years, and types.
+    - Shows one keyset page at a time (?cursor=, ?page_size=); authors and project
+      are loaded for that page only.
     """
     publications = Publication.objects.all()
 
@@ -134,10 +155,11 @@ def publication_list(request):
     selected_domain = request.GET.get('domain', '')
     selected_year = request.GET.get('year', '')
     selected_type = request.GET.get('type', '')   # Publication type filter
-    selected_sort = request.GET.get('sort', 'newest')
+    selected_sort = request.GET.get('sort', 'relevance' if search_query else 'newest')
 
     if search_query:
-        publications = publications.filter(title__icontains=search_query)
+        # Full-text match on title, abstract and author names, best first
+        publications = search(publications, search_query)
 
     if selected_domain:
         publications = publications.filter(project__domain=selected_domain)
@@ -152,26 +174,29 @@ def publication_list(request):
     if selected_type:
         publications = publications.filter(type=selected_type)
 
-    if selected_sort == 'newest':
-        publications = publications.order_by('-year', '-id')
+    if selected_sort == 'relevance' and search_query:
+        ordering = ('search_rank', '-id')  # Keep the search ranking
+    elif selected_sort == 'newest':
+        ordering = ('-year', '-id')
     else:
-        publications = publications.order_by('year', 'id')
+        ordering = ('year', 'id')
+    publications = publications.select_related('primary_author', 'project').prefetch_related('collaborators')
+    page = paginate(publications, ordering, request.GET.get('cursor'), page_size_from(request))
 
-    # Prepare lists for filters
-    domains = Project.objects.values_list('domain', flat=True).distinct()
-    years = Publication.objects.values_list('year', flat=True).distinct().order_by('-year')
-    types = [choice[0] for choice in Publication._meta.get_field('type').choices]  # All publication types
+    # Domains, years and types with result counts for the filter dropdowns (cached)
+    facets = publication_facets(search_query, selected_domain, selected_year, selected_type)
 
     context = {
-        'publications': publications,
+        'publications': page.object_list,
+        'page': page,
         'search_query': search_query,
         'selected_domain': selected_domain,
         'selected_year': selected_year,
         'selected_type': selected_type,
         'selected_sort': selected_sort,
-        'domains': domains,
-        'years': years,
-        'types': types,
+        'domains': facets['domains'],
+        'years': facets['years'],
+        'types': facets['types'],
     }
 
     return render(request, 'publications/publication_list.html', context)
@@ -224,7 +249,9 @@ def administrator_dashboard(request):
     Display the dashboard for administrators.
     - Shows all pending match requests that have not been reviewed.
     """
-    pending_requests = MatchRequest.objects.filter(approved__isnull=True).order_by("-id")
+    pending_requests = MatchRequest.objects.filter(approved__isnull=True).select_related(
+        "project", "publication"
+    ).order_by("-id")
     return render(request, "registration/administrator_dashboard.html", {"match_requests": pending_requests})
 
 def login(request):
@@ -332,14 +359,8 @@ def conversation(request, request_id):
                 content=content,
                 request=msg_req
             )
+            # Emailed as part of the recipient's next notification digest (digests.py)
             Notification.objects.create(user=msg.recipient, message=msg, notification_type="unread_message")
-            send_mail(
-                'New Message Received',
-                f'You have received a new message from {msg.sender.username}: "{msg.content[:100]}"',
-                'noreply@yourdomain.com',
-                [msg.recipient.email],
-                fail_silently=True,
-            )
         return redirect('conversation', request_id=msg_req.id)
     Message.objects.filter(request=msg_req, recipient=request.user, is_read=False).update(is_read=True)
     Notification.objects.filter(user=request.user, message__request=msg_req, is_read=False).update(is_read=True)
@@ -427,20 +448,46 @@ def conversation_view(request, user_id):
 
 @login_required
 def user_list(request):
-    """Get list of users for messaging"""
-    # Get all users except current user
+    """
+    Get one page of users for messaging, with their interaction status.
+    - ?q= filters on username and name, ?status= on interaction status.
+    - Keyset-paginated by username (?cursor=, ?page_size=); statuses come from one query.
+    """
+    search_query = request.GET.get('q', '').strip()
+    status = request.GET.get('status', '')
+
     users = User.objects.exclude(id=request.user.id).select_related('userprofile')
-    
-    # Get interaction status for each user
+    if search_query:
+        users = users.filter(
+            Q(username__icontains=search_query) |
+            Q(first_name__icontains=search_query) |
+            Q(last_name__icontains=search_query)
+        )
+
+    statuses = get_interaction_statuses(request.user)
+    if status == 'no_interaction':
+        users = users.exclude(id__in=list(statuses))
+    elif status:
+        users = users.filter(id__in=[user_id for user_id, value in statuses.items() if value == status])
+
+    page = paginate(users, ('username',), request.GET.get('cursor'), page_size_from(request))
     user_list_data = []
-    for user in users:
-        interaction_status = get_interaction_status(request.user, user)
+    for user in page:
+        profile = getattr(user, 'userprofile', None)
         user_list_data.append({
-            'user': user,
-            'interaction_status': interaction_status,
+            'id': user.id,
+            'username': user.username,
+            'full_name': user.get_full_name(),
+            'is_online': bool(profile and profile.is_online),
+            'avatar_url': profile.get_avatar_url() if profile else '/static/avatars/default.png',
+            'interaction_status': statuses.get(user.id, 'no_interaction'),
         })
-    
-    return JsonResponse({'users': user_list_data})
+
+    return JsonResponse({
+        'users': user_list_data,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
 
 @login_required
 def send_message_request(request):
@@ -658,51 +705,48 @@ def mark_all_notifications_read(request):
 # Helper functions
 def get_user_interactions(user):
     """Get all users the current user has interacted with"""
-    # Get users from message requests
-    request_users = User.objects.filter(
-        Q(sent_requests__recipient=user) | Q(received_requests__sender=user)
-    ).distinct()
-    
-    # Get users from messages
-    message_users = User.objects.filter(
-        Q(messages_sent__recipient=user) | Q(messages_received__sender=user)
-    ).distinct()
-    
-    # Combine and get unique users
-    all_users = list(request_users) + list(message_users)
-    unique_users = list({user.id: user for user in all_users}.values())
-    
+    statuses = get_interaction_statuses(user)
+
+    # Users from messages, on top of those from message requests
+    sent_to = Message.objects.filter(sender=user).order_by().values_list('recipient_id', flat=True)
+    received_from = Message.objects.filter(recipient=user).order_by().values_list('sender_id', flat=True)
+    user_ids = set(statuses) | set(sent_to.union(received_from))
+    user_ids.discard(user.id)
+
     # Add interaction status for each user
-    user_interactions = []
-    for other_user in unique_users:
-        if other_user.id != user.id:
-            interaction_status = get_interaction_status(user, other_user)
-            user_interactions.append({
-                'user': other_user,
-                'interaction_status': interaction_status,
-            })
-    
-    return user_interactions
+    users = User.objects.filter(id__in=user_ids).select_related('userprofile').order_by('id')
+    return [
+        {'user': other_user, 'interaction_status': statuses.get(other_user.id, 'no_interaction')}
+        for other_user in users
+    ]
+
+def _request_status(message_request, user):
+    """Interaction status of a message request seen from user's side"""
+    if message_request.status == 'pending':
+        return 'request_sent' if message_request.sender_id == user.id else 'request_received'
+    return message_request.status  # 'approved' or 'rejected'
+
+def get_interaction_statuses(user, other_user_ids=None):
+    """
+    Get {other user id: interaction status} for every user with a message request
+    to or from user (optionally only other_user_ids), in one query.
+    Users missing from the result have no interaction.
+    """
+    requests = MessageRequest.objects.filter(Q(sender=user) | Q(recipient=user)).only('sender', 'recipient', 'status')
+    if other_user_ids is not None:
+        other_user_ids = list(other_user_ids)
+        requests = requests.filter(Q(sender_id__in=other_user_ids) | Q(recipient_id__in=other_user_ids))
+
+    statuses = {}
+    # Oldest first, so the latest request wins when both users sent one
+    for message_request in requests.order_by('sent_at', 'id'):
+        other_id = message_request.recipient_id if message_request.sender_id == user.id else message_request.sender_id
+        statuses[other_id] = _request_status(message_request, user)
+    return statuses
 
 def get_interaction_status(user1, user2):
     """Get the interaction status between two users"""
-    # Check for message request
-    request = MessageRequest.objects.filter(
-        Q(sender=user1, recipient=user2) | Q(sender=user2, recipient=user1)
-    ).first()
-    
-    if request:
-        if request.status == 'pending':
-            if request.sender == user1:
-                return 'request_sent'
-            else:
-                return 'request_received'
-        elif request.status == 'approved':
-            return 'approved'
-        elif request.status == 'rejected':
-            return 'rejected'
-    
-    return 'no_interaction'
+    return get_interaction_statuses(user1, [user2.id]).get(user2.id, 'no_interaction')
 
 # ========================
 # AUTHOR PROFILE VIEWS
@@ -778,8 +822,11 @@ def edit_author_profile(request):
 @login_required
 def group_messaging_home(request):
     """Main group messaging page"""
-    # Get user's groups
-    user_groups = GroupChat.objects.filter(members=request.user, is_active=True)
+    # Get user's groups, with how many messages each has that the user hasn't read
+    user_groups = list(GroupChat.objects.filter(members=request.user, is_active=True))
+    counts = unread_counts(request.user, user_groups)
+    for group in user_groups:
+        group.unread_count = counts[group.id]
     
     # Get pending group invitations
     pending_invitations = GroupInvitation.objects.filter(
@@ -835,12 +882,16 @@ def group_chat(request, group_id):
     group = get_object_or_404(GroupChat, id=group_id, members=request.user)
     
     # Get group messages
-    messages = GroupMessage.objects.filter(group=group).order_by('sent_at')
+    messages = list(GroupMessage.objects.filter(group=group).select_related('sender').order_by('sent_at', 'id'))
+    
+    # Mark the chat as read up to the newest message (one write, whatever the history length)
+    if messages:
+        mark_group_read(group, request.user, max(message.id for message in messages))
     
-    # Mark messages as read by current user
+    # "Read by N" for each message, from the members' watermarks
+    counts = read_counts(group, messages)
     for message in messages:
-        if message.sender != request.user:
-            message.mark_as_read_by(request.user)
+        message.read_count = counts[message.id]
     
     context = {
         'group': group,